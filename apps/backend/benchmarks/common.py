@@ -0,0 +1,10 @@
+"""Helpers shared by the benchmark scripts"""
+
+
+def rss_bytes() -> int:
+    """Resident set size of the current process, from /proc/self/status"""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
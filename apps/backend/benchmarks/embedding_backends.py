@@ -0,0 +1,146 @@
+"""
+Compare embedding backends on latency, throughput, memory and retrieval quality.
+
+    python -m benchmarks.embedding_backends [--backends torch onnx onnx-int8] [--phrases-file phrases.txt]
+
+Each backend runs in its own subprocess so resident memory is measured in
+isolation. Recall@k is the overlap between each backend's top-k phrases and
+the PyTorch backend's top-k for the same queries; cosine is the minimum
+per-query similarity to the PyTorch embedding.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+from benchmarks.common import rss_bytes
+
+VERBS = ["open", "show", "find", "create", "edit", "delete", "export", "view", "manage", "configure"]
+OBJECTS = [
+    "dashboard", "invoices", "billing address", "team members", "overdue objectives", "payroll report",
+    "security settings", "api keys", "project settings", "user profile", "notifications", "audit log",
+    "integrations", "workflows", "analytics", "support tickets", "subscription plan", "password",
+]
+QUALIFIERS = ["", "for my team", "from last month", "in settings", "as csv", "for this project", "quickly"]
+
+
+def synthetic_phrases(count: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    return [
+        " ".join(part for part in (rng.choice(VERBS), rng.choice(OBJECTS), rng.choice(QUALIFIERS)) if part)
+        for _ in range(count)
+    ]
+
+
+def _percentile(values: list, pct: float) -> float:
+    return float(np.percentile(values, pct)) if values else 0.0
+
+
+def run_backend(backend: str, corpus: list, queries: list, k: int, output_dir: str) -> dict:
+    """Benchmark one backend in the current process"""
+    os.environ["EMBEDDING_BACKEND"] = backend
+    from storage.embeddings import load_embedding_model
+
+    rss_before = rss_bytes()
+    started = time.perf_counter()
+    model = load_embedding_model(backend)
+    model.encode(["warmup"], convert_to_numpy=True, normalize_embeddings=True)
+    load_seconds = time.perf_counter() - started
+
+    latencies = []
+    query_embeddings = []
+    for query in queries:
+        started = time.perf_counter()
+        query_embeddings.append(model.encode([query], convert_to_numpy=True, normalize_embeddings=True)[0])
+        latencies.append((time.perf_counter() - started) * 1000)
+    query_embeddings = np.vstack(query_embeddings).astype(np.float32)
+
+    started = time.perf_counter()
+    corpus_embeddings = model.encode(corpus, batch_size=64, convert_to_numpy=True, normalize_embeddings=True)
+    corpus_seconds = time.perf_counter() - started
+
+    scores = query_embeddings @ corpus_embeddings.T
+    top_k = np.argsort(-scores, axis=1)[:, :k]
+    np.save(os.path.join(output_dir, f"{backend}_queries.npy"), query_embeddings)
+    np.save(os.path.join(output_dir, f"{backend}_topk.npy"), top_k)
+
+    return {
+        "backend": backend,
+        "load_seconds": load_seconds,
+        "rss_bytes": rss_bytes(),
+        "rss_model_bytes": rss_bytes() - rss_before,
+        "query_latency_ms": {
+            "p50": _percentile(latencies, 50),
+            "p95": _percentile(latencies, 95),
+            "p99": _percentile(latencies, 99),
+        },
+        "throughput_phrases_per_second": len(corpus) / corpus_seconds if corpus_seconds else 0.0,
+    }
+
+
+def compare(results: list, output_dir: str, k: int, reference: str = "torch"):
+    """Add recall@k and cosine agreement against the reference backend"""
+    reference_path = os.path.join(output_dir, f"{reference}_topk.npy")
+    if not os.path.exists(reference_path):
+        return
+
+    reference_topk = np.load(reference_path)
+    reference_queries = np.load(os.path.join(output_dir, f"{reference}_queries.npy"))
+    for result in results:
+        backend = result["backend"]
+        topk = np.load(os.path.join(output_dir, f"{backend}_topk.npy"))
+        queries = np.load(os.path.join(output_dir, f"{backend}_queries.npy"))
+        overlaps = [len(set(a) & set(b)) / k for a, b in zip(reference_topk, topk)]
+        result[f"recall_at_{k}"] = float(np.mean(overlaps))
+        result["min_cosine_vs_reference"] = float(np.min(np.sum(reference_queries * queries, axis=1)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark embedding backends")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"])
+    parser.add_argument("--phrases-file", help="one phrase per line; defaults to synthetic phrases")
+    parser.add_argument("--corpus-size", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.phrases_file:
+        with open(args.phrases_file) as f:
+            corpus = [line.strip() for line in f if line.strip()][:args.corpus_size]
+    else:
+        corpus = synthetic_phrases(args.corpus_size)
+    queries = [phrase.replace(" ", "  ").upper() if i % 3 == 0 else phrase
+               for i, phrase in enumerate(random.Random(11).sample(corpus, min(args.queries, len(corpus))))]
+
+    if args.worker:
+        print(json.dumps(run_backend(args.worker, corpus, queries, args.k, args.workdir)))
+        sys.exit(0)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = []
+        for backend in args.backends:
+            command = [sys.executable, "-m", "benchmarks.embedding_backends", "--worker", backend,
+                       "--workdir", workdir, "--corpus-size", str(args.corpus_size),
+                       "--queries", str(args.queries), "--k", str(args.k)]
+            if args.phrases_file:
+                command += ["--phrases-file", args.phrases_file]
+            completed = subprocess.run(command, capture_output=True, text=True)
+            if completed.returncode != 0:
+                print(f"❌ {backend} failed:\n{completed.stderr}", file=sys.stderr)
+                continue
+            results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+        compare(results, workdir, args.k)
+
+    report = json.dumps({"k": args.k, "corpus_size": len(corpus), "queries": len(queries), "results": results}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report)
+    else:
+        print(report)
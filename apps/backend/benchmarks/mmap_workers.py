@@ -0,0 +1,166 @@
+"""
+Measure per-worker memory with private vs memory-mapped FAISS indexes.
+
+    python -m benchmarks.mmap_workers [--workers 4] [--projects 20] [--phrases-per-project 5000]
+
+Writes synthetic projects (flat, HNSW and IVF indexes, chosen by size as in
+production) to a temporary FAISS_INDEX_DIR, then starts N worker processes
+per loading mode (FAISS_INDEX_MMAP=false / true). Each worker loads every
+project through the index registry and runs queries so all index pages are
+touched. While all workers are alive, the parent reads
+/proc/{pid}/smaps_rollup for each of them, after startup and after loading:
+
+    uss  - private pages, what each extra worker really costs
+    pss  - proportional share of shared pages
+    rss  - resident pages, counting shared pages in full
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import numpy as np
+
+MODES = ("private", "mmap")
+
+
+def _project_id(number: int) -> str:
+    return f"mmap{number:04d}"
+
+
+def memory_of(pid: int) -> dict:
+    """USS, PSS and RSS in bytes of a process, from /proc/{pid}/smaps_rollup"""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) * 1024
+    return {
+        "uss_bytes": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+        "pss_bytes": fields.get("Pss", 0),
+        "rss_bytes": fields.get("Rss", 0),
+    }
+
+
+def build(projects: int, phrases_per_project: int, dimension: int):
+    """Write every project's artifacts with the production index parameters"""
+    from storage.index_artifacts import save_project_index
+    from storage.index_factory import choose_index_params, create_index
+
+    rng = np.random.default_rng(0)
+    types = {}
+    for number in range(projects):
+        # Vary sizes so the index factory picks different index types
+        count = phrases_per_project * (1 + number % 4)
+        vectors = rng.standard_normal((count, dimension)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        ids = np.arange(count, dtype=np.int64)
+        items = [{"id": int(i), "url": f"https://app.example.com/{number}/{i // 10}", "title": f"Page {i // 10}",
+                  "navigation_id": f"{number}-{i // 10}", "phrase": f"phrase {i}"} for i in ids]
+        params = choose_index_params(count, dimension)
+        save_project_index(_project_id(number), create_index(vectors, ids, params), items, params)
+        types[params["index_type"]] = types.get(params["index_type"], 0) + 1
+    return types
+
+
+def serve(projects: int, queries: int, dimension: int):
+    """Worker: report readiness, load and query every project, then wait to be measured"""
+    from storage.index_registry import get_index_registry
+
+    registry = get_index_registry()
+    print("started", flush=True)
+    sys.stdin.readline()
+
+    rng = np.random.default_rng(os.getpid())
+    query_vectors = rng.standard_normal((queries, dimension)).astype(np.float32)
+    for number in range(projects):
+        loaded = registry.get(_project_id(number))
+        loaded.index.search(query_vectors, 4)
+        for phrase_id in loaded.metadata.ids[::max(1, len(loaded.metadata) // 100)]:
+            loaded.metadata[int(phrase_id)]
+    print("loaded", flush=True)
+    sys.stdin.readline()
+
+
+def run_mode(mode: str, index_dir: str, args) -> dict:
+    env = dict(os.environ, FAISS_INDEX_DIR=index_dir, FAISS_INDEX_MMAP="true" if mode == "mmap" else "false",
+               FAISS_INDEX_CACHE_MB=str(1 << 20))
+    command = [sys.executable, "-m", "benchmarks.mmap_workers", "--worker", "serve",
+               "--projects", str(args.projects), "--queries", str(args.queries), "--dimension", str(args.dimension)]
+    workers = [subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, env=env)
+               for _ in range(args.workers)]
+    try:
+        for worker in workers:
+            assert worker.stdout.readline().strip() == "started"
+        before = [memory_of(worker.pid) for worker in workers]
+
+        for worker in workers:
+            worker.stdin.write("\n")
+            worker.stdin.flush()
+        for worker in workers:
+            assert worker.stdout.readline().strip() == "loaded"
+        after = [memory_of(worker.pid) for worker in workers]
+    finally:
+        for worker in workers:
+            worker.stdin.close()
+            worker.wait()
+
+    def mean(samples, field):
+        return float(np.mean([sample[field] for sample in samples]))
+
+    return {
+        "mode": mode,
+        "workers": args.workers,
+        "per_worker_before": {field: mean(before, field) for field in before[0]},
+        "per_worker_after": {field: mean(after, field) for field in after[0]},
+        "uss_added_per_worker_bytes": mean(after, "uss_bytes") - mean(before, "uss_bytes"),
+        "total_pss_bytes": sum(sample["pss_bytes"] for sample in after),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark per-worker memory of private vs mmap FAISS indexes")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--projects", type=int, default=20)
+    parser.add_argument("--phrases-per-project", type=int, default=5000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--worker", choices=("build", "serve"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker == "build":
+        print(json.dumps(build(args.projects, args.phrases_per_project, args.dimension)))
+        sys.exit(0)
+    if args.worker == "serve":
+        serve(args.projects, args.queries, args.dimension)
+        sys.exit(0)
+
+    with tempfile.TemporaryDirectory() as index_dir:
+        command = [sys.executable, "-m", "benchmarks.mmap_workers", "--worker", "build",
+                   "--projects", str(args.projects), "--phrases-per-project", str(args.phrases_per_project),
+                   "--dimension", str(args.dimension)]
+        completed = subprocess.run(command, capture_output=True, text=True,
+                                   env=dict(os.environ, FAISS_INDEX_DIR=index_dir))
+        if completed.returncode != 0:
+            sys.exit(f"❌ build failed:\n{completed.stderr}")
+        index_types = json.loads(completed.stdout.strip().splitlines()[-1])
+        index_bytes = sum(os.path.getsize(os.path.join(root, name))
+                          for root, _, names in os.walk(index_dir) for name in names)
+
+        results = []
+        for mode in MODES:
+            result = run_mode(mode, index_dir, args)
+            results.append(result)
+            print(f"✓ {mode}: +{result['uss_added_per_worker_bytes'] / 2**20:.1f} MiB unique per worker, "
+                  f"{result['total_pss_bytes'] / 2**20:.1f} MiB PSS across {args.workers} workers", file=sys.stderr)
+
+    report = json.dumps({"projects": args.projects, "index_types": index_types, "artifact_bytes": index_bytes,
+                         "results": results}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report)
+    else:
+        print(report)
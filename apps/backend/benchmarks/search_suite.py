@@ -0,0 +1,274 @@
+"""
+Search benchmark suite with synthetic tenants.
+
+    python -m benchmarks.search_suite [--sizes 100 10000 100000] [--concurrency 1 8]
+                                      [--stand-ins] [--output report.json] [--baseline old.json]
+
+For each project size, a subprocess seeds a synthetic project
+("bench-{size}") into MongoDB, builds its index with the background builder
+and drives semantic and fuzzy search single-threaded and concurrently. It
+reports build time, RSS, p50/p95/p99 latency and QPS per function and
+concurrency level as JSON.
+
+--stand-ins swaps MongoDB and Redis for mongomock and fakeredis (install them
+separately); otherwise the configured MONGO_DB_CONNECTION_STRING and
+REDIS_URL are used and the bench-* projects are replaced on every run.
+
+Runs are comparable over time: phrases and queries come from a fixed seed,
+the query embedding cache is disabled unless --query-cache is given, and the
+report records the git commit, library versions and search settings.
+--baseline prints p99 and QPS ratios against an earlier report.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from benchmarks.common import rss_bytes
+from benchmarks.embedding_backends import OBJECTS, QUALIFIERS, VERBS
+
+PHRASES_PER_NAVIGATION = 10
+ENTITIES = ["acme", "globex", "initech", "umbrella", "hooli", "stark", "wayne", "wonka", "tyrell", "cyberdyne"]
+SEARCH_FUNCTIONS = ("semantic", "fuzzy", "hybrid")
+
+# Settings recorded with every report so runs can be compared
+RECORDED_SETTINGS = (
+    "EMBEDDING_BACKEND", "EMBEDDING_MODEL_NAME", "FAISS_STORAGE_MODE", "FAISS_RECALL_TARGET",
+    "FAISS_HNSW_MIN_PHRASES", "FAISS_IVF_MIN_PHRASES", "FAISS_IVFPQ_MIN_PHRASES",
+    "EMBED_BATCH_WINDOW_MS", "EMBED_BATCH_MAX_SIZE", "FUZZY_SCORER", "EMBEDDING_STORE_ENABLED",
+)
+
+
+def synthetic_navigations(project_id: str, phrase_count: int, seed: int) -> list:
+    """Navigation documents with PHRASES_PER_NAVIGATION mostly distinct phrases each"""
+    rng = random.Random(seed)
+    navigations = []
+    for number in range(max(1, phrase_count // PHRASES_PER_NAVIGATION)):
+        entity = f"{rng.choice(ENTITIES)} {number}"
+        page = rng.choice(OBJECTS)
+        navigations.append({
+            "navigation_id": f"{project_id}-{number:06d}",
+            "project_id": project_id,
+            "org_id": "bench",
+            "url": f"https://app.example.com/{project_id}/{page.replace(' ', '-')}/{number}",
+            "title": f"{page.title()} {entity}",
+            "phrases": [
+                " ".join(part for part in (rng.choice(VERBS), page, rng.choice(QUALIFIERS), entity) if part)
+                for _ in range(PHRASES_PER_NAVIGATION)
+            ],
+        })
+    return navigations
+
+
+def synthetic_queries(navigations: list, count: int, seed: int) -> list:
+    """Queries drawn from the project's phrases, with some case, spacing and typo noise"""
+    rng = random.Random(seed + 1)
+    phrases = [phrase for navigation in navigations for phrase in navigation["phrases"]]
+    queries = []
+    for number in range(count):
+        query = rng.choice(phrases)
+        if number % 3 == 1:
+            query = query.upper().replace(" ", "  ")
+        elif number % 3 == 2 and len(query) > 4:
+            position = rng.randrange(1, len(query) - 1)
+            query = query[:position] + query[position + 1:]
+        queries.append(query)
+    return queries
+
+
+def _use_stand_ins():
+    """Replace MongoDB and Redis clients with in-process fakes before storage is imported"""
+    import fakeredis
+    import mongomock
+    import pymongo
+    import redis
+
+    mongo = mongomock.MongoClient()
+    pymongo.MongoClient = lambda *args, **kwargs: mongo
+    server = fakeredis.FakeServer()
+    redis.from_url = lambda url, **kwargs: fakeredis.FakeRedis(server=server, **kwargs)
+
+
+def _drive(search, queries: list, concurrency: int) -> dict:
+    def timed(query):
+        started = time.perf_counter()
+        search(query)
+        return (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    if concurrency == 1:
+        latencies = [timed(query) for query in queries]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = list(pool.map(timed, queries))
+    wall_seconds = time.perf_counter() - started
+
+    return {
+        "concurrency": concurrency,
+        "queries": len(queries),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "qps": len(queries) / wall_seconds if wall_seconds else 0.0,
+    }
+
+
+def run_size(size: int, args) -> dict:
+    """Seed, build and query one synthetic project in the current process"""
+    if args.stand_ins:
+        _use_stand_ins()
+
+    from storage.index_builder import build_project_index
+    from storage.mongo_client import get_mongo_client
+    from storage.search_utils import fuzzy_search_by_project, hybrid_search_by_project, semantic_search_by_project
+
+    project_id = f"bench-{size}"
+    navigations = synthetic_navigations(project_id, size, args.seed)
+    collection = get_mongo_client().app_navigations_collection
+    collection.delete_many({"project_id": project_id})
+    collection.insert_many(navigations)
+
+    rss_before = rss_bytes()
+    started = time.perf_counter()
+    phrase_count = build_project_index(project_id)
+    build_seconds = time.perf_counter() - started
+    rss_built = rss_bytes()
+
+    searches = {
+        "semantic": lambda query: semantic_search_by_project(query, project_id, limit=args.k),
+        "fuzzy": lambda query: fuzzy_search_by_project(query, project_id, limit=args.k),
+        "hybrid": lambda query: hybrid_search_by_project(query, project_id, limit=args.k),
+    }
+    queries = synthetic_queries(navigations, args.queries, args.seed)
+
+    results = {}
+    for function in args.functions:
+        search = searches[function]
+        # Load the index / phrase catalog and the model before timing
+        for query in queries[:args.warmup]:
+            search(query)
+        results[function] = [_drive(search, queries, concurrency) for concurrency in args.concurrency]
+
+    return {
+        "size": size,
+        "phrases": phrase_count,
+        "navigations": len(navigations),
+        "build_seconds": build_seconds,
+        "rss_before_build_bytes": rss_before,
+        "rss_after_build_bytes": rss_built,
+        "rss_after_queries_bytes": rss_bytes(),
+        "search": results,
+    }
+
+
+def _environment() -> dict:
+    import faiss
+    import rapidfuzz
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "faiss": faiss.__version__,
+        "rapidfuzz": rapidfuzz.__version__,
+        "settings": {name: os.environ[name] for name in RECORDED_SETTINGS if name in os.environ},
+    }
+
+
+def compare_to_baseline(report: dict, baseline: dict) -> list:
+    """Lines of p99 and QPS ratios (current / baseline) for matching runs"""
+    previous = {
+        (run["size"], function, level["concurrency"]): level
+        for run in baseline.get("runs", [])
+        for function, levels in run["search"].items()
+        for level in levels
+    }
+    lines = []
+    for run in report["runs"]:
+        for function, levels in run["search"].items():
+            for level in levels:
+                old = previous.get((run["size"], function, level["concurrency"]))
+                if old:
+                    lines.append(
+                        f"{function:>8} size={run['size']:<7} c={level['concurrency']:<3} "
+                        f"p99 x{level['p99_ms'] / old['p99_ms']:.2f}  qps x{level['qps'] / old['qps']:.2f}"
+                    )
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark project search at different project sizes")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10000, 100000])
+    parser.add_argument("--functions", nargs="+", choices=SEARCH_FUNCTIONS, default=["semantic", "fuzzy"])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--stand-ins", action="store_true", help="use mongomock and fakeredis")
+    parser.add_argument("--query-cache", action="store_true", help="keep the query embedding cache enabled")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="earlier report to compare p99 and QPS against")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        print(json.dumps(run_size(args.worker, args)))
+        sys.exit(0)
+
+    # Fresh index directory per run, and no cached embeddings, so builds are comparable
+    env = dict(os.environ, EMBEDDING_STORE_ENABLED=os.environ.get("EMBEDDING_STORE_ENABLED", "false"))
+    if not args.query_cache:
+        env["QUERY_EMBEDDING_CACHE_SIZE"] = "0"
+        env["QUERY_EMBEDDING_REDIS_CACHE"] = "false"
+
+    import tempfile
+    runs = []
+    with tempfile.TemporaryDirectory() as index_dir:
+        env["FAISS_INDEX_DIR"] = os.environ.get("FAISS_INDEX_DIR", index_dir) if args.stand_ins else index_dir
+        for size in args.sizes:
+            command = [sys.executable, "-m", "benchmarks.search_suite", "--worker", str(size)]
+            for flag in ("functions", "concurrency"):
+                command += [f"--{flag}"] + [str(value) for value in getattr(args, flag)]
+            command += ["--queries", str(args.queries), "--warmup", str(args.warmup),
+                        "--k", str(args.k), "--seed", str(args.seed)]
+            if args.stand_ins:
+                command.append("--stand-ins")
+
+            completed = subprocess.run(command, capture_output=True, text=True, env=env)
+            if completed.returncode != 0:
+                print(f"❌ size {size} failed:\n{completed.stderr}", file=sys.stderr)
+                continue
+            run = json.loads(completed.stdout.strip().splitlines()[-1])
+            runs.append(run)
+            print(f"✓ size {size}: built in {run['build_seconds']:.1f}s", file=sys.stderr)
+
+    report = {
+        "created_at": time.time(),
+        "parameters": {key: getattr(args, key) for key in
+                       ("sizes", "functions", "concurrency", "queries", "warmup", "k", "seed", "stand_ins", "query_cache")},
+        "environment": _environment(),
+        "runs": runs,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            for line in compare_to_baseline(report, json.load(f)):
+                print(line, file=sys.stderr)
@@ -0,0 +1,166 @@
+"""
+Compare per-project index files with the shared multi-tenant index.
+
+    python -m benchmarks.shared_index [--projects 1000 10000] [--phrases-per-project 20]
+
+For each storage mode and project count, one subprocess writes the artifacts
+from synthetic normalized vectors, and another loads every project and runs
+queries against random projects. Artifacts go to a temporary FAISS_INDEX_DIR.
+Query latency covers the index lookup, the filtered FAISS search and the
+metadata rows, i.e. the /query path without the embedding model. Resident
+memory is measured in the serving process after all projects are loaded.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+from benchmarks.common import rss_bytes
+
+MODES = ("per_project", "shared")
+
+
+def _project_id(number: int) -> str:
+    return f"bench{number:06d}"
+
+
+def _vectors(rng, count: int, dimension: int) -> np.ndarray:
+    vectors = rng.standard_normal((count, dimension)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _items(project_id: str, count: int) -> list:
+    return [
+        {
+            "url": f"https://app.example.com/{project_id}/page/{position // 4}",
+            "phrase": f"open page {position // 4} variant {position % 4}",
+            "title": f"Page {position // 4}",
+            "navigation_id": f"{project_id}-{position // 4}"
+        }
+        for position in range(count)
+    ]
+
+
+def build(mode: str, projects: int, phrases_per_project: int, dimension: int) -> dict:
+    """Write the artifacts for every project in the current storage mode"""
+    from storage.index_artifacts import save_project_index
+    from storage.index_factory import choose_index_params, create_index
+    from storage.shared_index import replace_projects
+
+    rng = np.random.default_rng(0)
+    started = time.perf_counter()
+    if mode == "shared":
+        replace_projects({
+            _project_id(number): (_items(_project_id(number), phrases_per_project),
+                                  _vectors(rng, phrases_per_project, dimension))
+            for number in range(projects)
+        })
+    else:
+        for number in range(projects):
+            items = _items(_project_id(number), phrases_per_project)
+            ids = np.arange(len(items), dtype=np.int64)
+            for item, phrase_id in zip(items, ids):
+                item["id"] = int(phrase_id)
+            params = choose_index_params(len(items), dimension)
+            index = create_index(_vectors(rng, len(items), dimension), ids, params)
+            save_project_index(_project_id(number), index, items, params)
+    return {"build_seconds": time.perf_counter() - started}
+
+
+def serve(projects: int, queries: int, k: int, dimension: int) -> dict:
+    """Load every project, then time queries against random projects"""
+    from storage.search_utils import _load_project, _navigation_results
+
+    rss_before = rss_bytes()
+    started = time.perf_counter()
+    for number in range(projects):
+        _load_project(_project_id(number))
+    load_seconds = time.perf_counter() - started
+    rss_loaded = rss_bytes()
+
+    rng = np.random.default_rng(1)
+    query_vectors = _vectors(rng, queries, dimension)
+    targets = rng.integers(0, projects, queries)
+    latencies = []
+    for query, number in zip(query_vectors, targets):
+        started = time.perf_counter()
+        loaded = _load_project(_project_id(number))
+        scores, indices = loaded.index.search(query.reshape(1, -1), min(k * 2, len(loaded.metadata)))
+        candidates = [(int(idx), float(score)) for score, idx in zip(scores[0], indices[0])
+                      if int(idx) in loaded.metadata]
+        _navigation_results(loaded.metadata, candidates, k)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    return {
+        "load_seconds": load_seconds,
+        "rss_bytes": rss_loaded,
+        "rss_index_bytes": rss_loaded - rss_before,
+        "query_latency_ms": {
+            "p50": float(np.percentile(latencies, 50)),
+            "p95": float(np.percentile(latencies, 95)),
+            "p99": float(np.percentile(latencies, 99)),
+        },
+    }
+
+
+def _disk_usage(directory: str) -> dict:
+    files = [os.path.join(root, name) for root, _, names in os.walk(directory) for name in names]
+    return {"files": len(files), "disk_bytes": sum(os.path.getsize(path) for path in files)}
+
+
+def _run_worker(stage: str, mode: str, index_dir: str, args) -> dict:
+    env = dict(os.environ, FAISS_INDEX_DIR=index_dir, FAISS_STORAGE_MODE=mode,
+               FAISS_INDEX_CACHE_MB=str(1 << 20), EMBEDDING_STORE_ENABLED="false")
+    command = [sys.executable, "-m", "benchmarks.shared_index", "--worker", stage, "--mode", mode,
+               "--projects", str(args.projects[0]), "--phrases-per-project", str(args.phrases_per_project),
+               "--dimension", str(args.dimension), "--queries", str(args.queries), "--k", str(args.k)]
+    completed = subprocess.run(command, capture_output=True, text=True, env=env)
+    if completed.returncode != 0:
+        raise RuntimeError(f"{stage} ({mode}) failed:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark per-project vs shared FAISS storage")
+    parser.add_argument("--projects", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--phrases-per-project", type=int, default=20)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--worker", choices=("build", "serve"), help=argparse.SUPPRESS)
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker == "build":
+        print(json.dumps(build(args.mode, args.projects[0], args.phrases_per_project, args.dimension)))
+        sys.exit(0)
+    if args.worker == "serve":
+        print(json.dumps(serve(args.projects[0], args.queries, args.k, args.dimension)))
+        sys.exit(0)
+
+    results = []
+    project_counts = args.projects
+    for projects in project_counts:
+        for mode in args.modes:
+            with tempfile.TemporaryDirectory() as index_dir:
+                args.projects = [projects]
+                result = {"mode": mode, "projects": projects, "phrases": projects * args.phrases_per_project}
+                result.update(_run_worker("build", mode, index_dir, args))
+                result.update(_disk_usage(index_dir))
+                result.update(_run_worker("serve", mode, index_dir, args))
+                results.append(result)
+                print(f"✓ {mode} @ {projects} projects: p99 {result['query_latency_ms']['p99']:.3f} ms, "
+                      f"{result['rss_index_bytes'] / 2**20:.1f} MiB resident", file=sys.stderr)
+
+    report = json.dumps({"dimension": args.dimension, "phrases_per_project": args.phrases_per_project,
+                         "results": results}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report)
+    else:
+        print(report)
@@ -2,7 +2,8 @@ from fastapi import FastAPI
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from storage import initialize_storage, get_storage_status
+from storage import initialize_storage, warmup_storage, get_storage_status
+from storage.async_mongo_client import close_async_mongo_client
 from routes.auth_routes import router as auth_router
 from routes.project_routes import router as project_router
 from routes.query_routes import router as query_router
@@ -12,9 +13,15 @@ from routes.analytics_routes import router as analytics_router
 from routes.studio_routes import router as studio_router
 from routes.workflow_routes import router as workflows_router
 from routes.project_settings import router as project_settings_router
+from routes.metrics_routes import router as metrics_router
+from routes.index_routes import router as index_router
+import threading
 import uvicorn
 import os
 
+# Load the embedding model, FAISS and MongoDB indexes right after startup instead of on the first request
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "true").lower() == "true"
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan event handler for startup and shutdown"""
@@ -24,6 +31,15 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"⚠️ Warning: Storage initialization failed: {e}")
         print("🔄 Application will continue but some features may not work")
+    
+    if STARTUP_WARMUP:
+        # Warm up in the background so the server accepts requests immediately
+        threading.Thread(target=warmup_storage, name="storage-warmup", daemon=True).start()
+    
+    yield
+    
+    # Shutdown
+    await close_async_mongo_client()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -46,6 +62,8 @@ app.include_router(analytics_router)
 app.include_router(studio_router)
 app.include_router(workflows_router)
 app.include_router(project_settings_router)
+app.include_router(metrics_router)
+app.include_router(index_router)
 
 @app.get("/health")
 def health_check():
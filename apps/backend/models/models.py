@@ -228,10 +228,26 @@ class ListProjectsResponse(BaseModel):
     projects: List[ProjectInfo] = []
     total_count: int = 0
 
+class SearchMode(str, Enum):
+    DENSE = "dense"
+    LEXICAL = "lexical"
+    HYBRID = "hybrid"
+
+class IndexCompression(str, Enum):
+    NONE = "none"
+    SQ8 = "sq8"
+    FP16 = "fp16"
+    PQ = "pq"
+    OPQ = "opq"
+    PCA_PQ = "pca_pq"
+
 class UpdateProjectRequest(BaseModel):
     name: Optional[str] = None
     description: Optional[str] = None
     status: Optional[ProjectStatus] = None
+    search_mode: Optional[SearchMode] = None
+    # Vector compression for the project's FAISS index; applied on the next build
+    index_compression: Optional[IndexCompression] = None
 
 class UpdateProjectResponse(BaseModel):
     success: bool
@@ -246,6 +262,18 @@ class DeleteProjectResponse(BaseModel):
 class QueryRequest(BaseModel):
     query: str
     k: Optional[int] = 4
+    # Overrides the project's search mode setting for this request
+    mode: Optional[SearchMode] = None
+
+class BatchQueryItem(BaseModel):
+    query: str
+    # Defaults to the project_id query parameter of /query/batch
+    project_id: Optional[str] = None
+    k: Optional[int] = 4
+    mode: Optional[SearchMode] = None
+
+class BatchQueryRequest(BaseModel):
+    queries: List[BatchQueryItem]
 
 class Flow(BaseModel):
     name: str
@@ -651,4 +679,41 @@ class ListAuthConfigsResponse(BaseModel):
 class DeleteAuthConfigResponse(BaseModel):
     success: bool
     message: str
-    auth_config_id: Optional[str] = None
\ No newline at end of file
+    auth_config_id: Optional[str] = None
+
+# Index Build Models
+class IndexBuildState(str, Enum):
+    QUEUED = "queued"
+    BUILDING = "building"
+    READY = "ready"
+    FAILED = "failed"
+    MISSING = "missing"
+
+class IndexBuildStatus(BaseModel):
+    project_id: str
+    state: IndexBuildState
+    index_type: Optional[str] = None
+    compression: Optional[str] = None
+    measured_recall: Optional[float] = None
+    phrase_count: Optional[int] = None
+    embedded_count: Optional[int] = None
+    reused_count: Optional[int] = None
+    reuse_ratio: Optional[float] = None
+    progress: Optional[float] = None
+    duration_seconds: Optional[float] = None
+    queued_at: Optional[float] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+
+class ListIndexBuildStatusResponse(BaseModel):
+    success: bool
+    message: str
+    statuses: List[IndexBuildStatus] = []
+    total_count: int = 0
+
+class TriggerIndexBuildResponse(BaseModel):
+    success: bool
+    message: str
+    project_id: str
+    queued: bool
@@ -1,8 +1,10 @@
 from fastapi import APIRouter, HTTPException, Depends, Header, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from models.models import LoginRequest, LoginResponse, RegisterRequest, RegisterResponse, UserRole, UserState, CreateApiKeyRequest, CreateApiKeyResponse, ListApiKeysResponse, DeleteApiKeyResponse, RefreshApiKeyRequest, RefreshApiKeyResponse, ApiKeyInfo, UpdateUserRequest, UpdateUserResponse, UpdatePasswordRequest, UpdatePasswordResponse, LogoutResponse, InviteUsersRequest, AcceptInviteRequest, AcceptInviteResponse, UserInfo, ListUsersResponse, BatchInviteResponse
 from storage.redis_client import redis_client
 from storage.mongo_client import get_mongo_client
+from storage.async_mongo_client import get_async_mongo_client
 import secrets
 import json
 from datetime import datetime, timedelta
@@ -162,10 +164,10 @@ def verify_token(token: str) -> Optional[dict]:
         print(f"Error verifying token: {e}")
         return None
 
-def verify_api_key(api_key: str) -> Optional[dict]:
+async def verify_api_key(api_key: str) -> Optional[dict]:
     """Verify API key and return key data"""
     try:
-        return mongo_client.validate_api_key(api_key)
+        return await get_async_mongo_client().validate_api_key(api_key)
     except Exception as e:
         print(f"Error verifying API key: {e}")
         return None
@@ -211,7 +213,7 @@ def invalidate_user_tokens(user_email: str) -> int:
         print(f"❌ Error invalidating tokens for user {user_email}: {e}")
         return 0
 
-def get_current_user(
+async def get_current_user(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
     x_api_key: Optional[str] = Header(None, alias="X-API-Key")
 ) -> dict:
@@ -220,7 +222,7 @@ def get_current_user(
     
     # Try API key first
     if x_api_key:
-        user_data = verify_api_key(x_api_key)
+        user_data = await verify_api_key(x_api_key)
         if user_data:
             return {
                 "auth_type": "api_key", 
@@ -231,7 +233,8 @@ def get_current_user(
     
     # Try bearer token
     if credentials:
-        token_data = verify_token(credentials.credentials)
+        # verify_token may read the user from MongoDB synchronously
+        token_data = await run_in_threadpool(verify_token, credentials.credentials)
         if token_data:
             return {
                 "user_id": token_data.get("user_id"),
@@ -271,7 +274,7 @@ def get_current_admin_user(credentials: HTTPAuthorizationCredentials = Depends(s
     }
 
 @router.get("/verify")
-def verify_endpoint(
+async def verify_endpoint(
     request: Request,
     x_api_key: Optional[str] = Header(None, alias="X-API-Key")
 ):
@@ -279,7 +282,7 @@ def verify_endpoint(
     
     # Try API key first
     if x_api_key:
-        api_key_data = verify_api_key(x_api_key)
+        api_key_data = await verify_api_key(x_api_key)
         if api_key_data:
             return {
                 "valid": True,
@@ -293,7 +296,7 @@ def verify_endpoint(
     auth_header = request.headers.get("Authorization")
     if auth_header and auth_header.startswith("Bearer "):
         token = auth_header.split(" ")[1]
-        user_data = verify_token(token)
+        user_data = await run_in_threadpool(verify_token, token)
         if user_data:
             return {
                 "valid": True,
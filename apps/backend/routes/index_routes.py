@@ -0,0 +1,76 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Optional
+from models.models import IndexBuildStatus, ListIndexBuildStatusResponse, TriggerIndexBuildResponse
+from storage.mongo_client import get_mongo_client
+from storage.index_builder import get_build_status, list_build_statuses, enqueue_project_build
+from utils.auth import require_admin
+
+router = APIRouter(prefix="/indexes", tags=["indexes"])
+
+def _admin_org(user_info: dict) -> str:
+    """Return the admin user's org_id or raise"""
+    org_id = user_info.get("org_id")
+    if not org_id:
+        raise HTTPException(status_code=400, detail="User not associated with any organization")
+    return org_id
+
+@router.get("/status", response_model=ListIndexBuildStatusResponse)
+def get_index_status(
+    project_id: Optional[str] = Query(None, description="Limit to a single project"),
+    user_info: dict = Depends(require_admin)
+):
+    """Get index build status for the organization's projects"""
+    try:
+        mongo_client = get_mongo_client()
+        org_id = _admin_org(user_info)
+
+        if project_id:
+            project = mongo_client.get_project_by_id(project_id, org_id)
+            if not project:
+                raise HTTPException(status_code=404, detail="Project not found or access denied")
+            statuses = [get_build_status(project_id)]
+        else:
+            result = mongo_client.list_projects(org_id=org_id, limit=0)
+            statuses = list_build_statuses([project["project_id"] for project in result["projects"]])
+
+        return ListIndexBuildStatusResponse(
+            success=True,
+            message="Index build status retrieved successfully",
+            statuses=[IndexBuildStatus(**status) for status in statuses],
+            total_count=len(statuses)
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Error retrieving index build status: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@router.post("/{project_id}/build", response_model=TriggerIndexBuildResponse)
+def trigger_index_build(
+    project_id: str,
+    user_info: dict = Depends(require_admin)
+):
+    """Queue a full index rebuild for a project"""
+    try:
+        mongo_client = get_mongo_client()
+        org_id = _admin_org(user_info)
+
+        project = mongo_client.get_project_by_id(project_id, org_id)
+        if not project:
+            raise HTTPException(status_code=404, detail="Project not found or access denied")
+
+        queued = enqueue_project_build(project_id)
+
+        return TriggerIndexBuildResponse(
+            success=True,
+            message="Index build queued" if queued else "Index build already queued",
+            project_id=project_id,
+            queued=queued
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Error queueing index build: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends
+from storage.index_registry import get_index_registry
+from storage.embeddings import get_query_batcher, get_query_embedding_cache
+from storage.phrase_catalog import get_phrase_catalog_cache
+from storage.query_cache import get_query_result_cache
+from storage.flow_index import get_flow_index_cache
+from storage.mongo_metrics import get_command_metrics
+from utils.auth import require_admin
+
+# Cache sizes and slow query samples describe every tenant's traffic, so only admins may read them
+router = APIRouter(prefix="/metrics", tags=["metrics"], dependencies=[Depends(require_admin)])
+
+@router.get("/search")
+def search_metrics():
+    """Counters for the in-process search caches"""
+    return {
+        "index_cache": get_index_registry().stats(),
+        "query_embedding_batcher": get_query_batcher().stats(),
+        "query_embedding_cache": get_query_embedding_cache().stats(),
+        "fuzzy_phrase_catalog": get_phrase_catalog_cache().stats(),
+        "query_result_cache": get_query_result_cache().stats(),
+        "flow_index": get_flow_index_cache().stats()
+    }
+
+@router.get("/mongo")
+def mongo_metrics():
+    """MongoDB command latency histograms, documents returned and slow samples for this worker"""
+    return get_command_metrics().stats()
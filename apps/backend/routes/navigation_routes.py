@@ -9,13 +9,34 @@ from models.models import (
 )
 from routes.auth_routes import get_current_user
 from storage.mongo_client import get_mongo_client
+from storage.async_mongo_client import get_async_mongo_client
+from storage.index_builder import enqueue_project_build
+from storage.index_maintenance import upsert_navigation_vectors, remove_navigation_vectors
+from storage.phrase_catalog import get_phrase_catalog_cache
+from storage.shared_index import project_index_exists
+from concurrent.futures import ThreadPoolExecutor
 import traceback
 
 router = APIRouter(prefix="/navigations", tags=["navigations"])
 mongo_client = get_mongo_client()
 
+# Single worker so index edits are applied in the order navigations were written
+index_executor = ThreadPoolExecutor(max_workers=1)
+
+def _run_index_update(func, project_id, *args):
+    """Apply an incremental index update without failing the request"""
+    try:
+        # A project without an index needs a full build, not a partial one
+        if not project_index_exists(project_id):
+            enqueue_project_build(project_id)
+            return
+        func(project_id, *args)
+    except Exception as e:
+        traceback.print_exc()
+        print(f"❌ Incremental index update failed: {e}")
+
 @router.get("", response_model=ListNavigationsResponse)
-def list_navigations(
+async def list_navigations(
     project_id: str = Query(..., description="Project ID to filter navigations"),
     user_info: dict = Depends(get_current_user)
 ):
@@ -26,7 +47,7 @@ def list_navigations(
             raise HTTPException(status_code=400, detail="Organization ID not found")
         
         # Get navigations from MongoDB
-        navigations = mongo_client.get_navigations_by_org_and_project(org_id, project_id)
+        navigations = await get_async_mongo_client().get_navigations_by_org_and_project(org_id, project_id)
         
         return ListNavigationsResponse(
             success=True,
@@ -61,6 +82,15 @@ def delete_navigation(
         if not deleted:
             raise HTTPException(status_code=500, detail="Failed to delete navigation")
         
+        # Drop the navigation's phrases from the search index
+        get_phrase_catalog_cache().invalidate(existing_navigation.get("project_id"))
+        index_executor.submit(
+            _run_index_update,
+            remove_navigation_vectors,
+            existing_navigation.get("project_id"),
+            navigation_id
+        )
+        
         return DeleteNavigationResponse(
             success=True,
             message="Navigation deleted successfully",
@@ -95,6 +125,20 @@ def create_navigation(
         if not navigation_id:
             raise HTTPException(status_code=500, detail="Failed to create navigation")
         
+        # Make the new phrases searchable without a full rebuild
+        get_phrase_catalog_cache().invalidate(request.project_id)
+        index_executor.submit(
+            _run_index_update,
+            upsert_navigation_vectors,
+            request.project_id,
+            {
+                "navigation_id": navigation_id,
+                "url": request.url,
+                "title": request.title,
+                "phrases": request.phrases
+            }
+        )
+        
         return CreateNavigationResponse(
             success=True,
             message="Navigation created successfully",
@@ -136,6 +180,20 @@ def edit_navigation(
         if not success:
             raise HTTPException(status_code=500, detail="Failed to update navigation")
         
+        # Re-embed only this navigation's phrases
+        get_phrase_catalog_cache().invalidate(project_id)
+        index_executor.submit(
+            _run_index_update,
+            upsert_navigation_vectors,
+            project_id,
+            {
+                "navigation_id": navigation_id,
+                "url": request.url,
+                "title": request.title,
+                "phrases": request.phrases
+            }
+        )
+        
         return EditNavigationResponse(
             success=True,
             message="Navigation updated successfully",
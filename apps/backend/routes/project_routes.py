@@ -5,6 +5,9 @@ from models.models import (
     UpdateProjectRequest, UpdateProjectResponse, DeleteProjectResponse
 )
 from storage.mongo_client import get_mongo_client
+from storage.async_mongo_client import get_async_mongo_client
+from storage.index_builder import enqueue_project_build
+from storage.search_utils import invalidate_project_search_mode
 from utils.auth import get_current_user
 
 router = APIRouter(prefix="/projects", tags=["projects"])
@@ -125,13 +128,13 @@ def get_default_project(
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.get("/{project_id}", response_model=ProjectInfo)
-def get_project(
+async def get_project(
     project_id: str,
     user_info: dict = Depends(get_current_user)
 ):
     """Get a specific project by ID"""
     try:
-        mongo_client = get_mongo_client()
+        mongo_client = get_async_mongo_client()
         
         # Get current user info to get org_id
         if not user_info:
@@ -142,7 +145,7 @@ def get_project(
             raise HTTPException(status_code=400, detail="User not associated with any organization")
         
         # Get project
-        project = mongo_client.get_project_by_id(project_id, org_id)
+        project = await mongo_client.get_project_by_id(project_id, org_id)
         
         if project:
             return ProjectInfo(**project)
@@ -178,10 +181,16 @@ def update_project(
             name=request.name,
             description=request.description,
             status=request.status.value if request.status else None,
-            org_id=org_id
+            org_id=org_id,
+            search_mode=request.search_mode.value if request.search_mode else None,
+            index_compression=request.index_compression.value if request.index_compression else None
         )
         
         if result["success"]:
+            invalidate_project_search_mode(project_id)
+            if request.index_compression is not None:
+                # Rebuild so the new compression setting takes effect
+                enqueue_project_build(project_id)
             return UpdateProjectResponse(
                 success=True,
                 message=result["message"],
@@ -1,27 +1,27 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query
+from fastapi.responses import JSONResponse
 from typing import Optional
-from models.models import ChatRequest, ChatResponse, QueryRequest, FeedbackRequest, FeedbackResponse, Navigation, Flow
+from models.models import BatchQueryRequest, ChatRequest, ChatResponse, QueryRequest, FeedbackRequest, FeedbackResponse, Navigation, Flow
 import uuid
 import time
-from concurrent.futures import ThreadPoolExecutor
-from storage import semantic_search_by_project
+from storage import search_by_project
+from storage.search_utils import QUERY_BATCH_MAX_SIZE, get_project_search_mode, search_batch
+from storage.query_cache import get_query_result_cache
 from storage.mongo_client import get_mongo_client
+from storage.async_mongo_client import get_async_mongo_client
 import traceback
 from llm.query_classification import classify_query
 from llm.get_help import get_help
 
 router = APIRouter(prefix="/query", tags=["query"])
 
-# Thread pool executor for background logging
-executor = ThreadPoolExecutor(max_workers=4)
-
-def log_request_background(request_id: str, project_id: str, request_query: str, 
-                          response: dict, log_type: str, time_taken: float, 
-                          error: str = None):
-    """Background function to log requests without blocking the response"""
+async def log_request_background(request_id: str, project_id: str, request_query: str, 
+                                 response: dict, log_type: str, time_taken: float, 
+                                 error: str = None):
+    """Background task to log requests after the response is sent, on the event loop"""
     try:
-        mongo_client = get_mongo_client()
-        mongo_client.create_log_entry(
+        mongo_client = get_async_mongo_client()
+        await mongo_client.create_log_entry(
             request_id=request_id,
             project_id=project_id,
             request_query=request_query,
@@ -34,9 +34,35 @@ def log_request_background(request_id: str, project_id: str, request_query: str,
     except Exception as e:
         print(f"❌ Background logging failed for request_id {request_id}: {e}")
 
+async def log_requests_background(entries: list):
+    """Background task to log a batch of requests with one bulk insert"""
+    try:
+        result = await get_async_mongo_client().create_log_entries(entries)
+        if not result["success"]:
+            print(f"❌ Background batch logging failed: {result['message']}")
+    except Exception as e:
+        print(f"❌ Background batch logging failed: {e}")
+
+def error_response(status_code: int, detail: str, background_tasks: BackgroundTasks) -> JSONResponse:
+    """Same body as HTTPException(status_code, detail), but the request's background tasks still run"""
+    return JSONResponse(status_code=status_code, content={"detail": detail}, background=background_tasks)
+
+def format_query_results(search_results: list) -> list:
+    """Format search results as /query response items"""
+    return [
+        {
+            "url": result["url"],
+            "type": "Navigate",
+            "title": result["title"],
+            "description": result["best_phrase"]  # Use best_phrase as description
+        }
+        for result in search_results
+    ]
+
 @router.post("")
 def query_endpoint(
     payload: QueryRequest,
+    background_tasks: BackgroundTasks,
     project_id: Optional[str] = Query(None, description="Project ID for filtering")
 ):
     """
@@ -51,35 +77,44 @@ def query_endpoint(
     error_message = None
     
     try:
-        # Perform fuzzy search
-        search_results = semantic_search_by_project(
-            query=payload.query,
-            project_id=project_id,
-            limit=payload.k or 4,
-            score_threshold=0
-        )
-        
-        # Format results according to the expected output
-        formatted_results = []
-        for result in search_results:
-            formatted_result = {
-                "url": result["url"],
-                "type": "Navigate",
-                "title": result["title"],
-                "description": result["best_phrase"]  # Use best_phrase as description
-            }
-            formatted_results.append(formatted_result)
+        # Dense, lexical or hybrid retrieval, per request or project setting
+        timings = {}
+        limit = payload.k or 4
+        mode = payload.mode.value if payload.mode else get_project_search_mode(project_id)
+
+        # Identical queries are served from the shared result cache until the
+        # project's navigations or index change
+        cache = get_query_result_cache()
+        lookup_started = time.perf_counter()
+        formatted_results, cache_entry = cache.get(project_id, payload.query, limit, mode)
+        timings["result_cache_ms"] = (time.perf_counter() - lookup_started) * 1000
+
+        cached = formatted_results is not None
+        if not cached:
+            search_results = search_by_project(
+                query=payload.query,
+                project_id=project_id,
+                limit=limit,
+                mode=mode,
+                timings=timings
+            )
+            
+            # Format results according to the expected output
+            formatted_results = format_query_results(search_results)
+            cache.put(cache_entry, formatted_results)
         
         response_data = {
             "status": "success",
             "message": "Query processed successfully",
             "request_id": request_id,
-            "results": formatted_results
+            "results": formatted_results,
+            "cached": cached,
+            "timings_ms": timings
         }
         
         # Log the request in background
         time_taken = time.time() - start_time
-        executor.submit(
+        background_tasks.add_task(
             log_request_background,
             request_id=request_id,
             project_id=project_id,
@@ -99,7 +134,7 @@ def query_endpoint(
         
         # Log the error in background
         time_taken = time.time() - start_time
-        executor.submit(
+        background_tasks.add_task(
             log_request_background,
             request_id=request_id,
             project_id=project_id,
@@ -110,11 +145,92 @@ def query_endpoint(
             error=error_message
         )
         
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+        return error_response(500, f"Internal server error: {str(e)}", background_tasks)
+
+@router.post("/batch")
+def query_batch_endpoint(
+    payload: BatchQueryRequest,
+    background_tasks: BackgroundTasks,
+    project_id: Optional[str] = Query(None, description="Default project ID for queries without one")
+):
+    """
+        Batch query endpoint which resolves many queries, possibly across projects, in one request.
+        Queries are embedded together and each project's index is searched once.
+    """
+    if not payload.queries:
+        raise HTTPException(status_code=400, detail="At least one query is required")
+    if len(payload.queries) > QUERY_BATCH_MAX_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {QUERY_BATCH_MAX_SIZE} queries are allowed per batch")
+    if any(not (item.project_id or project_id) for item in payload.queries):
+        raise HTTPException(status_code=400, detail="Project ID is required")
+
+    start_time = time.time()
+    requests = [
+        (item.query, item.project_id or project_id, item.k or 4, item.mode.value if item.mode else None)
+        for item in payload.queries
+    ]
+    request_ids = [str(uuid.uuid4()) for _ in requests]
+
+    try:
+        timings = {}
+        batch_results = search_batch(requests, timings=timings)
+    except Exception as e:
+        traceback.print_exc()
+        error_message = str(e)
+        print(f"❌ Error in batch query endpoint: {e}")
+
+        time_taken = time.time() - start_time
+        background_tasks.add_task(log_requests_background, [
+            {
+                "request_id": request_id,
+                "project_id": query_project_id,
+                "request_query": query,
+                "response": {"error": error_message},
+                "log_type": "query",
+                "time_taken": time_taken,
+                "error": error_message
+            }
+            for request_id, (query, query_project_id, _, _) in zip(request_ids, requests)
+        ])
+        return error_response(500, f"Internal server error: {error_message}", background_tasks)
+
+    results = [
+        {
+            "request_id": request_id,
+            "project_id": query_project_id,
+            "query": query,
+            "results": format_query_results(search_results)
+        }
+        for request_id, (query, query_project_id, _, _), search_results in zip(request_ids, requests, batch_results)
+    ]
+
+    # Log every query of the batch with one bulk insert, in background
+    time_taken = time.time() - start_time
+    background_tasks.add_task(log_requests_background, [
+        {
+            "request_id": result["request_id"],
+            "project_id": result["project_id"],
+            "request_query": result["query"],
+            "response": {"status": "success", "request_id": result["request_id"], "results": result["results"]},
+            "log_type": "query",
+            # Per-query share of the batch time
+            "time_taken": time_taken / len(results),
+            "error": None
+        }
+        for result in results
+    ])
+
+    return {
+        "status": "success",
+        "message": f"{len(results)} queries processed successfully",
+        "results": results,
+        "timings_ms": timings
+    }
 
 @router.post("/chat", response_model=ChatResponse)
 def chat_endpoint(
     payload: ChatRequest,
+    background_tasks: BackgroundTasks,
     project_id: str = Query(..., description="Project ID for filtering")
 ):
     """Chat endpoint that queries the external API"""
@@ -200,7 +316,7 @@ def chat_endpoint(
                     
         # Log the successful request in background
         time_taken = time.time() - start_time
-        executor.submit(
+        background_tasks.add_task(
             log_request_background,
             request_id=request_id,
             project_id=project_id,
@@ -220,7 +336,7 @@ def chat_endpoint(
         
         # Log the timeout error in background
         time_taken = time.time() - start_time
-        executor.submit(
+        background_tasks.add_task(
             log_request_background,
             request_id=request_id,
             project_id=project_id,
@@ -234,7 +350,7 @@ def chat_endpoint(
       
         # Log the request error in background
         time_taken = time.time() - start_time
-        executor.submit(
+        background_tasks.add_task(
             log_request_background,
             request_id=request_id,
             project_id=project_id,
@@ -245,7 +361,7 @@ def chat_endpoint(
             error=error_message
         )
         
-        raise HTTPException(status_code=500, detail=error_message)
+        return error_response(500, error_message, background_tasks)
 
 @router.post("/feedback", response_model=FeedbackResponse)
 def feedback_endpoint(
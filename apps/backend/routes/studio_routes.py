@@ -5,6 +5,7 @@ from models.models import (
     StudioConfigResponse, StudioConfigUpdateRequest, StudioConfigUpdateResponse
 )
 from storage.mongo_client import get_mongo_client
+from storage.async_mongo_client import get_async_mongo_client
 from utils.auth import get_current_user
 from llm.studio_config import generate_studio_color_config
 from utils.studio import get_screenshot_base64
@@ -70,13 +71,13 @@ def init_studio(
 
 
 @router.get("/config", response_model=StudioConfigResponse)
-def get_studio_config(
+async def get_studio_config(
     project_id: str = Query(..., description="Project ID to get studio config for"),
     user_info: dict = Depends(get_current_user)
 ):
     """Get studio configuration for a project"""
     try:
-        mongo_client = get_mongo_client()
+        mongo_client = get_async_mongo_client()
 
         # Get current user info
         if not user_info:
@@ -89,13 +90,13 @@ def get_studio_config(
                 status_code=400, detail="User not associated with any organization")
 
         # Get project info to verify access
-        project_info = mongo_client.get_project_by_id(project_id)
+        project_info = await mongo_client.get_project_by_id(project_id)
         if not project_info or project_info.get("org_id") != org_id:
             raise HTTPException(
                 status_code=404, detail="Project not found or access denied")
 
         # get config from db
-        studio_config = mongo_client.get_studio_config(project_id)
+        studio_config = await mongo_client.get_studio_config(project_id)
         if not studio_config:
             raise HTTPException(
                 status_code=404, detail="Studio config not found")
@@ -4,6 +4,7 @@ from models.models import (
     ListWorkflowsResponse, DeleteWorkflowResponse, Workflow
 )
 from storage.mongo_client import get_mongo_client
+from storage.async_mongo_client import get_async_mongo_client
 from utils.auth import get_current_user
 from llm.workflow_schema import get_workflow_schema
 
@@ -12,7 +13,7 @@ router = APIRouter(prefix="/workflows", tags=["workflows"])
 mongo_client = get_mongo_client()
 
 @router.get("/", response_model=ListWorkflowsResponse)
-def list_workflows(
+async def list_workflows(
     project_id: str = Query(..., description="Project ID is required"),
     user_info: dict = Depends(get_current_user)
 ):
@@ -27,7 +28,7 @@ def list_workflows(
             raise HTTPException(status_code=400, detail="User not associated with any organization")
         
         # Get workflows from MongoDB
-        workflows_data = mongo_client.list_workflows(org_id, project_id)
+        workflows_data = await get_async_mongo_client().list_workflows(org_id, project_id)
         
         # Convert to Workflow models
         workflows = []
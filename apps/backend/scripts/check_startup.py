@@ -0,0 +1,70 @@
+"""
+Check that importing the application stays fast and loads no heavy subsystem.
+
+    python -m scripts.check_startup [--module main] [--budget 3.0] [--runs 3]
+
+Imports the module in fresh interpreters with MongoDB pointed at an
+unreachable host, so any connection attempted at import time shows up as a
+timeout. Fails (exit code 1) when the best import time exceeds the budget or
+when the embedding model stack, FAISS or a MongoDB connection was touched
+during import. The model, FAISS and MongoDB indexes are loaded by
+warmup_storage() from the application lifespan instead.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+STARTUP_IMPORT_BUDGET_SECONDS = float(os.getenv("STARTUP_IMPORT_BUDGET_SECONDS", "3.0"))
+
+# Modules that must only be imported on first use or during warmup
+LAZY_MODULES = ("faiss", "sentence_transformers", "torch", "onnxruntime", "transformers")
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - started
+print(json.dumps({{"seconds": seconds, "loaded": [name for name in {lazy!r} if name in sys.modules]}}))
+"""
+
+
+def measure(module: str) -> dict:
+    """Import time and heavy modules loaded by importing `module` in a fresh interpreter"""
+    env = dict(os.environ,
+               # Reserved TEST-NET address: connecting at import time would block until the timeout
+               MONGO_DB_CONNECTION_STRING="mongodb://192.0.2.1:27017/startup_check",
+               MONGO_SERVER_SELECTION_TIMEOUT_MS="5000")
+    completed = subprocess.run([sys.executable, "-c", PROBE.format(module=module, lazy=LAZY_MODULES)],
+                               capture_output=True, text=True, env=env)
+    if completed.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fail if importing the application is slow or loads heavy subsystems")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--budget", type=float, default=STARTUP_IMPORT_BUDGET_SECONDS, help="seconds")
+    parser.add_argument("--runs", type=int, default=3, help="best of N imports, to ignore cold file caches")
+    args = parser.parse_args()
+
+    try:
+        results = [measure(args.module) for _ in range(args.runs)]
+    except RuntimeError as e:
+        sys.exit(f"❌ {e}")
+
+    best = min(result["seconds"] for result in results)
+    loaded = sorted({name for result in results for name in result["loaded"]})
+    failures = []
+    if best > args.budget:
+        failures.append(f"import took {best:.2f}s, budget is {args.budget:.2f}s")
+    if loaded:
+        failures.append(f"loaded at import time: {', '.join(loaded)}")
+
+    if failures:
+        for failure in failures:
+            print(f"❌ {args.module}: {failure}")
+        sys.exit(1)
+    print(f"✅ {args.module} imports in {best:.2f}s (budget {args.budget:.2f}s), no heavy modules loaded")
@@ -0,0 +1,78 @@
+"""
+Convert unversioned per-project index files to versioned artifacts with
+compact memory-mapped metadata.
+
+    python -m scripts.convert_metadata [--project-id ID]
+
+Reads faiss_indices/{project_id}.index and its JSON (or compact) metadata,
+publishes them as a new version under faiss_indices/{project_id}/ and checks
+that the index and every metadata row read back identically. The old files
+are removed only after that check passes; on failure the new version and its
+MANIFEST are removed instead, so the project keeps serving the old files.
+Running workers pick up the new version on their next request.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from storage.index_artifacts import (
+    INDEX_DIR, artifact_signature, discard_version, load_project_index, remove_legacy_files, save_project_index
+)
+from storage.index_maintenance import project_lock
+from storage.metadata_store import CompactMetadata
+
+LEGACY_SUFFIX = ".index"
+FIELDS = ("url", "title", "navigation_id", "phrase")
+
+
+def convert_project(project_id: str) -> bool:
+    """Convert one project's artifacts; returns False if the read-back check fails"""
+    with project_lock(project_id):
+        signature = artifact_signature(project_id)
+        if signature is None or not signature.version.startswith("legacy-"):
+            print(f"⏭️ {project_id}: no unversioned artifacts to convert")
+            return True
+
+        started = time.perf_counter()
+        index, metadata, params = load_project_index(project_id)
+        items = list(metadata.values()) if isinstance(metadata, CompactMetadata) else metadata
+        # Keep the unversioned files until the new version is verified
+        version = save_project_index(project_id, index, items, params, remove_legacy=False)
+
+        error = None
+        try:
+            stored_index, stored, _ = load_project_index(project_id, version=version)
+            if stored_index.ntotal != index.ntotal:
+                error = f"index has {stored_index.ntotal} vectors instead of {index.ntotal}"
+            for position, item in enumerate(items if error is None else []):
+                row = stored.get(item.get("id", position))
+                if row is None or any(row.get(field) != item.get(field) for field in FIELDS):
+                    error = f"row {position} did not round-trip"
+                    break
+        except Exception as e:
+            error = f"version {version} could not be read back: {e}"
+
+        if error:
+            discard_version(project_id, version)
+            print(f"❌ {project_id}: {error}; kept the unversioned files")
+            return False
+        remove_legacy_files(project_id)
+
+    print(f"✅ {project_id}: {len(items)} phrases converted in {time.perf_counter() - started:.2f}s")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert unversioned index files to versioned artifacts")
+    parser.add_argument("--project-id", help="convert a single project (default: all unversioned projects)")
+    args = parser.parse_args()
+
+    if args.project_id:
+        project_ids = [args.project_id]
+    else:
+        project_ids = [os.path.basename(path)[:-len(LEGACY_SUFFIX)]
+                       for path in sorted(glob.glob(os.path.join(INDEX_DIR, f"*{LEGACY_SUFFIX}")))]
+
+    failed = [project_id for project_id in project_ids if not convert_project(project_id)]
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,85 @@
+"""
+Export the sentence embedding model to ONNX, with a dynamically quantized int8 copy.
+
+    python -m scripts.export_onnx_model [--output-dir onnx_models/all-MiniLM-L6-v2]
+
+Writes model.onnx, model.int8.onnx and tokenizer.json, then checks both exports
+against the PyTorch model. The fp32 export must reach a per-vector cosine
+similarity of FP32_MIN_COSINE and the int8 export INT8_MIN_COSINE, otherwise
+the script exits non-zero.
+"""
+import argparse
+import os
+import sys
+import numpy as np
+import torch
+from onnxruntime.quantization import QuantType, quantize_dynamic
+from sentence_transformers import SentenceTransformer
+from storage.embeddings import EMBEDDING_MODEL_NAME
+from storage.onnx_embeddings import MODEL_FILES, ONNX_MODEL_DIR, OnnxEmbeddingModel
+
+FP32_MIN_COSINE = 0.9999
+INT8_MIN_COSINE = 0.98
+
+SAMPLE_PHRASES = [
+    "open dashboard",
+    "invoices",
+    "where can I change my billing address",
+    "show overdue objectives for my team",
+    "create a new project",
+    "Settings > Security > Two-factor authentication",
+    "download last month's payroll report as CSV",
+    "",
+]
+
+
+def export(output_dir: str, model_name: str = EMBEDDING_MODEL_NAME):
+    os.makedirs(output_dir, exist_ok=True)
+    model = SentenceTransformer(model_name, device="cpu")
+    transformer = model[0].auto_model.eval()
+    model.tokenizer.save_pretrained(output_dir)
+
+    inputs = model.tokenizer(["export sample"], return_tensors="pt")
+    input_names = ["input_ids", "attention_mask", "token_type_ids"]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    fp32_path = os.path.join(output_dir, MODEL_FILES["onnx"])
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(inputs[name] for name in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=17,
+        )
+    print(f"✓ Exported {fp32_path}")
+
+    int8_path = os.path.join(output_dir, MODEL_FILES["onnx-int8"])
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    print(f"✓ Quantized {int8_path}")
+    return model
+
+
+def verify(model, output_dir: str) -> bool:
+    reference = model.encode(SAMPLE_PHRASES, convert_to_numpy=True, normalize_embeddings=True)
+    ok = True
+    for variant, min_cosine in (("onnx", FP32_MIN_COSINE), ("onnx-int8", INT8_MIN_COSINE)):
+        onnx_model = OnnxEmbeddingModel(output_dir, variant=variant)
+        embeddings = onnx_model.encode(SAMPLE_PHRASES, normalize_embeddings=True)
+        cosine = float(np.min(np.sum(reference * embeddings, axis=1)))
+        passed = cosine >= min_cosine
+        ok = ok and passed
+        print(f"{'✓' if passed else '❌'} {variant}: min cosine vs PyTorch {cosine:.5f} (required {min_cosine})")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the embedding model to ONNX")
+    parser.add_argument("--output-dir", default=ONNX_MODEL_DIR)
+    args = parser.parse_args()
+
+    exported = export(args.output_dir)
+    sys.exit(0 if verify(exported, args.output_dir) else 1)
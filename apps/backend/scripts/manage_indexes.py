@@ -0,0 +1,74 @@
+"""
+Apply the declarative MongoDB index specification and verify query plans.
+
+    python -m scripts.manage_indexes apply [--dry-run] [--replace-conflicts]
+    python -m scripts.manage_indexes verify
+
+apply creates every index of storage/mongo_indexes.INDEX_SPECS that does not
+exist yet; running it again changes nothing. Indexes whose name exists with
+different keys or options are reported as conflicts (exit code 1) and only
+rebuilt with --replace-conflicts. Indexes not in the specification are listed, never
+dropped.
+
+verify explains each hot query shape against the configured database and
+exits with code 1 if any winning plan contains a COLLSCAN, so it can run in
+CI or after a deploy.
+"""
+import argparse
+import sys
+from storage.mongo_client import get_mongo_client
+from storage.mongo_indexes import apply_indexes, verify_query_plans
+
+ACTION_ICONS = {"ok": "✓", "create": "➕", "conflict": "⚠️", "extra": "·"}
+
+
+def run_apply(db, dry_run: bool, replace_conflicts: bool) -> int:
+    plan = apply_indexes(db, dry_run=dry_run, replace_conflicts=replace_conflicts)
+    failed = 0
+    for entry in plan:
+        outcome = entry.get("result", "dry run" if dry_run and entry["action"] == "create" else "")
+        failed += outcome.startswith("failed")
+        label = "not in specification" if entry["action"] == "extra" else entry["action"]
+        print(f"{ACTION_ICONS[entry['action']]} {entry['collection']}.{entry['name']}: {label}"
+              + (f" ({outcome})" if outcome else ""))
+
+    counts = {action: sum(entry["action"] == action for entry in plan) for action in ACTION_ICONS}
+    print(f"{'🔎' if dry_run else '✅'} {counts['ok']} present, {counts['create']} to create, "
+          f"{counts['conflict']} conflicting, {counts['extra']} not in specification, {failed} failed")
+    unresolved = counts["conflict"] if not replace_conflicts and not dry_run else 0
+    if unresolved:
+        print(f"⚠️ Rerun with --replace-conflicts to rebuild {unresolved} conflicting indexes")
+    return 1 if failed or unresolved else 0
+
+
+def run_verify(db) -> int:
+    results = verify_query_plans(db)
+    for result in results:
+        icon = "❌" if result["collscan"] else "✓"
+        print(f"{icon} {result['collection']}: {result['query']} -> {' > '.join(result['stages']) or 'no plan'}")
+
+    scans = [result for result in results if result["collscan"]]
+    if scans:
+        print(f"❌ {len(scans)} of {len(results)} hot queries scan a whole collection")
+        return 1
+    print(f"✅ All {len(results)} hot queries use an index")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage MongoDB indexes")
+    commands = parser.add_subparsers(dest="command", required=True)
+    apply_parser = commands.add_parser("apply", help="create missing indexes")
+    apply_parser.add_argument("--dry-run", action="store_true", help="only show what would change")
+    apply_parser.add_argument("--replace-conflicts", action="store_true",
+                              help="drop and recreate indexes whose definition changed")
+    commands.add_parser("verify", help="fail if a hot query would do a collection scan")
+    args = parser.parse_args()
+
+    mongo_client = get_mongo_client()
+    if not mongo_client.ping():
+        sys.exit("❌ MongoDB is not reachable")
+
+    if args.command == "apply":
+        sys.exit(run_apply(mongo_client.db, args.dry_run, args.replace_conflicts))
+    sys.exit(run_verify(mongo_client.db))
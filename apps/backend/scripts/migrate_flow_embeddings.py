@@ -0,0 +1,70 @@
+"""
+Convert stored flow embeddings to another encoding.
+
+    python -m scripts.migrate_flow_embeddings [--encoding float32|float16|array]
+                                              [--batch-size 500] [--dry-run]
+
+Rewrites name_embedding and description_embedding of every flow not yet in
+the target encoding (FLOW_EMBEDDING_ENCODING by default), in batches of
+unordered bulk updates. Readers accept every encoding, so the migration can
+run while the API is serving and can be resumed after an interruption;
+--encoding array converts documents back to BSON arrays. Reports the total
+document size before and after.
+"""
+import argparse
+import sys
+import time
+import bson
+from pymongo import UpdateOne
+from storage.mongo_client import get_mongo_client
+from storage.vector_codec import (
+    EMBEDDING_ENCODINGS, EMBEDDING_FIELDS, FLOW_EMBEDDING_ENCODING, decode_embedding, encode_embedding_fields
+)
+
+
+def migrate(encoding: str, batch_size: int, dry_run: bool) -> dict:
+    """Convert every flow not stored in `encoding`; returns document and byte counts"""
+    collection = get_mongo_client().flows_collection
+    query_filter = {"name_embedding": {"$exists": True}, "embedding_encoding": {"$ne": encoding}}
+    projection = {field: 1 for field in EMBEDDING_FIELDS + ("embedding_encoding",)}
+
+    counts = {"documents": 0, "bytes_before": 0, "bytes_after": 0}
+    updates = []
+
+    def flush():
+        if updates and not dry_run:
+            collection.bulk_write(updates, ordered=False)
+        updates.clear()
+
+    for document in collection.find(query_filter, projection, batch_size=batch_size):
+        stored = document.get("embedding_encoding")
+        fields = encode_embedding_fields({
+            field: decode_embedding(document.get(field), stored) for field in EMBEDDING_FIELDS
+        }, encoding)
+
+        counts["documents"] += 1
+        counts["bytes_before"] += len(bson.encode(document))
+        counts["bytes_after"] += len(bson.encode({"_id": document["_id"], **fields}))
+        # Match the stored encoding so a flow rewritten by the API meanwhile is left alone
+        updates.append(UpdateOne({"_id": document["_id"], "embedding_encoding": stored}, {"$set": fields}))
+        if len(updates) >= batch_size:
+            flush()
+    flush()
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert stored flow embeddings to another encoding")
+    parser.add_argument("--encoding", choices=EMBEDDING_ENCODINGS, default=FLOW_EMBEDDING_ENCODING)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="report sizes without writing")
+    args = parser.parse_args()
+
+    if get_mongo_client().flows_collection is None:
+        sys.exit("❌ MongoDB is not available")
+
+    started = time.perf_counter()
+    counts = migrate(args.encoding, args.batch_size, args.dry_run)
+    action = "Would convert" if args.dry_run else "Converted"
+    print(f"✅ {action} {counts['documents']} flows to {args.encoding} in {time.perf_counter() - started:.1f}s: "
+          f"embedding fields {counts['bytes_before']} -> {counts['bytes_after']} bytes")
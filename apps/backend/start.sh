@@ -36,6 +36,10 @@ else
     exit 1
 fi
 
+# Start the FAISS index builder; API workers only load the indexes it publishes
+echo "Starting index builder worker..."
+python -m storage.index_builder --all &
+
 # Start the Python application
 echo "Starting Python application..."
 exec python main.py 
\ No newline at end of file
@@ -1,8 +1,11 @@
 # Storage package for Redis, Vector, Graph, and MongoDB functionality
 
+import time
+
 from .redis_client import redis_client
 from .mongo_client import get_mongo_client
-from .search_utils import fuzzy_search_by_project, semantic_search_by_project
+from .mongo_indexes import missing_indexes
+from .search_utils import fuzzy_search_by_project, semantic_search_by_project, search_by_project
 
 def initialize_storage():
     """
@@ -23,6 +26,37 @@ def initialize_storage():
         print(f"❌ Error initializing storage systems: {e}")
         raise
 
+def warmup_storage():
+    """
+    Do the slow startup work kept out of import time: reach MongoDB and
+    check its indexes, load the embedding model and import FAISS.
+    Called from the application lifespan, in the background by default.
+    """
+    print("🔥 Warming up storage systems...")
+    started = time.perf_counter()
+    
+    try:
+        mongo_client = get_mongo_client()
+        if mongo_client.ping():
+            print("✅ MongoDB reachable")
+            # Indexes are created by a migration, not at startup; only report what is missing
+            missing = missing_indexes(mongo_client.db)
+            if missing:
+                print(f"⚠️ Missing MongoDB indexes (run: python -m scripts.manage_indexes apply): {', '.join(missing)}")
+    except Exception as e:
+        print(f"⚠️ MongoDB warmup failed: {e}")
+    
+    try:
+        # Imported here so importing storage does not load the model or FAISS
+        import faiss
+        from .embeddings import encode_phrases
+        encode_phrases(["warmup"])
+        print("✅ Embedding model and FAISS loaded")
+    except Exception as e:
+        print(f"⚠️ Embedding model warmup failed: {e}")
+    
+    print(f"🔥 Storage warmup finished in {time.perf_counter() - started:.1f}s")
+
 def get_storage_status():
     """
     Get the status of all storage systems.
@@ -56,6 +90,8 @@ __all__ = [
     'get_mongo_client',
     'fuzzy_search_by_project',
     'semantic_search_by_project',
+    'search_by_project',
     'initialize_storage',
+    'warmup_storage',
     'get_storage_status'
 ] 
\ No newline at end of file
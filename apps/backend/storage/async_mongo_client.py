@@ -0,0 +1,315 @@
+import hashlib
+from datetime import datetime
+from typing import Optional, List
+from pymongo import AsyncMongoClient
+from storage.mongo_client import MONGO_SERVER_SELECTION_TIMEOUT_MS, mongo_connection_string
+from storage.mongo_metrics import mongo_event_listeners
+
+
+class AsyncMongoDBClient:
+    """
+    Async counterpart of MongoDBClient for the hot request paths.
+
+    Methods mirror the MongoDBClient methods of the same name, with the same
+    arguments and return values, so async route handlers can await them
+    instead of holding a thread pool worker while MongoDB answers.
+    """
+
+    def __init__(self):
+        self.client = None
+        self.db = None
+        self._connect()
+
+    def _connect(self):
+        """Configure the async client; it connects on the first operation"""
+        try:
+            self.client = AsyncMongoClient(
+                mongo_connection_string(),
+                serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                event_listeners=mongo_event_listeners()
+            )
+
+            # Use trail_blazer database
+            self.db = self.client.trail_blazer
+            self.api_keys_collection = self.db.api_keys
+            self.projects_collection = self.db.projects
+            self.app_navigations_collection = self.db.app_navigations
+            self.logs_collection = self.db.logs
+            self.studio_config_collection = self.db.studio_config
+            self.workflows_collection = self.db.workflows
+
+            print("✅ Async MongoDB client configured")
+
+        except Exception as e:
+            print(f"❌ Failed to configure async MongoDB client: {e}")
+            self.client = None
+            self.db = None
+
+    def is_connected(self) -> bool:
+        """Check if the async client is configured"""
+        return self.client is not None and self.db is not None
+
+    async def close(self):
+        """Close the async MongoDB connection"""
+        if self.client:
+            await self.client.close()
+            print("📦 Async MongoDB connection closed")
+
+    async def validate_api_key(self, api_key: str) -> Optional[dict]:
+        """Validate an API key and return key info"""
+        if not self.is_connected():
+            return None
+
+        try:
+            hashed_key = hashlib.sha256(api_key.encode()).hexdigest()
+
+            # Find active API key
+            api_key_doc = await self.api_keys_collection.find_one({
+                "hashed_key": hashed_key,
+                "is_active": True
+            })
+
+            if not api_key_doc:
+                return None
+
+            # Check if key is expired
+            if api_key_doc.get("expires_at") and datetime.utcnow() > api_key_doc["expires_at"]:
+                # Deactivate expired key
+                await self.api_keys_collection.update_one(
+                    {"key_id": api_key_doc["key_id"]},
+                    {"$set": {"is_active": False}}
+                )
+                return None
+
+            # Update last used timestamp
+            await self.api_keys_collection.update_one(
+                {"key_id": api_key_doc["key_id"]},
+                {"$set": {"last_used": datetime.utcnow()}}
+            )
+
+            return {
+                "key_id": api_key_doc["key_id"],
+                "name": api_key_doc["name"],
+                "org_id": api_key_doc.get("org_id"),
+                "created_by_user_id": api_key_doc.get("created_by_user_id")
+            }
+
+        except Exception as e:
+            print(f"Error validating API key: {e}")
+            return None
+
+    async def get_navigations_by_org_and_project(self, org_id: Optional[str], project_id: str) -> List[dict]:
+        """Get all navigations for an organization and project"""
+        try:
+            print(f"🔍 Async MongoDB get_navigations_by_org_and_project called for org_id: {org_id}, project_id: {project_id}")
+
+            query_filter = {"project_id": project_id}
+            if org_id:
+                query_filter["org_id"] = org_id
+
+            cursor = self.app_navigations_collection.find(query_filter).sort([("created_at", 1)])
+            return await cursor.to_list()
+
+        except Exception as e:
+            print(f"❌ Error getting navigations: {e}")
+            return []
+
+    async def get_project_by_id(self, project_id: str, org_id: Optional[str] = None) -> Optional[dict]:
+        """Get project by project_id"""
+        print(f"🔍 Async MongoDB get_project_by_id called for project_id: {project_id}")
+
+        if not self.is_connected():
+            return None
+
+        try:
+            # Build query filter
+            query_filter = {"project_id": project_id}
+            if org_id:
+                query_filter["org_id"] = org_id
+
+            project = await self.projects_collection.find_one(query_filter, {"_id": 0})
+
+            if project:
+                print(f"✅ Project found: {project_id}")
+                return project
+            else:
+                print(f"❌ Project not found: {project_id}")
+                return None
+
+        except Exception as e:
+            print(f"❌ Error retrieving project: {e}")
+            return None
+
+    def _log_document(self, entry: dict, now: datetime) -> dict:
+        return {
+            "request_id": entry["request_id"],
+            "created_at": now,
+            "updated_at": now,
+            "project_id": entry["project_id"],
+            "request_query": entry["request_query"],
+            "response": entry["response"],
+            "type": entry["log_type"],
+            "feedback_response": None,  # Default to None
+            "time_taken": entry["time_taken"],
+            "error": entry.get("error")
+        }
+
+    async def create_log_entry(self, request_id: str, project_id: str, request_query: str, response: dict,
+                               log_type: str, time_taken: float, error: Optional[str] = None) -> dict:
+        """Create a new log entry for query or chat requests"""
+        print(f"📝 Creating log entry for request_id: {request_id}, type: {log_type}")
+
+        if not self.is_connected():
+            return {
+                "success": False,
+                "message": "Database connection not available"
+            }
+
+        try:
+            log_entry = self._log_document({
+                "request_id": request_id,
+                "project_id": project_id,
+                "request_query": request_query,
+                "response": response,
+                "log_type": log_type,
+                "time_taken": time_taken,
+                "error": error
+            }, datetime.utcnow())
+
+            result = await self.logs_collection.insert_one(log_entry)
+
+            if result.inserted_id:
+                print(f"✅ Log entry created successfully for request_id: {request_id}")
+                return {
+                    "success": True,
+                    "message": "Log entry created successfully",
+                    "log_id": str(result.inserted_id)
+                }
+            else:
+                return {
+                    "success": False,
+                    "message": "Failed to create log entry"
+                }
+
+        except Exception as e:
+            print(f"❌ Error creating log entry: {e}")
+            return {
+                "success": False,
+                "message": "Internal server error"
+            }
+
+    async def create_log_entries(self, entries: list) -> dict:
+        """Create many log entries with one bulk insert (see MongoDBClient.create_log_entries)"""
+        print(f"📝 Creating {len(entries)} log entries")
+
+        if not self.is_connected():
+            return {
+                "success": False,
+                "message": "Database connection not available"
+            }
+
+        if not entries:
+            return {
+                "success": True,
+                "message": "No log entries to create",
+                "inserted_count": 0
+            }
+
+        try:
+            now = datetime.utcnow()
+            result = await self.logs_collection.insert_many(
+                [self._log_document(entry, now) for entry in entries], ordered=False
+            )
+
+            print(f"✅ Created {len(result.inserted_ids)} log entries")
+            return {
+                "success": True,
+                "message": "Log entries created successfully",
+                "inserted_count": len(result.inserted_ids)
+            }
+
+        except Exception as e:
+            print(f"❌ Error creating log entries: {e}")
+            return {
+                "success": False,
+                "message": "Internal server error"
+            }
+
+    async def list_workflows(self, org_id: str, project_id: str) -> List[dict]:
+        """List all workflows for an organization"""
+        try:
+            print(f"📋 Async MongoDB list_workflows called for org_id: {org_id}")
+
+            if not self.is_connected():
+                print("❌ Database connection not available")
+                return []
+
+            # Build query filter
+            query_filter = {"org_id": org_id}
+            if project_id:
+                query_filter["project_id"] = project_id
+
+            # For Azure Cosmos DB, we'll get all results and sort in memory to avoid indexing issues
+            workflows = await self.workflows_collection.find(query_filter).to_list()
+
+            # Sort by created_at in memory (newest first)
+            workflows.sort(key=lambda x: x.get("created_at", datetime.min), reverse=True)
+
+            # Convert ObjectId to string for JSON serialization
+            for workflow in workflows:
+                if "_id" in workflow:
+                    workflow["_id"] = str(workflow["_id"])
+
+            print(f"✅ Found {len(workflows)} workflows")
+            return workflows
+
+        except Exception as e:
+            print(f"❌ Error listing workflows: {e}")
+            return []
+
+    async def get_studio_config(self, project_id: str, org_id: Optional[str] = None) -> Optional[dict]:
+        """Get studio config for a project"""
+        print(f"🔍 Async MongoDB get_studio_config called for project_id: {project_id}")
+
+        if not self.is_connected():
+            return None
+
+        try:
+            # Build query filter
+            query_filter = {"project_id": project_id}
+            if org_id:
+                query_filter["org_id"] = org_id
+
+            config_doc = await self.studio_config_collection.find_one(query_filter, {"config": 1})
+
+            if config_doc:
+                # Return only the config field, not the entire document
+                print(f"✅ Studio config found for project: {project_id}")
+                return config_doc.get("config")
+            else:
+                print(f"❌ Studio config not found for project: {project_id}")
+                return None
+
+        except Exception as e:
+            print(f"❌ Error retrieving studio config: {e}")
+            return None
+
+
+# Created on first use, inside the event loop that serves requests
+async_mongo_client = None
+
+
+def get_async_mongo_client() -> AsyncMongoDBClient:
+    """Get the global async MongoDB client instance, creating it on first use"""
+    global async_mongo_client
+    if async_mongo_client is None:
+        async_mongo_client = AsyncMongoDBClient()
+    return async_mongo_client
+
+
+async def close_async_mongo_client():
+    """Close the global async MongoDB client if it was created"""
+    global async_mongo_client
+    if async_mongo_client is not None:
+        await async_mongo_client.close()
+        async_mongo_client = None
@@ -0,0 +1,163 @@
+"""
+Persistent, content-addressed store of phrase embeddings.
+
+Vectors are keyed by hash(model id + normalized phrase), so rebuilding an
+index or re-saving a navigation only runs the model on phrases it has never
+seen. Unreferenced vectors are removed with:
+
+    python -m storage.embedding_store --gc
+"""
+import argparse
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+from storage.embeddings import EMBEDDING_MODEL_ID, encode_phrases, normalize_query
+from storage.index_artifacts import INDEX_DIR
+from storage.mongo_client import get_mongo_client
+
+EMBEDDING_STORE_PATH = os.getenv("EMBEDDING_STORE_PATH", os.path.join(INDEX_DIR, "embeddings.sqlite"))
+EMBEDDING_STORE_ENABLED = os.getenv("EMBEDDING_STORE_ENABLED", "true").lower() == "true"
+
+# SQLite limits the number of bound parameters per statement
+_LOOKUP_CHUNK = 500
+
+
+class EmbeddingStore:
+    """SQLite-backed map from phrase key to float32 embedding, shared by all processes on the host"""
+
+    def __init__(self, path: str, model_id: str):
+        self.path = path
+        self.model_id = model_id
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30)
+            # WAL lets API workers read while the builder writes
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key BLOB PRIMARY KEY, vector BLOB NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._local.connection = connection
+        return connection
+
+    def key(self, phrase: str) -> bytes:
+        """Content address of a phrase's embedding under the current model"""
+        return hashlib.sha1(f"{self.model_id}\0{normalize_query(phrase)}".encode()).digest()
+
+    def get_many(self, keys: list) -> dict:
+        """Return {key: vector} for the keys that are stored"""
+        connection = self._connection()
+        found = {}
+        for start in range(0, len(keys), _LOOKUP_CHUNK):
+            chunk = keys[start:start + _LOOKUP_CHUNK]
+            rows = connection.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+            )
+            for key, vector in rows:
+                found[bytes(key)] = np.frombuffer(vector, dtype=np.float32)
+        return found
+
+    def put_many(self, keys: list, embeddings: np.ndarray):
+        """Store embeddings for their keys"""
+        connection = self._connection()
+        now = time.time()
+        with connection:
+            connection.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, created_at) VALUES (?, ?, ?)",
+                [(key, np.ascontiguousarray(vector, dtype=np.float32).tobytes(), now)
+                 for key, vector in zip(keys, embeddings)]
+            )
+
+    def embed(self, phrases: list):
+        """
+        Return (embeddings, reused) for phrases, in order.
+
+        Stored vectors are reused; the remaining distinct phrases are encoded
+        in one call and stored. `reused` counts phrases served from the store.
+        """
+        if not phrases:
+            return encode_phrases([]), 0
+
+        keys = [self.key(phrase) for phrase in phrases]
+        found = self.get_many(list(set(keys)))
+
+        missing = {}
+        for key, phrase in zip(keys, phrases):
+            if key not in found and key not in missing:
+                missing[key] = phrase
+
+        if missing:
+            encoded = encode_phrases(list(missing.values()))
+            self.put_many(list(missing), encoded)
+            found.update(zip(missing, encoded))
+
+        reused = sum(1 for key in keys if key not in missing)
+        return np.vstack([found[key] for key in keys]).astype(np.float32, copy=False), reused
+
+    def collect_garbage(self, live_phrases) -> int:
+        """Delete vectors whose phrase is not in `live_phrases`; returns the number removed"""
+        connection = self._connection()
+        with connection:
+            connection.execute("CREATE TEMP TABLE IF NOT EXISTS live_keys (key BLOB PRIMARY KEY)")
+            connection.execute("DELETE FROM live_keys")
+            connection.executemany(
+                "INSERT OR IGNORE INTO live_keys (key) VALUES (?)",
+                ((self.key(phrase),) for phrase in live_phrases)
+            )
+            removed = connection.execute(
+                "DELETE FROM embeddings WHERE key NOT IN (SELECT key FROM live_keys)"
+            ).rowcount
+        connection.execute("VACUUM")
+        return removed
+
+    def stats(self) -> dict:
+        """Return the number of stored vectors and the file size"""
+        count = self._connection().execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return {
+            "path": self.path,
+            "vectors": count,
+            "size_bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        }
+
+
+embedding_store = EmbeddingStore(EMBEDDING_STORE_PATH, EMBEDDING_MODEL_ID)
+
+
+def get_embedding_store() -> EmbeddingStore:
+    """Get the process-wide embedding store"""
+    return embedding_store
+
+
+def embed_phrases(phrases: list):
+    """Embed phrases for indexing, reusing stored vectors; returns (embeddings, reused count)"""
+    if not EMBEDDING_STORE_ENABLED:
+        return encode_phrases(phrases), 0
+    return embedding_store.embed(phrases)
+
+
+def _live_phrases():
+    """Every phrase currently referenced by a navigation"""
+    collection = get_mongo_client().client["trail_blazer"]["app_navigations"]
+    for doc in collection.find({}, {"_id": 0, "phrases": 1}):
+        yield from doc.get("phrases") or []
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Phrase embedding store maintenance")
+    parser.add_argument("--gc", action="store_true", help="delete vectors no navigation references")
+    args = parser.parse_args()
+
+    if args.gc:
+        removed = embedding_store.collect_garbage(_live_phrases())
+        print(f"🧹 Removed {removed} unreferenced embeddings")
+    print(embedding_store.stats())
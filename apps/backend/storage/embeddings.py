@@ -0,0 +1,305 @@
+import hashlib
+import os
+import queue
+import threading
+import time
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Optional
+from storage.redis_client import redis_binary_client
+
+# Sentence embedding model shared by index building and query encoding
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+
+# Inference backend: "torch" (SentenceTransformer), "onnx" or "onnx-int8" (ONNX Runtime)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+
+# Identifies the vectors a backend produces, for cache keys
+EMBEDDING_MODEL_ID = EMBEDDING_MODEL_NAME if EMBEDDING_BACKEND == "torch" else f"{EMBEDDING_MODEL_NAME}:{EMBEDDING_BACKEND}"
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def load_embedding_model(backend: str = EMBEDDING_BACKEND):
+    """Load the embedding model for a backend"""
+    if backend == "torch":
+        # Imported here so the ONNX backends never load PyTorch
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(EMBEDDING_MODEL_NAME)
+    if backend in ("onnx", "onnx-int8"):
+        from storage.onnx_embeddings import OnnxEmbeddingModel
+        return OnnxEmbeddingModel(variant=backend)
+    raise ValueError(f"Unknown EMBEDDING_BACKEND: {backend}")
+
+
+def get_embedding_model():
+    """Get the process-wide embedding model, loading it on first use"""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = load_embedding_model()
+                print(f"✅ Loaded embedding model {EMBEDDING_MODEL_NAME} ({EMBEDDING_BACKEND} backend)")
+    return _model
+
+
+def encode_phrases(phrases: list):
+    """Encode phrases into normalized float32 embeddings"""
+    return get_embedding_model().encode(phrases, convert_to_numpy=True, normalize_embeddings=True)
+
+
+# Queries arriving within this window are encoded together in one forward pass
+EMBED_BATCH_WINDOW_MS = float(os.getenv("EMBED_BATCH_WINDOW_MS", "2"))
+EMBED_BATCH_MAX_SIZE = int(os.getenv("EMBED_BATCH_MAX_SIZE", "32"))
+
+# Upper bounds of the batch-size histogram buckets
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class QueryEmbeddingBatcher:
+    """
+    Micro-batches query embeddings across concurrent requests.
+
+    Request threads enqueue their text and block on a future; a single
+    background thread drains the queue for up to `window_ms` (or until
+    `max_batch_size` queries are waiting), encodes the batch in one call and
+    hands each row back to its caller.
+    """
+
+    def __init__(self, encode, window_ms: float, max_batch_size: int):
+        self._encode = encode
+        self.window_seconds = window_ms / 1000
+        self.max_batch_size = max(1, max_batch_size)
+        self._queue = queue.Queue()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.queries = 0
+        self.queue_wait_seconds = 0.0
+        self.max_queue_wait_seconds = 0.0
+        self.batch_size_histogram = {str(bucket): 0 for bucket in BATCH_SIZE_BUCKETS}
+        self.batch_size_histogram["inf"] = 0
+
+    def encode(self, text: str) -> np.ndarray:
+        """Encode a single query, sharing a forward pass with concurrent callers"""
+        self._ensure_started()
+        future = Future()
+        self._queue.put((text, time.perf_counter(), future))
+        return future.result()
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._thread_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="query-embedding-batcher", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.window_seconds
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._process(batch)
+
+    def _process(self, batch: list):
+        started = time.perf_counter()
+        self._record(batch, started)
+        try:
+            embeddings = self._encode([text for text, _, _ in batch])
+        except Exception as e:
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        for row, (_, _, future) in enumerate(batch):
+            future.set_result(embeddings[row:row + 1])
+
+    def _record(self, batch: list, started: float):
+        waits = [started - enqueued for _, enqueued, _ in batch]
+        bucket = next((str(b) for b in BATCH_SIZE_BUCKETS if len(batch) <= b), "inf")
+        with self._stats_lock:
+            self.batches += 1
+            self.queries += len(batch)
+            self.queue_wait_seconds += sum(waits)
+            self.max_queue_wait_seconds = max(self.max_queue_wait_seconds, max(waits))
+            self.batch_size_histogram[bucket] += 1
+
+    def stats(self) -> dict:
+        """Return batch-size and queue-wait metrics"""
+        with self._stats_lock:
+            return {
+                "window_ms": self.window_seconds * 1000,
+                "max_batch_size": self.max_batch_size,
+                "batches": self.batches,
+                "queries": self.queries,
+                "avg_batch_size": self.queries / self.batches if self.batches else 0.0,
+                "batch_size_histogram": dict(self.batch_size_histogram),
+                "avg_queue_wait_ms": self.queue_wait_seconds / self.queries * 1000 if self.queries else 0.0,
+                "max_queue_wait_ms": self.max_queue_wait_seconds * 1000,
+                "queue_depth": self._queue.qsize()
+            }
+
+
+query_batcher = QueryEmbeddingBatcher(
+    encode_phrases,
+    window_ms=EMBED_BATCH_WINDOW_MS,
+    max_batch_size=EMBED_BATCH_MAX_SIZE
+)
+
+
+# In-process LRU of query embeddings, plus an optional Redis layer shared by all workers
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "10000"))
+QUERY_EMBEDDING_REDIS_CACHE = os.getenv("QUERY_EMBEDDING_REDIS_CACHE", "false").lower() == "true"
+QUERY_EMBEDDING_REDIS_TTL_SECONDS = int(os.getenv("QUERY_EMBEDDING_REDIS_TTL_SECONDS", str(7 * 24 * 3600)))
+
+
+def normalize_query(query: str) -> str:
+    """Normalize query text for cache lookups (the MiniLM tokenizer is uncased)"""
+    return " ".join(query.lower().split())
+
+
+class QueryEmbeddingCache:
+    """Two-level cache of query embeddings keyed by model name and normalized text"""
+
+    def __init__(self, model_name: str, max_entries: int, redis_client=None, redis_ttl: int = 0):
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.redis_client = redis_client
+        self.redis_ttl = redis_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.redis_errors = 0
+
+    def _key(self, query: str) -> str:
+        digest = hashlib.sha1(normalize_query(query).encode()).hexdigest()
+        return f"qemb:{self.model_name}:{digest}"
+
+    def get(self, query: str) -> Optional[np.ndarray]:
+        """Return the cached (1, dimension) embedding for a query, if any"""
+        key = self._key(query)
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is not None:
+                self._entries.move_to_end(key)
+                self.local_hits += 1
+                return embedding
+
+        if self.redis_client is not None:
+            try:
+                raw = self.redis_client.get(key)
+            except Exception as e:
+                raw = None
+                with self._lock:
+                    self.redis_errors += 1
+                print(f"⚠️ Query embedding cache lookup failed: {e}")
+            if raw:
+                embedding = np.frombuffer(raw, dtype=np.float32).reshape(1, -1)
+                self._store_local(key, embedding)
+                with self._lock:
+                    self.redis_hits += 1
+                return embedding
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, query: str, embedding: np.ndarray):
+        """Cache a query embedding in both levels"""
+        key = self._key(query)
+        embedding = np.ascontiguousarray(embedding, dtype=np.float32).reshape(1, -1)
+        self._store_local(key, embedding)
+
+        if self.redis_client is not None:
+            try:
+                self.redis_client.set(key, embedding.tobytes(), ex=self.redis_ttl or None)
+            except Exception as e:
+                with self._lock:
+                    self.redis_errors += 1
+                print(f"⚠️ Query embedding cache write failed: {e}")
+
+    def _store_local(self, key: str, embedding: np.ndarray):
+        with self._lock:
+            self._entries[key] = embedding
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        """Return hit counters for both cache levels"""
+        with self._lock:
+            lookups = self.local_hits + self.redis_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "redis_enabled": self.redis_client is not None,
+                "local_hits": self.local_hits,
+                "redis_hits": self.redis_hits,
+                "misses": self.misses,
+                "redis_errors": self.redis_errors,
+                "hit_ratio": (self.local_hits + self.redis_hits) / lookups if lookups else 0.0
+            }
+
+
+query_embedding_cache = QueryEmbeddingCache(
+    EMBEDDING_MODEL_ID,
+    max_entries=QUERY_EMBEDDING_CACHE_SIZE,
+    redis_client=redis_binary_client if QUERY_EMBEDDING_REDIS_CACHE else None,
+    redis_ttl=QUERY_EMBEDDING_REDIS_TTL_SECONDS
+)
+
+
+def encode_query(query: str) -> np.ndarray:
+    """Encode a search query into a (1, dimension) normalized embedding"""
+    embedding = query_embedding_cache.get(query)
+    if embedding is not None:
+        return embedding
+
+    if EMBED_BATCH_MAX_SIZE <= 1:
+        embedding = encode_phrases([query])
+    else:
+        embedding = query_batcher.encode(query)
+
+    query_embedding_cache.put(query, embedding)
+    return embedding
+
+
+def encode_queries(queries: list) -> np.ndarray:
+    """
+    Encode many search queries into an (n, dimension) matrix.
+
+    Cached queries are reused; the rest are encoded together in one forward
+    pass, bypassing the query batcher since they already form a batch.
+    """
+    embeddings = [query_embedding_cache.get(query) for query in queries]
+    missing = list(dict.fromkeys(query for query, embedding in zip(queries, embeddings) if embedding is None))
+    if missing:
+        encoded = {}
+        for query, embedding in zip(missing, encode_phrases(missing)):
+            encoded[query] = embedding.reshape(1, -1)
+            query_embedding_cache.put(query, encoded[query])
+        embeddings = [encoded[query] if embedding is None else embedding
+                      for query, embedding in zip(queries, embeddings)]
+    return np.ascontiguousarray(np.vstack(embeddings), dtype=np.float32)
+
+
+def get_query_batcher() -> QueryEmbeddingBatcher:
+    """Get the process-wide query embedding batcher"""
+    return query_batcher
+
+
+def get_query_embedding_cache() -> QueryEmbeddingCache:
+    """Get the process-wide query embedding cache"""
+    return query_embedding_cache
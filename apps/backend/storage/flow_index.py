@@ -0,0 +1,285 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+import numpy as np
+from storage.redis_client import redis_client
+from storage.vector_codec import decode_embedding
+
+# Organizations whose flow embeddings stay in memory, and how long a matrix may
+# be served before it is re-read. Writes made through other workers are noticed
+# through the organization's shared flow version; the TTL only matters when
+# Redis is unavailable.
+FLOW_INDEX_CACHE_SIZE = int(os.getenv("FLOW_INDEX_CACHE_SIZE", "256"))
+FLOW_INDEX_TTL_SECONDS = int(os.getenv("FLOW_INDEX_TTL_SECONDS", "300"))
+
+# Per-organization flow write counter, shared by all workers
+VERSION_KEY = "flows:version:{org_id}"
+
+# Fields read from flow documents; the rest of each result comes from these
+FLOW_INDEX_PROJECTION = {
+    "_id": 0,
+    "flow_id": 1,
+    "org_id": 1,
+    "project_id": 1,
+    "status": 1,
+    "name": 1,
+    "description": 1,
+    "name_embedding": 1,
+    "description_embedding": 1,
+    "embedding_encoding": 1,
+    "created_at": 1,
+    "points_count": 1
+}
+RESULT_FIELDS = ("flow_id", "name", "description", "created_at", "points_count")
+
+
+def is_searchable(flow: Optional[dict]) -> bool:
+    """Whether a flow document takes part in embedding search"""
+    return flow is not None and "name_embedding" in flow and flow.get("status") != "discarded"
+
+
+def _decoded(flows: list, field: str) -> list:
+    """A field's embeddings of each flow as float32 arrays, whatever encoding they are stored in"""
+    return [decode_embedding(flow.get(field), flow.get("embedding_encoding")) for flow in flows]
+
+
+def _unit_rows(vectors: list, dimension: int) -> np.ndarray:
+    """Stack decoded embeddings as L2-normalized float32 rows; missing or mismatched ones become zero rows"""
+    rows = np.zeros((len(vectors), dimension), dtype=np.float32)
+    for row, vector in enumerate(vectors):
+        if vector is not None and len(vector) == dimension:
+            rows[row] = vector
+    norms = np.linalg.norm(rows, axis=1, keepdims=True)
+    np.divide(rows, norms, out=rows, where=norms > 0)
+    return rows
+
+
+class FlowEmbeddingMatrix:
+    """
+    Searchable flows of one organization with pre-normalized name and
+    description embeddings, so a search is two matrix-vector products.
+
+    Matrices are never modified in place: writers build a new one with
+    with_flow() / without_flow(), so searches need no lock.
+    """
+
+    def __init__(self, flows: list, names: np.ndarray = None, descriptions: np.ndarray = None):
+        self.flows = [{field: flow.get(field) for field in RESULT_FIELDS + ("project_id",)} for flow in flows]
+        self.positions = {flow["flow_id"]: row for row, flow in enumerate(self.flows)}
+        self.project_ids = np.array([flow["project_id"] for flow in self.flows], dtype=object)
+
+        if names is None:
+            name_vectors = _decoded(flows, "name_embedding")
+            dimension = next((len(vector) for vector in name_vectors if vector is not None), 0)
+            names = _unit_rows(name_vectors, dimension)
+            descriptions = _unit_rows(_decoded(flows, "description_embedding"), dimension)
+        self.names = names
+        self.descriptions = descriptions
+        self.loaded_at = time.monotonic()
+        # Organization flow version (see FlowIndexCache) the matrix is current with
+        self.version = None
+
+    def __len__(self):
+        return len(self.flows)
+
+    @property
+    def dimension(self) -> int:
+        return self.names.shape[1]
+
+    def __contains__(self, flow_id: str) -> bool:
+        return flow_id in self.positions
+
+    def without_flow(self, flow_id: str) -> "FlowEmbeddingMatrix":
+        """Copy of this matrix without a flow"""
+        row = self.positions[flow_id]
+        matrix = FlowEmbeddingMatrix(self.flows[:row] + self.flows[row + 1:],
+                                     np.delete(self.names, row, axis=0),
+                                     np.delete(self.descriptions, row, axis=0))
+        matrix.loaded_at = self.loaded_at
+        matrix.version = self.version
+        return matrix
+
+    def with_flow(self, flow: dict) -> "FlowEmbeddingMatrix":
+        """Copy of this matrix with a flow added or replaced"""
+        base = self.without_flow(flow["flow_id"]) if flow["flow_id"] in self else self
+        if not len(base):
+            matrix = FlowEmbeddingMatrix([flow])
+        else:
+            matrix = FlowEmbeddingMatrix(
+                base.flows + [flow],
+                np.vstack([base.names, _unit_rows(_decoded([flow], "name_embedding"), base.dimension)]),
+                np.vstack([base.descriptions, _unit_rows(_decoded([flow], "description_embedding"), base.dimension)])
+            )
+        matrix.loaded_at = self.loaded_at
+        matrix.version = self.version
+        return matrix
+
+    def search(self, query_embedding: list, limit: int, min_score: float, project_id: Optional[str] = None) -> list:
+        """Flows whose name or description is at least min_score similar to the query, best first"""
+        if not len(self) or limit <= 0:
+            return []
+
+        query = np.zeros(self.dimension, dtype=np.float32)
+        if query_embedding is not None and len(query_embedding) == self.dimension:
+            query[:] = query_embedding
+            norm = np.linalg.norm(query)
+            if norm > 0:
+                query /= norm
+
+        name_scores = self.names @ query
+        description_scores = self.descriptions @ query
+        scores = np.maximum(name_scores, description_scores)
+
+        eligible = scores >= min_score
+        if project_id:
+            eligible &= self.project_ids == project_id
+        candidates = np.flatnonzero(eligible)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+
+        results = []
+        for row in candidates:
+            flow = self.flows[row]
+            results.append({
+                **{field: flow[field] for field in RESULT_FIELDS},
+                "similarity_score": float(scores[row]),
+                "name_similarity": float(name_scores[row]),
+                "description_similarity": float(description_scores[row])
+            })
+        return results
+
+
+class FlowIndexCache:
+    """
+    Per-process LRU of organization flow matrices, updated by the flow writers.
+
+    Every write also bumps the organization's flow version in Redis, and a
+    matrix is reloaded once that version no longer matches the one it was
+    loaded (or last updated) at, so writes made through other workers are
+    picked up on the next search.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int, client=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.client = client
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped on every write so a matrix loaded concurrently with a write is not cached
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.updates = 0
+        self.errors = 0
+
+    def _version(self, org_id: str) -> Optional[str]:
+        """The organization's shared flow version, or None if Redis is unavailable"""
+        if self.client is None:
+            return None
+        try:
+            return self.client.get(VERSION_KEY.format(org_id=org_id)) or "0"
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            print(f"⚠️ Could not read the flow version of organization {org_id}: {e}")
+            return None
+
+    def _bump_version(self, org_id: str) -> Optional[str]:
+        """Increment the organization's shared flow version; returns the new one, or None if Redis is unavailable"""
+        if self.client is None:
+            return None
+        try:
+            return str(self.client.incr(VERSION_KEY.format(org_id=org_id)))
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            print(f"⚠️ Could not bump the flow version of organization {org_id}: {e}")
+            return None
+
+    def get(self, org_id: str, load: Callable) -> FlowEmbeddingMatrix:
+        """Return an organization's flow matrix, building it from load() (an iterable of flow documents) if needed"""
+        version = self._version(org_id)
+        with self._lock:
+            matrix = self._entries.get(org_id)
+            if (matrix is not None and time.monotonic() - matrix.loaded_at < self.ttl_seconds
+                    and (version is None or matrix.version == version)):
+                self._entries.move_to_end(org_id)
+                self.hits += 1
+                return matrix
+            self.misses += 1
+            writes = self._writes
+
+        matrix = FlowEmbeddingMatrix(list(load()))
+        matrix.version = version
+
+        with self._lock:
+            if self._writes == writes:
+                self._entries[org_id] = matrix
+                self._entries.move_to_end(org_id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return matrix
+
+    def update_flow(self, flow_id: str, flow: Optional[dict]):
+        """Apply a flow's current document (None if it no longer exists) to the cached matrices"""
+        with self._lock:
+            org_ids = {org_id for org_id, matrix in self._entries.items() if flow_id in matrix}
+        if flow is not None and flow.get("org_id"):
+            org_ids.add(flow["org_id"])
+        # Bumped before the local update, so the matrices updated below can be tagged with the new versions
+        versions = {org_id: self._bump_version(org_id) for org_id in org_ids}
+
+        with self._lock:
+            self._writes += 1
+            self.updates += 1
+            for org_id, matrix in list(self._entries.items()):
+                if flow_id in matrix and not (is_searchable(flow) and flow.get("org_id") == org_id):
+                    self._entries[org_id] = matrix.without_flow(flow_id)
+            if is_searchable(flow) and flow.get("org_id") in self._entries:
+                self._entries[flow["org_id"]] = self._entries[flow["org_id"]].with_flow(flow)
+
+            for org_id, version in versions.items():
+                matrix = self._entries.get(org_id)
+                if matrix is None or version is None:
+                    continue
+                if matrix.version is not None and int(matrix.version) + 1 == int(version):
+                    matrix.version = version
+                else:
+                    # Another worker wrote to the organization too: re-read it on the next search
+                    del self._entries[org_id]
+
+    def clear(self):
+        """Drop every matrix so the next searches re-read them"""
+        with self._lock:
+            self._writes += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Return cache counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "flows": sum(len(matrix) for matrix in self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "updates": self.updates,
+                "errors": self.errors,
+                "hit_ratio": self.hits / lookups if lookups else 0.0
+            }
+
+
+flow_index_cache = FlowIndexCache(
+    max_entries=FLOW_INDEX_CACHE_SIZE,
+    ttl_seconds=FLOW_INDEX_TTL_SECONDS,
+    client=redis_client
+)
+
+
+def get_flow_index_cache() -> FlowIndexCache:
+    """Get the process-wide flow embedding cache"""
+    return flow_index_cache
@@ -0,0 +1,317 @@
+import json
+import os
+import shutil
+import time
+import uuid
+from collections import namedtuple
+from typing import Optional
+from storage.metadata_store import CompactMetadata, write_compact_metadata
+
+# Directory holding the per-project FAISS index and metadata files
+INDEX_DIR = os.getenv("FAISS_INDEX_DIR", "faiss_indices")
+
+# "per_project" (one index per project) or "shared" (multi-tenant shards, see storage/shared_index.py)
+FAISS_STORAGE_MODE = os.getenv("FAISS_STORAGE_MODE", "per_project")
+SHARED_STORAGE = FAISS_STORAGE_MODE == "shared"
+
+# Superseded versions are kept this long after MANIFEST stops naming them, so
+# workers that read the previous MANIFEST can still load them
+FAISS_VERSION_GRACE_SECONDS = int(os.getenv("FAISS_VERSION_GRACE_SECONDS", "300"))
+
+# Memory-map persisted indexes read-only, so uvicorn workers share one copy
+# of each index through the OS page cache instead of loading it N times.
+FAISS_INDEX_MMAP = os.getenv("FAISS_INDEX_MMAP", "false").lower() == "true"
+
+# Versioned layout:
+#   {INDEX_DIR}/{project_id}/MANIFEST          -> {"version": "v...", file sizes}
+#   {INDEX_DIR}/{project_id}/v{ns}/index
+#   {INDEX_DIR}/{project_id}/v{ns}/metadata.bin
+#   {INDEX_DIR}/{project_id}/v{ns}/params.json
+# A version directory is complete before MANIFEST points at it, and MANIFEST
+# is replaced atomically, so readers never see a half-written index.
+MANIFEST = "MANIFEST"
+INDEX_FILE = "index"
+METADATA_FILE = "metadata.bin"
+PARAMS_FILE = "params.json"
+# Written into a version directory when MANIFEST moves off it: {"superseded_at": time}
+SUPERSEDED_FILE = "SUPERSEDED"
+
+ArtifactSignature = namedtuple("ArtifactSignature", ["version", "index_bytes", "metadata_bytes"])
+
+
+def project_dir(project_id: str) -> str:
+    """Directory holding a project's artifact versions"""
+    return os.path.join(INDEX_DIR, project_id)
+
+
+def version_dir(project_id: str, version: str) -> str:
+    return os.path.join(project_dir(project_id), version)
+
+
+def manifest_path(project_id: str) -> str:
+    return os.path.join(project_dir(project_id), MANIFEST)
+
+
+def legacy_index_path(project_id: str) -> str:
+    """Path of the unversioned FAISS index file written before versioned artifacts"""
+    return os.path.join(INDEX_DIR, f"{project_id}.index")
+
+
+def legacy_metadata_paths(project_id: str) -> list:
+    """Unversioned metadata files, compact format first, then JSON"""
+    return [
+        os.path.join(INDEX_DIR, f"{project_id}_metadata.bin"),
+        os.path.join(INDEX_DIR, f"{project_id}_metadata.json"),
+    ]
+
+
+def legacy_params_path(project_id: str) -> str:
+    return os.path.join(INDEX_DIR, f"{project_id}_params.json")
+
+
+def _read_manifest(project_id: str) -> Optional[dict]:
+    try:
+        with open(manifest_path(project_id), 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _legacy_signature(project_id: str) -> Optional[ArtifactSignature]:
+    try:
+        index_stat = os.stat(legacy_index_path(project_id))
+    except FileNotFoundError:
+        return None
+
+    for path in legacy_metadata_paths(project_id):
+        if os.path.exists(path):
+            metadata_stat = os.stat(path)
+            return ArtifactSignature(
+                f"legacy-{index_stat.st_mtime_ns}-{metadata_stat.st_mtime_ns}",
+                index_stat.st_size,
+                metadata_stat.st_size
+            )
+    return None
+
+
+def artifact_signature(project_id: str) -> Optional[ArtifactSignature]:
+    """
+    Return the current artifact version of a project, with its file sizes.
+
+    Returns None when the project has no index, so callers can tell
+    "not built" apart from "changed since last load".
+    """
+    manifest = _read_manifest(project_id)
+    if manifest is None:
+        return _legacy_signature(project_id)
+    return ArtifactSignature(manifest["version"], manifest["index_bytes"], manifest["metadata_bytes"])
+
+
+def _fsync_path(path: str):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def save_project_index(project_id: str, index, items: list, params: Optional[dict] = None,
+                       remove_legacy: bool = True) -> str:
+    """
+    Publish a new version of a project's FAISS index, phrase metadata and
+    index parameters; returns the version name.
+
+    Files are written and fsynced in a temporary directory, which is renamed
+    into place before MANIFEST is atomically switched to it. Readers keep
+    using the previous version until they next check the manifest. With
+    remove_legacy=False the unversioned files are kept (see
+    remove_legacy_files).
+    """
+    directory = project_dir(project_id)
+    os.makedirs(directory, exist_ok=True)
+
+    # Imported on first use so importing the API does not load faiss (see scripts/check_startup.py)
+    import faiss
+
+    temporary_dir = os.path.join(directory, f".tmp-{uuid.uuid4().hex}")
+    os.makedirs(temporary_dir)
+    try:
+        with open(os.path.join(temporary_dir, PARAMS_FILE), 'w') as f:
+            json.dump(params or {"index_type": "flat"}, f)
+        faiss.write_index(index, os.path.join(temporary_dir, INDEX_FILE))
+        write_compact_metadata(os.path.join(temporary_dir, METADATA_FILE), items)
+        for name in (PARAMS_FILE, INDEX_FILE, METADATA_FILE):
+            _fsync_path(os.path.join(temporary_dir, name))
+        _fsync_path(temporary_dir)
+
+        version = f"v{time.time_ns()}"
+        os.rename(temporary_dir, version_dir(project_id, version))
+    except Exception:
+        shutil.rmtree(temporary_dir, ignore_errors=True)
+        raise
+
+    previous = _read_manifest(project_id)
+    manifest = {
+        "version": version,
+        "index_bytes": os.path.getsize(os.path.join(version_dir(project_id, version), INDEX_FILE)),
+        "metadata_bytes": os.path.getsize(os.path.join(version_dir(project_id, version), METADATA_FILE)),
+        "created_at": time.time()
+    }
+    temporary_manifest = f"{manifest_path(project_id)}.tmp"
+    with open(temporary_manifest, 'w') as f:
+        json.dump(manifest, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary_manifest, manifest_path(project_id))
+    _fsync_path(directory)
+
+    # The grace period of the retired version starts now, not when it was built
+    if previous is not None:
+        _mark_superseded(project_id, previous["version"])
+
+    if remove_legacy:
+        remove_legacy_files(project_id)
+
+    collect_old_versions(project_id)
+    return version
+
+
+def remove_legacy_files(project_id: str):
+    """Delete the unversioned files from before the versioned layout, once a manifest supersedes them"""
+    for path in [legacy_index_path(project_id), legacy_params_path(project_id)] + legacy_metadata_paths(project_id):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def discard_version(project_id: str, version: str):
+    """
+    Remove a version that failed verification together with the MANIFEST
+    naming it, so readers fall back to the unversioned files. Only for
+    projects that had no manifest before that version was saved.
+    """
+    manifest = _read_manifest(project_id)
+    if manifest is not None and manifest["version"] == version:
+        os.remove(manifest_path(project_id))
+    shutil.rmtree(version_dir(project_id, version), ignore_errors=True)
+
+
+def remove_project_index(project_id: str) -> bool:
+    """
+    Retire a project's index: MANIFEST and unversioned files are removed,
+    so readers see no index. The last version stays for the grace period,
+    like any superseded version. Returns False if there was nothing to remove.
+    """
+    manifest = _read_manifest(project_id)
+    removed = _legacy_signature(project_id) is not None
+    remove_legacy_files(project_id)
+    if manifest is None:
+        return removed
+
+    _mark_superseded(project_id, manifest["version"])
+    os.remove(manifest_path(project_id))
+    _fsync_path(project_dir(project_id))
+    collect_old_versions(project_id)
+    return True
+
+
+def _mark_superseded(project_id: str, version: str, superseded_at: Optional[float] = None) -> float:
+    """Record when a version stopped being current (keeps an existing record); returns that time"""
+    path = os.path.join(version_dir(project_id, version), SUPERSEDED_FILE)
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)["superseded_at"]
+    except (FileNotFoundError, ValueError, KeyError):
+        pass
+
+    superseded_at = time.time() if superseded_at is None else superseded_at
+    try:
+        with open(path, 'w') as f:
+            json.dump({"superseded_at": superseded_at}, f)
+    except FileNotFoundError:
+        # Version directory already removed
+        pass
+    return superseded_at
+
+
+def collect_old_versions(project_id: str, grace_seconds: int = FAISS_VERSION_GRACE_SECONDS) -> int:
+    """
+    Delete versions superseded longer than the grace period ago, and
+    abandoned temp dirs older than it.
+
+    A version without a SUPERSEDED record (the MANIFEST switched but the
+    record was not written yet, or it predates these records) is marked
+    now, so it always gets a full grace period.
+    """
+    manifest = _read_manifest(project_id)
+    current = manifest["version"] if manifest else None
+    now = time.time()
+    cutoff = now - grace_seconds
+
+    removed = 0
+    for name in os.listdir(project_dir(project_id)):
+        path = os.path.join(project_dir(project_id), name)
+        if name == current or not os.path.isdir(path):
+            continue
+        if name.startswith(".tmp-"):
+            # Still being written if recently touched
+            expired = os.path.getmtime(path) < cutoff
+        elif name.startswith("v"):
+            expired = _mark_superseded(project_id, name, now) < cutoff
+        else:
+            continue
+        if expired:
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+    return removed
+
+
+def _read_index(path: str, mmap: bool):
+    import faiss
+
+    if mmap:
+        # IO_FLAG_MMAP_IFC (faiss >= 1.10) maps flat, HNSW and IVF codes; IO_FLAG_MMAP only IVF lists
+        flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+        return faiss.read_index(path, flags)
+    return faiss.read_index(path)
+
+
+def _load_legacy(project_id: str, mmap: bool = False):
+    index = _read_index(legacy_index_path(project_id), mmap)
+    compact_path, json_path = legacy_metadata_paths(project_id)
+    if os.path.exists(compact_path):
+        metadata = CompactMetadata(compact_path)
+    else:
+        with open(json_path, 'r') as f:
+            metadata = json.load(f)
+
+    # Indexes built before parameters were stored are exact flat indexes
+    try:
+        with open(legacy_params_path(project_id), 'r') as f:
+            params = json.load(f)
+    except FileNotFoundError:
+        params = {"index_type": "flat"}
+
+    return index, metadata, params
+
+
+def load_project_index(project_id: str, version: Optional[str] = None, mmap: bool = False):
+    """
+    Load a version (default: the current one) of a project's FAISS index,
+    phrase metadata and index parameters from disk.
+
+    Metadata is a memory-mapped CompactMetadata, or the item list for
+    projects still on unversioned JSON metadata. With mmap=True the index
+    is memory-mapped read-only and must not be modified.
+    """
+    if version is None:
+        signature = artifact_signature(project_id)
+        version = signature.version if signature else None
+    if version is None or version.startswith("legacy-"):
+        return _load_legacy(project_id, mmap)
+
+    directory = version_dir(project_id, version)
+    index = _read_index(os.path.join(directory, INDEX_FILE), mmap)
+    metadata = CompactMetadata(os.path.join(directory, METADATA_FILE))
+    with open(os.path.join(directory, PARAMS_FILE), 'r') as f:
+        params = json.load(f)
+    return index, metadata, params
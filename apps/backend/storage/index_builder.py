@@ -0,0 +1,364 @@
+"""
+Background worker that builds per-project FAISS indexes.
+
+Build jobs are queued in Redis and processed by a separate process, so API
+workers never embed phrases at startup and only load finished artifacts:
+
+    python -m storage.index_builder            # process queued jobs
+    python -m storage.index_builder --all      # queue every project, then process
+    python -m storage.index_builder --missing  # queue projects without an index
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+import numpy as np
+from typing import Optional
+from storage.redis_client import redis_client
+from storage.mongo_client import get_mongo_client
+from storage.embedding_store import embed_phrases
+from storage.index_artifacts import INDEX_DIR, SHARED_STORAGE, remove_project_index, save_project_index
+from storage.index_factory import INDEX_COMPRESSIONS, build_index
+from storage.index_maintenance import navigation_items, project_lock
+from storage.shared_index import project_index_exists, replace_projects
+
+# Phrases embedded per forward pass
+INDEX_BUILD_BATCH_SIZE = int(os.getenv("INDEX_BUILD_BATCH_SIZE", "64"))
+
+# Partially embedded builds are checkpointed here so a restarted worker can resume
+CHECKPOINT_DIR = os.path.join(INDEX_DIR, ".build")
+
+QUEUE_KEY = "index_build:queue"
+PENDING_KEY = "index_build:pending"
+PROJECTS_KEY = "index_build:projects"
+STATUS_KEY = "index_build:status:{project_id}"
+
+
+class BuildState:
+    QUEUED = "queued"
+    BUILDING = "building"
+    READY = "ready"
+    FAILED = "failed"
+
+
+def _set_status(project_id: str, **fields):
+    fields["updated_at"] = time.time()
+    redis_client.hset(STATUS_KEY.format(project_id=project_id), mapping={
+        key: value if isinstance(value, str) else json.dumps(value)
+        for key, value in fields.items()
+    })
+    redis_client.sadd(PROJECTS_KEY, project_id)
+
+
+def get_build_status(project_id: str) -> dict:
+    """Get the build status of a project's index"""
+    raw = redis_client.hgetall(STATUS_KEY.format(project_id=project_id))
+    status = {"project_id": project_id}
+    for key, value in raw.items():
+        status[key] = value if key in ("state", "error", "index_type", "compression") else json.loads(value)
+
+    if "state" not in status:
+        # Never built by the worker; report whatever artifact is on disk
+        status["state"] = BuildState.READY if project_index_exists(project_id) else "missing"
+
+    phrase_count = status.get("phrase_count")
+    if status["state"] == BuildState.BUILDING and phrase_count:
+        status["progress"] = status.get("embedded_count", 0) / phrase_count
+    elif status["state"] == BuildState.READY:
+        status["progress"] = 1.0
+    return status
+
+
+def list_build_statuses(project_ids: Optional[list] = None) -> list:
+    """Get build statuses for the given projects, or every project the worker knows about"""
+    if project_ids is None:
+        project_ids = sorted(redis_client.smembers(PROJECTS_KEY))
+    return [get_build_status(project_id) for project_id in project_ids]
+
+
+def enqueue_project_build(project_id: str) -> bool:
+    """Queue a build for a project; returns False if one is already queued"""
+    if not redis_client.sadd(PENDING_KEY, project_id):
+        return False
+    _set_status(project_id, state=BuildState.QUEUED, queued_at=time.time())
+    redis_client.lpush(QUEUE_KEY, project_id)
+    return True
+
+
+def _project_items(project_id: str) -> list:
+    mongo_client = get_mongo_client()
+    collection = mongo_client.client["trail_blazer"]["app_navigations"]
+
+    items = []
+    for doc in collection.find({"project_id": project_id}):
+        items.extend(navigation_items(doc))
+    return items
+
+
+def _item_key(item: dict) -> tuple:
+    return item["navigation_id"], item["url"], item["title"], item["phrase"]
+
+
+def _reconcile_items(project_id: str, items: list, embeddings: np.ndarray) -> tuple:
+    """
+    Re-read a project's navigations and line the built embeddings up with them.
+
+    Called under the index lock just before publishing, so navigations
+    upserted or removed while the build was embedding (and already applied
+    incrementally) are not overwritten by the build's older snapshot.
+    Phrases added since the snapshot are embedded, mostly from the embedding
+    store. Returns (items, embeddings, changed).
+    """
+    current = _project_items(project_id)
+    if [_item_key(item) for item in current] == [_item_key(item) for item in items]:
+        return items, embeddings, False
+
+    rows = {item["phrase"]: row for row, item in enumerate(items)}
+    missing = list(dict.fromkeys(item["phrase"] for item in current if item["phrase"] not in rows))
+    vectors = [embeddings]
+    if missing:
+        new_embeddings, _ = embed_phrases(missing)
+        for offset, phrase in enumerate(missing):
+            rows[phrase] = len(items) + offset
+        vectors.append(new_embeddings)
+    all_embeddings = np.vstack(vectors)
+
+    print(f"🔄 Project {project_id} changed during its build: {len(items)} -> {len(current)} phrases, "
+          f"{len(missing)} newly embedded")
+    return current, all_embeddings[[rows[item["phrase"]] for item in current]], True
+
+
+def _length_buckets(phrases: list) -> list:
+    """Split phrase positions into batches of similar length to minimize padding"""
+    order = sorted(range(len(phrases)), key=lambda position: len(phrases[position]))
+    return [order[start:start + INDEX_BUILD_BATCH_SIZE] for start in range(0, len(order), INDEX_BUILD_BATCH_SIZE)]
+
+
+class _Checkpoint:
+    """Append-only store of the embeddings computed so far for one build"""
+
+    def __init__(self, project_id: str, fingerprint: str):
+        os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+        self.vectors_path = os.path.join(CHECKPOINT_DIR, f"{project_id}.f32")
+        self.info_path = os.path.join(CHECKPOINT_DIR, f"{project_id}.json")
+        self.fingerprint = fingerprint
+
+    def load(self) -> Optional[np.ndarray]:
+        """Return embeddings from a previous attempt at the same build, if any"""
+        try:
+            with open(self.info_path) as f:
+                info = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+        if info.get("fingerprint") != self.fingerprint:
+            return None
+
+        vectors = np.fromfile(self.vectors_path, dtype=np.float32)
+        rows = vectors.size // info["dimension"]
+        return vectors[:rows * info["dimension"]].reshape(rows, info["dimension"])
+
+    def append(self, embeddings: np.ndarray):
+        if not os.path.exists(self.info_path):
+            with open(self.vectors_path, "wb"):
+                pass
+            with open(self.info_path, "w") as f:
+                json.dump({"fingerprint": self.fingerprint, "dimension": embeddings.shape[1]}, f)
+        with open(self.vectors_path, "ab") as f:
+            f.write(np.ascontiguousarray(embeddings, dtype=np.float32).tobytes())
+
+    def truncate(self, vectors: np.ndarray, rows: int):
+        """Drop rows past the last whole batch"""
+        os.truncate(self.vectors_path, rows * vectors.shape[1] * vectors.itemsize)
+
+    def reset(self):
+        for path in (self.info_path, self.vectors_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def _project_index_compression(project_id: str) -> str:
+    """The project's index compression setting (settings.index_compression), "none" if unset"""
+    try:
+        project = get_mongo_client().get_project_by_id(project_id)
+        compression = ((project or {}).get("settings") or {}).get("index_compression")
+        return compression if compression in INDEX_COMPRESSIONS else "none"
+    except Exception as e:
+        print(f"⚠️ Could not read index compression for project {project_id}: {e}")
+        return "none"
+
+
+def _reconcile_shared(project_id: str, items: list, embeddings: Optional[np.ndarray]) -> tuple:
+    """replace_projects refresh hook: the project's current items and embeddings"""
+    if embeddings is None:
+        # Built from an empty snapshot: embed whatever exists now
+        current = _project_items(project_id)
+        if not current:
+            return [], None
+        embeddings, _ = embed_phrases([item["phrase"] for item in current])
+        return current, embeddings
+    current, embeddings, _ = _reconcile_items(project_id, items, embeddings)
+    return current, embeddings if current else None
+
+
+def _build_items_index(items: list, embeddings: np.ndarray, compression: str) -> tuple:
+    """Number the items by position and build their index; returns (index, params)"""
+    ids = np.arange(len(items), dtype=np.int64)
+    for item, phrase_id in zip(items, ids):
+        item["id"] = int(phrase_id)
+
+    # Index type (Flat / HNSW / IVF / IVF-PQ) follows the project size; compressed
+    # vectors are only published if they pass the recall check
+    return build_index(embeddings, ids, compression)
+
+
+def build_project_index(project_id: str) -> int:
+    """Embed every phrase of a project and publish a fresh index; returns the phrase count"""
+    started = time.time()
+    items = _project_items(project_id)
+    phrases = [item["phrase"] for item in items]
+    _set_status(project_id, state=BuildState.BUILDING, started_at=started,
+                phrase_count=len(phrases), embedded_count=0, reused_count=0)
+
+    if not items:
+        if SHARED_STORAGE and project_index_exists(project_id):
+            # Drop the project's vectors from its shard, unless navigations were added meanwhile
+            replace_projects({project_id: ([], None)}, refresh=_reconcile_shared)
+        elif not SHARED_STORAGE and project_index_exists(project_id):
+            with project_lock(project_id):
+                # Navigations added meanwhile were already upserted into the index
+                if not _project_items(project_id):
+                    remove_project_index(project_id)
+        _set_status(project_id, state=BuildState.READY, finished_at=time.time(),
+                    duration_seconds=time.time() - started)
+        print(f"No phrases found for project {project_id}, skipping index build")
+        return 0
+
+    buckets = _length_buckets(phrases)
+    fingerprint = hashlib.sha1(json.dumps(phrases).encode()).hexdigest()
+    checkpoint = _Checkpoint(project_id, fingerprint)
+
+    # Resume from the last checkpointed batch of an interrupted build
+    chunks = []
+    embedded = 0
+    completed_batches = 0
+    done = checkpoint.load()
+    if done is None:
+        checkpoint.reset()
+    else:
+        # Keep whole batches only, in case the last append was cut short
+        for batch in buckets:
+            if embedded + len(batch) > done.shape[0]:
+                break
+            embedded += len(batch)
+            completed_batches += 1
+        checkpoint.truncate(done, embedded)
+        chunks.append(done[:embedded])
+        print(f"↩️ Resuming build for project {project_id} at {embedded}/{len(phrases)} phrases")
+
+    # Phrases embedded by an earlier build (of any project) come from the embedding store
+    reused = 0
+    for batch in buckets[completed_batches:]:
+        embeddings, batch_reused = embed_phrases([phrases[position] for position in batch])
+        checkpoint.append(embeddings)
+        chunks.append(embeddings)
+        embedded += len(batch)
+        reused += batch_reused
+        _set_status(project_id, embedded_count=embedded, reused_count=reused)
+
+    # Restore original phrase order from the length-sorted batches
+    order = np.array([position for batch in buckets for position in batch])
+    sorted_embeddings = np.vstack(chunks)
+    embeddings = np.empty_like(sorted_embeddings)
+    embeddings[order] = sorted_embeddings
+
+    if SHARED_STORAGE:
+        # Replace the project's ID range in its multi-tenant shard, with the
+        # navigations as they are once the shard is locked
+        published = replace_projects({project_id: (items, embeddings)}, refresh=_reconcile_shared)
+        items = published[project_id]
+        params = {"index_type": "shared"}
+    else:
+        compression = _project_index_compression(project_id)
+        index, params = _build_items_index(items, embeddings, compression)
+
+        with project_lock(project_id):
+            current_items, current_embeddings, changed = _reconcile_items(project_id, items, embeddings)
+            if changed:
+                # Rebuilt under the lock; the rare cost of a write landing mid-build
+                items = current_items
+                index = None
+                if items:
+                    index, params = _build_items_index(items, current_embeddings, compression)
+            if index is not None:
+                save_project_index(project_id, index, items, params)
+            else:
+                # Every navigation was deleted while the build was embedding
+                remove_project_index(project_id)
+    checkpoint.reset()
+
+    duration = time.time() - started
+    reuse_ratio = reused / max(len(items), 1)
+    _set_status(project_id, state=BuildState.READY, finished_at=time.time(),
+                duration_seconds=duration, embedded_count=len(items), index_type=params["index_type"],
+                compression=params.get("compression", "none"), measured_recall=params.get("measured_recall"),
+                reuse_ratio=reuse_ratio)
+    print(f"✓ Created {params['index_type']} index for project {project_id}: {len(items)} phrases in {duration:.1f}s "
+          f"({reuse_ratio:.0%} of embeddings reused)")
+    return len(items)
+
+
+def enqueue_all_projects(missing_only: bool = False) -> int:
+    """Queue builds for every project that has navigations"""
+    mongo_client = get_mongo_client()
+    collection = mongo_client.client["trail_blazer"]["app_navigations"]
+
+    queued = 0
+    for project_id in collection.distinct("project_id"):
+        if not project_id:
+            continue
+        if missing_only and project_index_exists(project_id):
+            continue
+        if enqueue_project_build(project_id):
+            queued += 1
+    print(f"📥 Queued {queued} index builds")
+    return queued
+
+
+def _requeue_interrupted():
+    """Queue again any build a previous worker was in the middle of"""
+    for status in list_build_statuses():
+        if status["state"] == BuildState.BUILDING:
+            redis_client.srem(PENDING_KEY, status["project_id"])
+            enqueue_project_build(status["project_id"])
+
+
+def run_worker(poll_timeout: int = 5):
+    """Process queued build jobs until interrupted"""
+    print("🏗️ Index builder worker started")
+    _requeue_interrupted()
+
+    while True:
+        job = redis_client.brpop(QUEUE_KEY, timeout=poll_timeout)
+        if not job:
+            continue
+
+        _, project_id = job
+        redis_client.srem(PENDING_KEY, project_id)
+        try:
+            build_project_index(project_id)
+        except Exception as e:
+            print(f"❌ Index build failed for project {project_id}: {e}")
+            _set_status(project_id, state=BuildState.FAILED, error=str(e), finished_at=time.time())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build per-project FAISS indexes")
+    parser.add_argument("--all", action="store_true", help="queue a build for every project first")
+    parser.add_argument("--missing", action="store_true", help="queue builds for projects without an index first")
+    args = parser.parse_args()
+
+    if args.all or args.missing:
+        enqueue_all_projects(missing_only=args.missing)
+    run_worker()
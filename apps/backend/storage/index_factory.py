@@ -0,0 +1,238 @@
+import os
+import numpy as np
+
+# faiss is imported inside the functions that use it, so importing this module
+# (and the API routes) does not load it
+
+# Recall@k the chosen index and search parameters should reach against an exact scan
+FAISS_RECALL_TARGET = float(os.getenv("FAISS_RECALL_TARGET", "0.95"))
+
+# Phrase counts at which larger projects switch to approximate indexes
+FAISS_HNSW_MIN_PHRASES = int(os.getenv("FAISS_HNSW_MIN_PHRASES", "10000"))
+FAISS_IVF_MIN_PHRASES = int(os.getenv("FAISS_IVF_MIN_PHRASES", "200000"))
+FAISS_IVFPQ_MIN_PHRASES = int(os.getenv("FAISS_IVFPQ_MIN_PHRASES", "1000000"))
+
+# Optional per-project vector compression (project settings.index_compression):
+#   sq8 / fp16   scalar quantization to int8 / float16 per dimension
+#   pq           product quantization, one byte per 8 dimensions
+#   opq          PQ after a learned rotation (OPQ), better recall than plain PQ
+#   pca_pq       PCA to half the dimensions, then PQ
+INDEX_COMPRESSIONS = ("none", "sq8", "fp16", "pq", "opq", "pca_pq")
+
+# Compressed indexes are published only if they reach this recall@k against an exact
+# scan; otherwise the build falls back to uncompressed vectors
+FAISS_COMPRESSED_RECALL_TARGET = float(os.getenv("FAISS_COMPRESSED_RECALL_TARGET", "0.90"))
+
+# PQ codebooks have 256 centroids per sub-quantizer and need ~39 training vectors each;
+# smaller projects get sq8 instead
+PQ_MIN_PHRASES = 10000
+CODEC_TRAINING_POINTS = 65536
+
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+
+# Training vectors per IVF list (FAISS warns below ~39)
+IVF_TRAINING_POINTS_PER_LIST = 64
+
+# Sampled vectors used to check the recall of approximate indexes at build time
+CALIBRATION_QUERIES = 200
+CALIBRATION_K = 10
+HNSW_MAX_EF_SEARCH = 1024
+
+# Starting efSearch for HNSW and probed fraction of IVF lists per recall target
+HNSW_EF_SEARCH = ((0.90, 32), (0.95, 64), (0.99, 128), (1.0, 256))
+IVF_PROBE_FRACTION = ((0.90, 0.01), (0.95, 0.02), (0.99, 0.08), (1.0, 0.25))
+
+
+def _for_recall(table: tuple, recall_target: float):
+    return next((value for recall, value in table if recall_target <= recall), table[-1][1])
+
+
+def choose_index_params(phrase_count: int, dimension: int, recall_target: float = FAISS_RECALL_TARGET,
+                        compression: str = "none") -> dict:
+    """
+    Pick an index type and its parameters from the project size.
+
+    Flat (exact) for small projects, HNSW for medium ones, IVF for large ones
+    and IVF-PQ once the float vectors themselves become the memory problem.
+    `compression` swaps the float vectors of flat, HNSW and IVF indexes for
+    compressed codes (see INDEX_COMPRESSIONS).
+    """
+    params = {
+        "phrase_count": phrase_count,
+        "dimension": dimension,
+        "recall_target": recall_target,
+    }
+
+    if phrase_count < FAISS_HNSW_MIN_PHRASES:
+        params.update(index_type="flat", factory="Flat", search_params={})
+    elif phrase_count < FAISS_IVF_MIN_PHRASES:
+        params.update(
+            index_type="hnsw",
+            factory=f"HNSW{HNSW_M},Flat",
+            build_params={"efConstruction": HNSW_EF_CONSTRUCTION},
+            search_params={"efSearch": _for_recall(HNSW_EF_SEARCH, recall_target)},
+        )
+    else:
+        nlist = int(np.clip(4 * np.sqrt(phrase_count), 64, 65536))
+        nprobe = max(8, int(nlist * _for_recall(IVF_PROBE_FRACTION, recall_target)))
+        if phrase_count < FAISS_IVFPQ_MIN_PHRASES or dimension % 8:
+            params.update(index_type="ivf", factory=f"IVF{nlist},Flat")
+        else:
+            # 8 dimensions per sub-quantizer; PQ loses some recall, so probe more lists
+            params.update(index_type="ivfpq", factory=f"IVF{nlist},PQ{dimension // 8}x8")
+            nprobe *= 2
+        params.update(build_params={"nlist": nlist}, search_params={"nprobe": min(nlist, nprobe)})
+
+    if compression != "none" and params["index_type"] != "ivfpq":
+        _apply_compression(params, compression)
+    return params
+
+
+def _apply_compression(params: dict, compression: str):
+    """Rewrite the factory string of a flat / HNSW / IVF index to store compressed codes"""
+    if compression not in INDEX_COMPRESSIONS:
+        raise ValueError(f"Unknown index compression: {compression}")
+
+    dimension = params["dimension"]
+    # PQ splits the (PCA-reduced) vector into 8-dimension sub-vectors
+    pq_dimension = dimension // 2 if compression == "pca_pq" else dimension
+    if compression in ("pq", "opq", "pca_pq") and (params["phrase_count"] < PQ_MIN_PHRASES or pq_dimension % 8):
+        print(f"⚠️ {compression} needs {PQ_MIN_PHRASES}+ phrases and whole 8-dimension sub-vectors, using sq8")
+        compression = "sq8"
+
+    prefix = ""
+    if compression == "sq8":
+        codec = "SQ8"
+    elif compression == "fp16":
+        codec = "SQfp16"
+    elif compression == "pq":
+        codec = f"PQ{dimension // 8}x8"
+    elif compression == "opq":
+        prefix, codec = f"OPQ{dimension // 8},", f"PQ{dimension // 8}x8"
+    else:
+        prefix, codec = f"PCAR{dimension // 2},", f"PQ{dimension // 16}x8"
+
+    if params["index_type"] == "flat":
+        params["factory"] = f"{prefix}{codec}"
+    elif params["index_type"] == "hnsw":
+        params["factory"] = f"{prefix}HNSW{HNSW_M},{codec}"
+    else:
+        params["factory"] = f"{prefix}IVF{params['build_params']['nlist']},{codec}"
+
+    params["compression"] = compression
+    # Quantization caps the reachable recall, so approximate search is tuned to the compressed target
+    params["recall_target"] = min(params["recall_target"], FAISS_COMPRESSED_RECALL_TARGET)
+
+
+def _core_index(index):
+    """The index behind the ID map and any PCA / OPQ transform"""
+    import faiss
+
+    base = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+    if isinstance(base, faiss.IndexPreTransform):
+        base = faiss.downcast_index(base.index)
+    return base
+
+
+def create_index(embeddings: np.ndarray, ids: np.ndarray, params: dict):
+    """Build and fill an ID-mapped index described by `params`"""
+    import faiss
+
+    dimension = embeddings.shape[1]
+    base = faiss.index_factory(dimension, params["factory"], faiss.METRIC_INNER_PRODUCT)
+
+    if params["index_type"] == "hnsw":
+        _core_index(base).hnsw.efConstruction = params["build_params"]["efConstruction"]
+
+    if not base.is_trained:
+        build_params = params.get("build_params", {})
+        sample_size = build_params.get("nlist", 0) * IVF_TRAINING_POINTS_PER_LIST
+        if params.get("compression"):
+            sample_size = max(sample_size, CODEC_TRAINING_POINTS)
+        sample_size = min(len(embeddings), sample_size)
+        sample = embeddings[np.random.default_rng(0).choice(len(embeddings), sample_size, replace=False)]
+        base.train(sample)
+
+    index = faiss.IndexIDMap2(base)
+    index.add_with_ids(embeddings, ids.astype(np.int64))
+    apply_search_params(index, params)
+
+    if params["index_type"] != "flat" or params.get("compression"):
+        calibrate_search_params(index, embeddings, ids, params)
+    return index
+
+
+def build_index(embeddings: np.ndarray, ids: np.ndarray, compression: str = "none"):
+    """
+    Build a project's index, compressed if requested; returns (index, params).
+
+    A compressed index that misses FAISS_COMPRESSED_RECALL_TARGET against the
+    exact scan is discarded and the project gets an uncompressed index instead.
+    """
+    params = choose_index_params(len(embeddings), embeddings.shape[1], compression=compression)
+    index = create_index(embeddings, ids, params)
+    if not params.get("compression") or params["measured_recall"] >= FAISS_COMPRESSED_RECALL_TARGET:
+        return index, params
+
+    print(f"⚠️ {params['compression']} index reached recall {params['measured_recall']:.3f}, "
+          f"below {FAISS_COMPRESSED_RECALL_TARGET}; publishing uncompressed vectors instead")
+    rejected = {"compression": params["compression"], "measured_recall": params["measured_recall"]}
+    params = choose_index_params(len(embeddings), embeddings.shape[1])
+    index = create_index(embeddings, ids, params)
+    params["rejected_compression"] = rejected
+    return index, params
+
+
+def calibrate_search_params(index, embeddings: np.ndarray, ids: np.ndarray, params: dict):
+    """
+    Raise efSearch / nprobe until a sample of the project's own vectors reaches
+    the recall target against an exact search of the uncompressed vectors,
+    and record the measured recall.
+    """
+    import faiss
+
+    k = min(CALIBRATION_K, len(embeddings))
+    rng = np.random.default_rng(0)
+    sample = embeddings[rng.choice(len(embeddings), min(CALIBRATION_QUERIES, len(embeddings)), replace=False)]
+    _, exact_positions = faiss.knn(sample, embeddings, k, metric=faiss.METRIC_INNER_PRODUCT)
+    exact = ids[exact_positions]
+
+    search_params = params["search_params"]
+    if "efSearch" in search_params:
+        key, limit = "efSearch", HNSW_MAX_EF_SEARCH
+    elif "nprobe" in search_params:
+        key, limit = "nprobe", params["build_params"]["nlist"]
+    else:
+        # Compressed flat indexes have nothing to tune; the recall is only measured
+        key, limit = None, None
+
+    while True:
+        apply_search_params(index, params)
+        _, found = index.search(sample, k)
+        recall = float(np.mean([len(set(a) & set(b)) / k for a, b in zip(exact, found)]))
+        if key is None or recall >= params["recall_target"] or search_params[key] >= limit:
+            break
+        search_params[key] = min(limit, search_params[key] * 2)
+
+    params["measured_recall"] = recall
+    if recall < params["recall_target"]:
+        print(f"⚠️ {params['factory']} index reached recall {recall:.3f}, below target {params['recall_target']}")
+
+
+def apply_search_params(index, params: dict):
+    """Set efSearch / nprobe on a loaded index from its stored parameters"""
+    import faiss
+
+    search_params = params.get("search_params") or {}
+    base = _core_index(index)
+
+    if "efSearch" in search_params and hasattr(base, "hnsw"):
+        base.hnsw.efSearch = search_params["efSearch"]
+    if "nprobe" in search_params:
+        faiss.extract_index_ivf(base).nprobe = search_params["nprobe"]
+
+
+def supports_removal(index) -> bool:
+    """HNSW graphs cannot drop vectors; other index types can"""
+    return not hasattr(_core_index(index), "hnsw")
@@ -0,0 +1,173 @@
+import fcntl
+import numpy as np
+import os
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from storage.embedding_store import embed_phrases
+from storage.index_artifacts import (
+    INDEX_DIR,
+    SHARED_STORAGE,
+    artifact_signature,
+    load_project_index,
+    save_project_index,
+)
+from storage.index_factory import choose_index_params, create_index, supports_removal
+from storage.metadata_store import CompactMetadata
+
+# Serializes edits to the same project within this process; the file lock
+# below does the same across uvicorn workers
+_project_locks = defaultdict(threading.Lock)
+
+# Share of dead vectors left in a non-removable (HNSW) index before a rebuild is queued
+TOMBSTONE_REBUILD_RATIO = 0.2
+
+
+def build_id_map_index(embeddings: np.ndarray, ids: np.ndarray):
+    """Build an inner-product index whose vectors are addressed by phrase ID"""
+    # Imported on first use so importing the API does not load faiss
+    import faiss
+
+    index = faiss.IndexIDMap2(faiss.IndexFlatIP(embeddings.shape[1]))
+    index.add_with_ids(embeddings, ids.astype(np.int64))
+    return index
+
+
+def navigation_items(navigation: dict) -> list:
+    """Flatten a navigation document into one metadata item per phrase"""
+    return [
+        {
+            "url": navigation["url"],
+            "phrase": phrase,
+            "title": navigation.get("title", ""),
+            "navigation_id": navigation.get("navigation_id", "")
+        }
+        for phrase in navigation.get("phrases", [])
+    ]
+
+
+@contextmanager
+def project_lock(project_id: str):
+    """Hold the cross-process edit lock for a project's index"""
+    os.makedirs(INDEX_DIR, exist_ok=True)
+    with _project_locks[project_id]:
+        with open(os.path.join(INDEX_DIR, f"{project_id}.lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _load_for_update(project_id: str):
+    """Load a private, mutable copy of a project's index, metadata items and parameters"""
+    import faiss
+
+    if artifact_signature(project_id) is None:
+        return None, [], None
+
+    index, metadata, params = load_project_index(project_id)
+    items = list(metadata.values()) if isinstance(metadata, CompactMetadata) else metadata
+
+    # Indexes built before phrase IDs existed address vectors by position
+    if not isinstance(index, faiss.IndexIDMap2):
+        vectors = index.reconstruct_n(0, index.ntotal)
+        index = build_id_map_index(vectors, np.arange(index.ntotal))
+        for position, item in enumerate(items):
+            item["id"] = position
+
+    return index, items, params
+
+
+def _remove_items(index, items: list, params: dict, navigation_id: str) -> list:
+    stale_ids = [item["id"] for item in items if item.get("navigation_id") == navigation_id]
+    if stale_ids:
+        if supports_removal(index):
+            index.remove_ids(np.array(stale_ids, dtype=np.int64))
+        else:
+            # Dropping the metadata hides the vectors from search until the next rebuild
+            params["tombstones"] = params.get("tombstones", 0) + len(stale_ids)
+    return [item for item in items if item.get("navigation_id") != navigation_id]
+
+
+def _next_phrase_id(index, items: list) -> int:
+    """
+    First unused phrase ID. Tombstoned HNSW vectors keep their IDs in the index
+    after their metadata is dropped, so the index's IDs count as used too.
+    """
+    import faiss
+
+    next_id = max((item["id"] for item in items), default=-1) + 1
+    if index is not None and index.ntotal:
+        next_id = max(next_id, int(faiss.vector_to_array(index.id_map).max()) + 1)
+    return next_id
+
+
+def _queue_rebuild_if_fragmented(project_id: str, index, params: dict):
+    if params.get("tombstones", 0) > TOMBSTONE_REBUILD_RATIO * max(index.ntotal, 1):
+        # Imported here because the builder itself depends on this module
+        from storage.index_builder import enqueue_project_build
+        enqueue_project_build(project_id)
+
+
+def upsert_navigation_vectors(project_id: str, navigation: dict) -> int:
+    """
+    Replace the phrase vectors of a single navigation in its project's index.
+
+    Only the navigation's own phrases are embedded; the rest of the index is
+    left untouched. Returns the number of phrases now indexed for it.
+    """
+    if SHARED_STORAGE:
+        # Imported here because the shared index itself depends on this module
+        from storage import shared_index
+        return shared_index.upsert_navigation_vectors(project_id, navigation)
+
+    navigation_id = navigation.get("navigation_id", "")
+    new_items = navigation_items(navigation)
+
+    with project_lock(project_id):
+        index, items, params = _load_for_update(project_id)
+        if index is not None:
+            items = _remove_items(index, items, params, navigation_id)
+
+        if new_items:
+            embeddings, _ = embed_phrases([item["phrase"] for item in new_items])
+            next_id = _next_phrase_id(index, items)
+            ids = np.arange(next_id, next_id + len(new_items), dtype=np.int64)
+            for item, phrase_id in zip(new_items, ids):
+                item["id"] = int(phrase_id)
+
+            if index is None:
+                params = choose_index_params(len(new_items), embeddings.shape[1])
+                index = create_index(embeddings, ids, params)
+            else:
+                index.add_with_ids(embeddings, ids)
+            items.extend(new_items)
+
+        if index is not None:
+            save_project_index(project_id, index, items, params)
+            _queue_rebuild_if_fragmented(project_id, index, params)
+
+    print(f"✓ Indexed {len(new_items)} phrases for navigation {navigation_id} in project {project_id}")
+    return len(new_items)
+
+
+def remove_navigation_vectors(project_id: str, navigation_id: str) -> int:
+    """Remove a navigation's phrase vectors from its project's index"""
+    if SHARED_STORAGE:
+        from storage import shared_index
+        return shared_index.remove_navigation_vectors(project_id, navigation_id)
+
+    with project_lock(project_id):
+        index, items, params = _load_for_update(project_id)
+        if index is None:
+            return 0
+
+        remaining = _remove_items(index, items, params, navigation_id)
+        removed = len(items) - len(remaining)
+        if removed:
+            save_project_index(project_id, index, remaining, params)
+            _queue_rebuild_if_fragmented(project_id, index, params)
+
+    print(f"✓ Removed {removed} phrases for navigation {navigation_id} from project {project_id}")
+    return removed
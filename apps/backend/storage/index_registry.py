@@ -0,0 +1,188 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+from storage.index_artifacts import (
+    FAISS_INDEX_MMAP,
+    ArtifactSignature,
+    artifact_signature,
+    load_project_index,
+)
+from storage.index_factory import apply_search_params
+from storage.lexical_index import build_lexical_index
+from storage.metadata_store import CompactMetadata
+
+# Memory budget for resident indexes, in megabytes
+FAISS_INDEX_CACHE_MB = int(os.getenv("FAISS_INDEX_CACHE_MB", "512"))
+
+# Parsed legacy JSON metadata takes several times its on-disk size once loaded
+METADATA_MEMORY_FACTOR = 4
+
+# Loads are serialized per project through a fixed set of striped locks, so
+# the lock table does not grow with every project ever requested
+LOAD_LOCK_STRIPES = 64
+
+
+class LoadedIndex:
+    """A project's FAISS index and metadata kept resident in memory"""
+
+    def __init__(self, project_id: str, index, metadata, params: dict, signature: ArtifactSignature):
+        self.project_id = project_id
+        self.index = index
+        self.params = params
+        # Search parameters are fixed per artifact, so set them once instead of per query
+        apply_search_params(index, params)
+        self.signature = signature
+        if isinstance(metadata, CompactMetadata):
+            # Memory-mapped, so it costs about its file size at most
+            self.metadata = metadata
+            self.size_bytes = signature.index_bytes + signature.metadata_bytes
+        else:
+            # Vectors are addressed by phrase ID; older artifacts use list positions
+            self.metadata = {item.get("id", position): item for position, item in enumerate(metadata)}
+            self.size_bytes = signature.index_bytes + signature.metadata_bytes * METADATA_MEMORY_FACTOR
+        self._lexical = None
+        self._lexical_lock = threading.Lock()
+        # Per-project views of a shared shard (storage/shared_index.py)
+        self.views = {}
+
+    @property
+    def lexical(self):
+        """BM25 index over this artifact's phrases, built on first hybrid/lexical query"""
+        if self._lexical is None:
+            with self._lexical_lock:
+                if self._lexical is None:
+                    self._lexical = build_lexical_index(self.metadata)
+        return self._lexical
+
+
+class IndexRegistry:
+    """
+    Per-process LRU cache of loaded project indexes.
+
+    Entries are evicted least-recently-used first once the estimated memory of
+    resident indexes exceeds the budget. Every lookup compares the current
+    artifact version with the loaded one, so a rebuilt index is hot-reloaded
+    on the next request; concurrent requests keep using the old version
+    until the new one is in memory.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.stale_hits = 0
+        self.evictions = 0
+        # Serializes loads of the same project (and of projects sharing its stripe)
+        self._load_locks = [threading.Lock() for _ in range(LOAD_LOCK_STRIPES)]
+
+    def get(self, project_id: str) -> Optional[LoadedIndex]:
+        """Return the loaded index for a project, loading it from disk if needed"""
+        signature = artifact_signature(project_id)
+
+        with self._lock:
+            entry = self._entries.get(project_id)
+            if signature is None:
+                # Artifacts were removed; drop any stale copy
+                if entry is not None:
+                    self._remove(project_id)
+                return None
+
+            if entry is not None and entry.signature == signature:
+                self._entries.move_to_end(project_id)
+                self.hits += 1
+                return entry
+
+            load_lock = self._load_lock(project_id)
+
+        if entry is not None:
+            # A new version was published: one request loads it while the
+            # others keep serving the version already in memory
+            if not load_lock.acquire(blocking=False):
+                with self._lock:
+                    self.stale_hits += 1
+                return entry
+        else:
+            load_lock.acquire()
+
+        try:
+            with self._lock:
+                current = self._entries.get(project_id)
+                if current is not None and current.signature == signature:
+                    self.hits += 1
+                    return current
+                if current is not None:
+                    self.reloads += 1
+                self.misses += 1
+
+            # Load outside the registry lock so other projects keep being served
+            # Registry entries are only searched, so they can be mapped read-only
+            index, metadata, params = load_project_index(project_id, signature.version, mmap=FAISS_INDEX_MMAP)
+            entry = LoadedIndex(project_id, index, metadata, params, signature)
+
+            with self._lock:
+                if project_id in self._entries:
+                    self._remove(project_id)
+                self._entries[project_id] = entry
+                self._total_bytes += entry.size_bytes
+                self._evict()
+        finally:
+            load_lock.release()
+
+        return entry
+
+    def invalidate(self, project_id: str):
+        """Drop a project's index from the cache"""
+        with self._lock:
+            if project_id in self._entries:
+                self._remove(project_id)
+
+    def clear(self):
+        """Drop all cached indexes"""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> dict:
+        """Return cache counters and current memory usage"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "mmap": FAISS_INDEX_MMAP,
+                "resident_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+                "stale_hits": self.stale_hits,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0
+            }
+
+    def _load_lock(self, project_id: str) -> threading.Lock:
+        return self._load_locks[hash(project_id) % len(self._load_locks)]
+
+    def _remove(self, project_id: str):
+        entry = self._entries.pop(project_id)
+        self._total_bytes -= entry.size_bytes
+
+    def _evict(self):
+        # Always keep the most recently used entry, even if it alone exceeds the budget
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            project_id = next(iter(self._entries))
+            self._remove(project_id)
+            self.evictions += 1
+            print(f"♻️ Evicted FAISS index for project {project_id} from cache")
+
+
+index_registry = IndexRegistry(max_bytes=FAISS_INDEX_CACHE_MB * 1024 * 1024)
+
+
+def get_index_registry() -> IndexRegistry:
+    """Get the process-wide index registry"""
+    return index_registry
@@ -0,0 +1,95 @@
+import math
+import re
+from collections import Counter, defaultdict
+import numpy as np
+
+# Standard Okapi BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list:
+    """Lowercase word tokens used for both phrases and queries"""
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """
+    In-memory BM25 index over a project's phrases and their page titles.
+
+    Each posting stores its precomputed BM25 weight, so scoring a query only
+    sums the postings of its terms; the cost depends on how many phrases
+    contain the query terms, not on the project size.
+    """
+
+    def __init__(self, documents):
+        """`documents` is an iterable of (phrase id, text) pairs"""
+        doc_ids = []
+        term_counts = []
+        for doc_id, text in documents:
+            doc_ids.append(doc_id)
+            term_counts.append(Counter(tokenize(text)))
+
+        self.doc_ids = np.array(doc_ids, dtype=np.int64)
+        lengths = np.array([sum(counts.values()) for counts in term_counts], dtype=np.float32)
+        average_length = float(lengths.mean()) if len(lengths) else 0.0
+
+        postings = defaultdict(list)
+        for position, counts in enumerate(term_counts):
+            for term, count in counts.items():
+                postings[term].append((position, count))
+
+        document_count = len(doc_ids)
+        self.postings = {}
+        for term, entries in postings.items():
+            positions = np.array([position for position, _ in entries], dtype=np.int32)
+            frequencies = np.array([count for _, count in entries], dtype=np.float32)
+            idf = math.log(1 + (document_count - len(entries) + 0.5) / (len(entries) + 0.5))
+            norms = BM25_K1 * (1 - BM25_B + BM25_B * lengths[positions] / max(average_length, 1e-9))
+            weights = idf * frequencies * (BM25_K1 + 1) / (frequencies + norms)
+            self.postings[term] = (positions, weights.astype(np.float32))
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def search(self, query: str, limit: int) -> list:
+        """Return up to `limit` (phrase id, score) pairs, best first"""
+        matched = [self.postings[term] for term in set(tokenize(query)) if term in self.postings]
+        if not matched:
+            return []
+
+        positions = np.concatenate([entry[0] for entry in matched])
+        weights = np.concatenate([entry[1] for entry in matched])
+        unique_positions, inverse = np.unique(positions, return_inverse=True)
+        scores = np.bincount(inverse, weights=weights)
+
+        if len(scores) > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(self.doc_ids[unique_positions[i]]), float(scores[i])) for i in top]
+
+
+def build_lexical_index(metadata: dict) -> BM25Index:
+    """Build a BM25 index from loaded phrase metadata ({phrase id: item})"""
+    return BM25Index(
+        (phrase_id, f"{item.get('phrase', '')} {item.get('title', '')}")
+        for phrase_id, item in metadata.items()
+    )
+
+
+def reciprocal_rank_fusion(ranked_lists: list, k: int = 60) -> list:
+    """
+    Fuse ranked lists of keys with reciprocal rank fusion.
+
+    Each key scores sum(1 / (k + rank)) over the lists it appears in (rank
+    starting at 1). Returns (key, score) pairs, best first.
+    """
+    scores = defaultdict(float)
+    for ranked in ranked_lists:
+        for rank, key in enumerate(ranked, start=1):
+            scores[key] += 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda entry: entry[1], reverse=True)
@@ -0,0 +1,153 @@
+import json
+import numpy as np
+
+# File layout: MAGIC, uint32 header length, JSON header, then 8-byte aligned
+# sections. The header maps each section name to [offset, dtype, count].
+MAGIC = b"OFMETA01"
+_ALIGNMENT = 8
+
+# Per-navigation string columns; phrases are stored separately, one per row
+NAVIGATION_FIELDS = ("url", "title", "navigation_id")
+
+
+def _string_column(values: list):
+    """Encode strings as (int64 offsets, utf-8 blob); value i is blob[offsets[i]:offsets[i + 1]]"""
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+def write_compact_metadata(path: str, items: list):
+    """
+    Write phrase metadata items (dicts with id, phrase, url, title,
+    navigation_id) in the compact columnar format.
+
+    Each distinct navigation is stored once; phrases point at it through an
+    int32 column. Rows are sorted by phrase ID so lookups can binary-search.
+    """
+    ids = np.array([item.get("id", position) for position, item in enumerate(items)], dtype=np.int64)
+    order = np.argsort(ids, kind="stable")
+
+    navigation_rows = {}
+    phrase_navigation = np.empty(len(items), dtype=np.int32)
+    for row, position in enumerate(order):
+        item = items[position]
+        key = tuple(item.get(field, "") or "" for field in NAVIGATION_FIELDS)
+        phrase_navigation[row] = navigation_rows.setdefault(key, len(navigation_rows))
+
+    sections = {
+        "phrase_ids": ids[order],
+        "phrase_navigation": phrase_navigation,
+    }
+    sections["phrase_offsets"], sections["phrase_blob"] = _string_column(
+        [items[position].get("phrase", "") for position in order]
+    )
+    navigations = list(navigation_rows)
+    for column, field in enumerate(NAVIGATION_FIELDS):
+        sections[f"{field}_offsets"], sections[f"{field}_blob"] = _string_column(
+            [navigation[column] for navigation in navigations]
+        )
+
+    # Lay sections out after the header, each aligned for zero-copy views
+    header = {}
+    offset = 0
+    for name, array in sections.items():
+        header[name] = [offset, array.dtype.str, int(array.size)]
+        offset += -(-array.nbytes // _ALIGNMENT) * _ALIGNMENT
+
+    header_bytes = json.dumps({"rows": len(items), "navigations": len(navigations), "sections": header}).encode()
+    data_start = -(-(len(MAGIC) + 4 + len(header_bytes)) // _ALIGNMENT) * _ALIGNMENT
+
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(np.uint32(len(header_bytes)).tobytes())
+        f.write(header_bytes)
+        for name, array in sections.items():
+            f.seek(data_start + header[name][0])
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+
+
+class CompactMetadata:
+    """
+    Read-only, memory-mapped view of a compact metadata file.
+
+    Behaves like the {phrase id: item} dict used by search (get, [], in,
+    len, items/values), but only the rows that are actually looked up are
+    decoded; everything else stays in the page cache.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._buffer = np.memmap(path, dtype=np.uint8, mode="r")
+        if bytes(self._buffer[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"{path} is not a compact metadata file")
+
+        header_length = int(np.frombuffer(self._buffer, dtype=np.uint32, count=1, offset=len(MAGIC))[0])
+        header_start = len(MAGIC) + 4
+        header = json.loads(bytes(self._buffer[header_start:header_start + header_length]))
+        data_start = -(-(header_start + header_length) // _ALIGNMENT) * _ALIGNMENT
+
+        self.navigation_count = header["navigations"]
+        self._sections = {
+            name: np.frombuffer(self._buffer, dtype=np.dtype(dtype), count=count, offset=data_start + offset)
+            for name, (offset, dtype, count) in header["sections"].items()
+        }
+        self.ids = self._sections["phrase_ids"]
+        self.phrase_navigation = self._sections["phrase_navigation"]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _row(self, phrase_id) -> int:
+        row = int(np.searchsorted(self.ids, phrase_id))
+        if row < len(self.ids) and self.ids[row] == phrase_id:
+            return row
+        return -1
+
+    def _string(self, field: str, position: int) -> str:
+        offsets = self._sections[f"{field}_offsets"]
+        return self._sections[f"{field}_blob"][offsets[position]:offsets[position + 1]].tobytes().decode("utf-8")
+
+    def _item(self, row: int) -> dict:
+        navigation = int(self.phrase_navigation[row])
+        item = {field: self._string(field, navigation) for field in NAVIGATION_FIELDS}
+        item["phrase"] = self._string("phrase", row)
+        item["id"] = int(self.ids[row])
+        return item
+
+    def get(self, phrase_id, default=None):
+        row = self._row(phrase_id)
+        return self._item(row) if row >= 0 else default
+
+    def __getitem__(self, phrase_id) -> dict:
+        row = self._row(phrase_id)
+        if row < 0:
+            raise KeyError(phrase_id)
+        return self._item(row)
+
+    def __contains__(self, phrase_id) -> bool:
+        return self._row(phrase_id) >= 0
+
+    def keys(self):
+        return (int(phrase_id) for phrase_id in self.ids)
+
+    def values(self):
+        return (self._item(row) for row in range(len(self.ids)))
+
+    def items(self):
+        return ((int(self.ids[row]), self._item(row)) for row in range(len(self.ids)))
+
+    @property
+    def nbytes(self) -> int:
+        return self._buffer.nbytes
+
+
+def convert_json_metadata(json_path: str, compact_path: str) -> int:
+    """Rewrite a legacy JSON metadata file in the compact format; returns the row count"""
+    with open(json_path, "r") as f:
+        items = json.load(f)
+    write_compact_metadata(compact_path, items)
+    return len(items)
+
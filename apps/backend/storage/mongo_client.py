@@ -9,11 +9,36 @@ import ssl
 import hashlib
 import uuid
 import secrets
+import threading
 from models.models import UserState, UserRole, InvitationStatus
+from storage.query_cache import get_query_result_cache
+from storage.mongo_metrics import mongo_event_listeners
+from storage.flow_index import FLOW_INDEX_PROJECTION, FlowEmbeddingMatrix, get_flow_index_cache
+from storage.vector_codec import encode_embedding_fields, decode_embedding_fields
 
 # Load environment variables
 load_dotenv()
 
+# How long an operation waits for a reachable MongoDB server before failing
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "30000"))
+
+def mongo_connection_string() -> str:
+    """MONGO_DB_CONNECTION_STRING with the options the deployment needs"""
+    connection_string = os.getenv('MONGO_DB_CONNECTION_STRING')
+    if not connection_string:
+        raise ValueError("MONGO_DB_CONNECTION_STRING environment variable is not set")
+    
+    # Handle Azure Cosmos DB SSL certificate issues
+    if 'cosmos.azure.com' in connection_string:
+        print("🔧 Configuring for Azure Cosmos DB...")
+        # Add SSL parameters to connection string for Azure Cosmos DB
+        ssl_params = "&tlsInsecure=true&retryWrites=false"
+        if "?" in connection_string:
+            connection_string += ssl_params
+        else:
+            connection_string += "?" + ssl_params[1:]  # Remove the leading &
+    return connection_string
+
 class MongoDBClient:
     def __init__(self):
         self.client = None
@@ -34,25 +59,16 @@ class MongoDBClient:
     def _connect(self):
         """Initialize MongoDB connection"""
         try:
-            connection_string = os.getenv('MONGO_DB_CONNECTION_STRING')
-            if not connection_string:
-                raise ValueError("MONGO_DB_CONNECTION_STRING environment variable is not set")
-            
-            # Handle Azure Cosmos DB SSL certificate issues
-            if 'cosmos.azure.com' in connection_string:
-                print("🔧 Configuring for Azure Cosmos DB...")
-                # Add SSL parameters to connection string for Azure Cosmos DB
-                ssl_params = "&tlsInsecure=true&retryWrites=false"
-                if "?" in connection_string:
-                    connection_string += ssl_params
-                else:
-                    connection_string += "?" + ssl_params[1:]  # Remove the leading &
+            connection_string = mongo_connection_string()
             
-            # Initialize MongoDB client
-            self.client = MongoClient(connection_string, serverSelectionTimeoutMS=30000)
-            
-            # Test the connection
-            self.client.admin.command('ping')
+            # Initialize MongoDB client; connect=False defers all network I/O to the
+            # first operation, so constructing the client never blocks startup
+            self.client = MongoClient(
+                connection_string,
+                serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                connect=False,
+                event_listeners=mongo_event_listeners()
+            )
             
             # Use trail_blazer database
             self.db = self.client.trail_blazer
@@ -72,187 +88,21 @@ class MongoDBClient:
             self.workflows_collection = self.db.workflows
             self.auth_configs_collection = self.db.auth_configs
             
-            # Create index on email for faster queries and uniqueness
-            if self.early_access_collection is not None:
-                self.early_access_collection.create_index("email", unique=True)
-            
-            # Create indexes on users collection
-            if self.users_collection is not None:
-                # self.users_collection.create_index("email", unique=True)
-                # Add index on user_id for uniqueness and queries
-                # try:
-                #     self.users_collection.create_index("user_id", unique=True)
-                #     print("✅ Created index on user_id for users collection")
-                # except Exception as e:
-                #     print(f"⚠️ Could not create user_id index: {e}")
-                # # Add index on created_at for sorting (required by Azure Cosmos DB)
-                # try:
-                #     self.users_collection.create_index("created_at")
-                #     print("✅ Created index on created_at for users collection")
-                # except Exception as e:
-                #     print(f"⚠️ Could not create created_at index: {e}")
-                # # Add index on status for filtering
-                # try:
-                #     self.users_collection.create_index("status")
-                #     print("✅ Created index on status for users collection")
-                # except Exception as e:
-                #     print(f"⚠️ Could not create status index: {e}")
-                pass
-            
-            # Create index on org_id for organizations collection
-            if self.organizations_collection is not None:
-                self.organizations_collection.create_index("org_id", unique=True)
-                self.organizations_collection.create_index("company_name", unique=True)
-            
-            # Create indexes on api_keys collection
-            if self.api_keys_collection is not None:
-                self.api_keys_collection.create_index("key_id", unique=True)
-                self.api_keys_collection.create_index("hashed_key", unique=True)
-                self.api_keys_collection.create_index("expires_at")
-            
-            # Create indexes on invitations collection
-            if self.invitations_collection is not None:
-                # Create composite unique index on (invite_id, email) to allow multiple emails per invite_id
-                try:
-                    # self.invitations_collection.create_index([("invite_id", 1), ("email", 1)], unique=True)
-                    # print("✅ Created composite unique index on (invite_id, email)")
-                    pass
-                except Exception as e:
-                    print(f"❌ Failed to create composite unique index: {e}")
-                
-                # Create other indexes
-                try:
-                    self.invitations_collection.create_index("email")
-                    self.invitations_collection.create_index("expires_at")
-                    print("✅ Created additional indexes on invitations collection")
-                except Exception as e:
-                    print(f"⚠️ Could not create additional indexes: {e}")
-            
-            # Create indexes on flows collection
-            if self.flows_collection is not None:
-                try:
-                    # self.flows_collection.create_index("flow_id", unique=True)
-                    # self.flows_collection.create_index("created_at")
-                    # self.flows_collection.create_index("name")
-                    # self.flows_collection.create_index("status")
-                    # self.flows_collection.create_index("points_count")
-                    # self.flows_collection.create_index("last_updated")
-                    # self.flows_collection.create_index("project_id")
-                    print("✅ Created indexes on flows collection (including flattened fields)")
-                except Exception as e:
-                    print(f"⚠️ Could not create flows collection indexes: {e}")
-            
-            # Create indexes on projects collection
-            if self.projects_collection is not None:
-                try:
-                    # self.projects_collection.create_index("project_id", unique=True)
-                    # self.projects_collection.create_index("org_id")
-                    # self.projects_collection.create_index("created_by_user_id")
-                    # self.projects_collection.create_index("created_at")
-                    # self.projects_collection.create_index("status")
-                    print("✅ Created indexes on projects collection")
-                except Exception as e:
-                    print(f"⚠️ Could not create projects collection indexes: {e}")
-            
-            # Create indexes on tracks collection
-            # if self.tracks_collection is not None:
-            #     try:
-                    # self.tracks_collection.create_index("track_id", unique=True)
-                    # self.tracks_collection.create_index("project_id")
-                    # self.tracks_collection.create_index("org_id")
-                    # self.tracks_collection.create_index("url")
-                    # self.tracks_collection.create_index("status")
-                    # self.tracks_collection.create_index("created_at")
-                    # self.tracks_collection.create_index("navigation_id")
-                #     print("✅ Created indexes on tracks collection")
-                # except Exception as e:
-                #     print(f"⚠️ Could not create tracks collection indexes: {e}")
-            
-            # Create indexes on track_settings collection
-            if self.track_settings_collection is not None:
-                try:
-                    # self.track_settings_collection.create_index("project_id", unique=True)
-                    # self.track_settings_collection.create_index("org_id")
-                    # self.track_settings_collection.create_index("updated_at")
-                    print("✅ Created indexes on track_settings collection")
-                except Exception as e:
-                    print(f"⚠️ Could not create track_settings collection indexes: {e}")
-            
-            # Create indexes on app_navigations collection
-            if self.app_navigations_collection is not None:
-                try:
-                    # self.app_navigations_collection.create_index("navigation_id", unique=True)
-                    # self.app_navigations_collection.create_index("project_id")
-                    # self.app_navigations_collection.create_index("org_id")
-                    # self.app_navigations_collection.create_index("url")
-                    # self.app_navigations_collection.create_index("created_at")
-                    print("✅ Created indexes on app_navigations collection")
-                except Exception as e:
-                    print(f"⚠️ Could not create app_navigations collection indexes: {e}")
-            
-            # Create indexes on search_hooks collection
-            if self.search_hooks_collection is not None:
-                try:
-                    self.search_hooks_collection.create_index("search_hook_id", unique=True)
-                    self.search_hooks_collection.create_index("project_id")
-                    self.search_hooks_collection.create_index("org_id")
-                    self.search_hooks_collection.create_index("created_at")
-                    print("✅ Created indexes on search_hooks collection")
-                except Exception as e:
-                    print(f"⚠️ Could not create search_hooks collection indexes: {e}")
-            
-            # Create indexes on workflows collection
-            if self.workflows_collection is not None:
-                try:
-                    self.workflows_collection.create_index("workflow_id", unique=True)
-                    self.workflows_collection.create_index("project_id")
-                    self.workflows_collection.create_index("org_id")
-                    self.workflows_collection.create_index("created_at")
-                    print("✅ Created indexes on workflows collection")
-                except Exception as e:
-                    print(f"⚠️ Could not create workflows collection indexes: {e}")
-            
-            # Create indexes on logs collection
-            if self.logs_collection is not None:
-                try:
-                    # self.logs_collection.create_index("request_id", unique=True)
-                    # self.logs_collection.create_index("project_id")
-                    # self.logs_collection.create_index("created_at")
-                    # self.logs_collection.create_index("updated_at")
-                    # self.logs_collection.create_index("type")
-                    # self.logs_collection.create_index("feedback_response")
-                    # # Compound index for efficient querying
-                    # self.logs_collection.create_index([
-                    #     ("project_id", 1),
-                    #     ("created_at", -1)
-                    # ])
-                    # # Compound index for feedback queries
-                    # self.logs_collection.create_index([
-                    #     ("project_id", 1),
-                    #     ("feedback_response", 1)
-                    # ])
-                    print("✅ Created indexes on logs collection")
-                except Exception as e:
-                    print(f"⚠️ Could not create logs collection indexes: {e}")
-            
-            # Create indexes on studio_config collection
-            if self.studio_config_collection is not None:
-                try:
-                    # self.studio_config_collection.create_index("project_id", unique=True)
-                    # self.studio_config_collection.create_index("org_id")
-                    # self.studio_config_collection.create_index("created_at")
-                    # self.studio_config_collection.create_index("updated_at")
-                    # self.studio_config_collection.create_index("created_by")
-                    print("✅ Created indexes on studio_config collection")
-                except Exception as e:
-                    print(f"⚠️ Could not create studio_config collection indexes: {e}")
-            
-            print("✅ Connected to MongoDB successfully")
+            print("✅ MongoDB client configured")
             
         except Exception as e:
             print(f"❌ Failed to connect to MongoDB: {e}")
             os._exit(1)
     
+    def ping(self) -> bool:
+        """Check that the MongoDB server is reachable"""
+        try:
+            self.client.admin.command('ping')
+            return True
+        except Exception as e:
+            print(f"❌ MongoDB ping failed: {e}")
+            return False
+    
     def is_connected(self) -> bool:
         """Check if MongoDB is connected"""
         return self.client is not None and self.db is not None
@@ -1497,9 +1347,8 @@ class MongoDBClient:
             
             # Add embeddings if provided
             if embeddings:
+                flattened_document.update(encode_embedding_fields(embeddings))
                 flattened_document.update({
-                    "name_embedding": embeddings.get("name_embedding"),
-                    "description_embedding": embeddings.get("description_embedding"),
                     "embedding_model": embeddings.get("embedding_model"),
                     "name_length": embeddings.get("name_length"),
                     "description_length": embeddings.get("description_length")
@@ -1522,6 +1371,7 @@ class MongoDBClient:
                 
                 if result.matched_count > 0:
                     print(f"✅ Flow data updated successfully: {flow_id}")
+                    self._refresh_flow_index(flow_id)
                     return {
                         "success": True,
                         "message": "Flow data updated successfully",
@@ -1538,6 +1388,7 @@ class MongoDBClient:
                 
                 if result.inserted_id:
                     print(f"✅ Flow data saved successfully: {flow_id}")
+                    self._refresh_flow_index(flow_id)
                     return {
                         "success": True,
                         "message": "Flow data saved successfully",
@@ -1590,9 +1441,8 @@ class MongoDBClient:
             
             # Add embeddings if provided
             if embeddings:
+                update_document.update(encode_embedding_fields(embeddings))
                 update_document.update({
-                    "name_embedding": embeddings.get("name_embedding"),
-                    "description_embedding": embeddings.get("description_embedding"),
                     "embedding_model": embeddings.get("embedding_model"),
                     "name_length": embeddings.get("name_length"),
                     "description_length": embeddings.get("description_length")
@@ -1609,6 +1459,7 @@ class MongoDBClient:
             
             if result.matched_count > 0:
                 print(f"✅ Flow data updated successfully: {flow_id}")
+                self._refresh_flow_index(flow_id)
                 return {
                     "success": True,
                     "message": "Flow data updated successfully",
@@ -1710,7 +1561,8 @@ class MongoDBClient:
                 {"_id": 0}  # Exclude MongoDB _id field
             ).skip(skip).limit(limit).sort(sort_by, sort_order)
             
-            flows = list(cursor)
+            # Embeddings may be stored packed; return them as float lists
+            flows = [decode_embedding_fields(flow) for flow in cursor]
             
             print(f"📄 Retrieved {len(flows)} flows for current page")
             
@@ -1770,6 +1622,7 @@ class MongoDBClient:
             
             if result.matched_count > 0:
                 print(f"✅ Flow discarded successfully: {flow_id}")
+                self._refresh_flow_index(flow_id)
                 return {
                     "success": True,
                     "message": "Flow discarded successfully",
@@ -1790,13 +1643,14 @@ class MongoDBClient:
     
     def search_flows_by_embedding(self, query_embedding: List[float], limit: int = 10, min_score: float = 0.7, org_id: Optional[str] = None, project_id: Optional[str] = None) -> dict:
         """
-        Search flows by embedding similarity using MongoDB's $vectorSearch (if available) or cosine similarity
+        Search flows by cosine similarity of their name or description embedding
         
         Args:
             query_embedding: The embedding vector to search for
             limit: Maximum number of results to return
             min_score: Minimum similarity score (0.0 to 1.0)
             org_id: Optional organization ID to filter flows by organization
+            project_id: Optional project ID to filter flows by project
             
         Returns:
             Dictionary containing search results with flows and scores
@@ -1812,65 +1666,25 @@ class MongoDBClient:
             }
         
         try:
-            # For now, we'll implement a simple cosine similarity search
-            # In the future, this could be optimized with MongoDB's $vectorSearch if available
-            
             # Build query filter
             query_filter = {
                 "name_embedding": {"$exists": True},
                 "status": {"$ne": "discarded"}
             }
             
-            # Add organization filter if provided
             if org_id:
+                # Served from the organization's cached embedding matrix; Mongo is read on a cold cache only
                 query_filter["org_id"] = org_id
+                matrix = get_flow_index_cache().get(
+                    org_id, lambda: self.flows_collection.find(query_filter, FLOW_INDEX_PROJECTION)
+                )
+            else:
+                # Searches across organizations are not cached: scan the matching flows
+                if project_id:
+                    query_filter["project_id"] = project_id
+                matrix = FlowEmbeddingMatrix(list(self.flows_collection.find(query_filter, FLOW_INDEX_PROJECTION)))
             
-            # Add project filter if provided
-            if project_id:
-                query_filter["project_id"] = project_id
-            
-            # Get all flows with embeddings
-            cursor = self.flows_collection.find(
-                query_filter,
-                {
-                    "_id": 0,
-                    "flow_id": 1,
-                    "name": 1,
-                    "description": 1,
-                    "name_embedding": 1,
-                    "description_embedding": 1,
-                    "created_at": 1,
-                    "points_count": 1
-                }
-            )
-            
-            flows_with_scores = []
-            
-            for flow in cursor:
-                # Calculate cosine similarity for name embedding
-                name_similarity = self._cosine_similarity(query_embedding, flow.get("name_embedding", []))
-                description_similarity = self._cosine_similarity(query_embedding, flow.get("description_embedding", []))
-                
-                # Use the higher of the two similarities
-                max_similarity = max(name_similarity, description_similarity)
-                
-                if max_similarity >= min_score:
-                    flows_with_scores.append({
-                        "flow_id": flow["flow_id"],
-                        "name": flow["name"],
-                        "description": flow["description"],
-                        "created_at": flow["created_at"],
-                        "points_count": flow["points_count"],
-                        "similarity_score": max_similarity,
-                        "name_similarity": name_similarity,
-                        "description_similarity": description_similarity
-                    })
-            
-            # Sort by similarity score (descending)
-            flows_with_scores.sort(key=lambda x: x["similarity_score"], reverse=True)
-            
-            # Apply limit
-            flows_with_scores = flows_with_scores[:limit]
+            flows_with_scores = matrix.search(query_embedding, limit, min_score, project_id=project_id)
             
             print(f"📊 Found {len(flows_with_scores)} flows with similarity >= {min_score}")
             
@@ -1890,50 +1704,15 @@ class MongoDBClient:
                 "total_count": 0
             }
     
-    def _cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
-        """
-        Calculate cosine similarity between two vectors
-        
-        Args:
-            vec1: First vector
-            vec2: Second vector
-            
-        Returns:
-            Cosine similarity score (0.0 to 1.0)
-        """
-        if not vec1 or not vec2 or len(vec1) != len(vec2):
-            return 0.0
-        
+    def _refresh_flow_index(self, flow_id: str):
+        """Apply a written flow to the cached flow embedding matrices"""
         try:
-            import numpy as np
-            
-            # Convert to numpy arrays
-            v1 = np.array(vec1)
-            v2 = np.array(vec2)
-            
-            # Calculate cosine similarity
-            dot_product = np.dot(v1, v2)
-            norm_v1 = np.linalg.norm(v1)
-            norm_v2 = np.linalg.norm(v2)
-            
-            if norm_v1 == 0 or norm_v2 == 0:
-                return 0.0
-            
-            similarity = dot_product / (norm_v1 * norm_v2)
-            return float(similarity)
-            
-        except ImportError:
-            # Fallback to pure Python implementation
-            dot_product = sum(a * b for a, b in zip(vec1, vec2))
-            norm_v1 = sum(a * a for a in vec1) ** 0.5
-            norm_v2 = sum(b * b for b in vec2) ** 0.5
-            
-            if norm_v1 == 0 or norm_v2 == 0:
-                return 0.0
-            
-            similarity = dot_product / (norm_v1 * norm_v2)
-            return similarity
-
+            flow = self.flows_collection.find_one({"flow_id": flow_id}, FLOW_INDEX_PROJECTION)
+            get_flow_index_cache().update_flow(flow_id, flow)
+        except Exception as e:
+            print(f"⚠️ Could not update flow index for {flow_id}, clearing it: {e}")
+            get_flow_index_cache().clear()
+    
     def create_project(self, name: str, description: Optional[str] = None, org_id: Optional[str] = None, created_by_user_id: Optional[str] = None, is_default: bool = False) -> dict:
         """Create a new project"""
         print(f"📁 MongoDB create_project called for name: {name}, org_id: {org_id}")
@@ -2097,7 +1876,7 @@ class MongoDBClient:
                 "total_count": 0
             }
     
-    def update_project(self, project_id: str, name: Optional[str] = None, description: Optional[str] = None, status: Optional[str] = None, org_id: Optional[str] = None) -> dict:
+    def update_project(self, project_id: str, name: Optional[str] = None, description: Optional[str] = None, status: Optional[str] = None, org_id: Optional[str] = None, search_mode: Optional[str] = None, index_compression: Optional[str] = None) -> dict:
         """Update project details"""
         print(f"✏️ MongoDB update_project called for project_id: {project_id}")
         
@@ -2133,6 +1912,12 @@ class MongoDBClient:
             if status is not None:
                 update_data["status"] = status
             
+            if search_mode is not None:
+                update_data["settings.search_mode"] = search_mode
+            
+            if index_compression is not None:
+                update_data["settings.index_compression"] = index_compression
+            
             if not update_data:
                 return {
                     "success": False,
@@ -2603,12 +2388,20 @@ class MongoDBClient:
     def delete_navigation(self, navigation_id: str, org_id: str) -> bool:
         """Delete a navigation"""
         try:
-            result = self.app_navigations_collection.delete_one({
-                "navigation_id": navigation_id,
-                "org_id": org_id
-            })
+            deleted = self.app_navigations_collection.find_one_and_delete(
+                {
+                    "navigation_id": navigation_id,
+                    "org_id": org_id
+                },
+                projection={"project_id": 1}
+            )
             
-            return result.deleted_count > 0
+            if deleted is None:
+                return False
+            
+            # Cached /query results of the project may include this navigation
+            get_query_result_cache().invalidate(deleted.get("project_id"))
+            return True
             
         except Exception as e:
             print(f"❌ Error deleting navigation: {e}")
@@ -2641,6 +2434,7 @@ class MongoDBClient:
             
             if result.inserted_id:
                 print(f"✅ Navigation created successfully with ID: {navigation_id}")
+                get_query_result_cache().invalidate(project_id)
                 return navigation_id
             else:
                 print(f"❌ Failed to create navigation")
@@ -2673,6 +2467,7 @@ class MongoDBClient:
             
             if result.matched_count > 0:
                 print(f"✅ Navigation updated successfully: {navigation_id}")
+                get_query_result_cache().invalidate(project_id)
                 return True
             else:
                 print(f"❌ Navigation not found: {navigation_id}")
@@ -2976,6 +2771,61 @@ class MongoDBClient:
                 "message": "Internal server error"
             }
 
+    def create_log_entries(self, entries: list) -> dict:
+        """Create many log entries with one bulk insert
+
+        Each entry is a dict with the create_log_entry arguments
+        (request_id, project_id, request_query, response, log_type, time_taken, error).
+        """
+        print(f"📝 Creating {len(entries)} log entries")
+
+        if not self.is_connected() or self.logs_collection is None:
+            return {
+                "success": False,
+                "message": "Database connection not available"
+            }
+
+        if not entries:
+            return {
+                "success": True,
+                "message": "No log entries to create",
+                "inserted_count": 0
+            }
+
+        try:
+            now = datetime.utcnow()
+            log_entries = [
+                {
+                    "request_id": entry["request_id"],
+                    "created_at": now,
+                    "updated_at": now,
+                    "project_id": entry["project_id"],
+                    "request_query": entry["request_query"],
+                    "response": entry["response"],
+                    "type": entry["log_type"],
+                    "feedback_response": None,
+                    "time_taken": entry["time_taken"],
+                    "error": entry.get("error")
+                }
+                for entry in entries
+            ]
+
+            result = self.logs_collection.insert_many(log_entries, ordered=False)
+
+            print(f"✅ Created {len(result.inserted_ids)} log entries")
+            return {
+                "success": True,
+                "message": "Log entries created successfully",
+                "inserted_count": len(result.inserted_ids)
+            }
+
+        except Exception as e:
+            print(f"❌ Error creating log entries: {e}")
+            return {
+                "success": False,
+                "message": "Internal server error"
+            }
+
     def update_log_feedback(self, request_id: str, feedback_response: str) -> dict:
         """Update feedback for a log entry"""
         print(f"📝 Updating feedback for request_id: {request_id}, feedback: {feedback_response}")
@@ -3510,8 +3360,14 @@ class MongoDBClient:
             return False
 
 # Global MongoDB client instance
-mongo_client = MongoDBClient()
+mongo_client = None
+_mongo_client_lock = threading.Lock()
 
 def get_mongo_client() -> MongoDBClient:
-    """Get the global MongoDB client instance"""
+    """Get the global MongoDB client instance, creating it on first use"""
+    global mongo_client
+    if mongo_client is None:
+        with _mongo_client_lock:
+            if mongo_client is None:
+                mongo_client = MongoDBClient()
     return mongo_client 
\ No newline at end of file
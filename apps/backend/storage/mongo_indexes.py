@@ -0,0 +1,215 @@
+"""
+Declarative MongoDB index specification.
+
+Every index the application relies on is listed in INDEX_SPECS, per
+collection. They are created by a migration command, not at connect time:
+
+    python -m scripts.manage_indexes apply [--dry-run]
+    python -m scripts.manage_indexes verify
+
+`verify` explains every hot query shape and fails if any would scan the
+whole collection.
+"""
+import json
+from datetime import datetime, timedelta
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+
+def index(keys: list, **options) -> dict:
+    """One index: [(field, direction), ...] plus create_index options (unique, name, partialFilterExpression)"""
+    return {"keys": keys, **options}
+
+
+# Indexes without a name get MongoDB's default one ("field_1_other_-1"), so the
+# indexes that used to be created at connect time are recognised as applied.
+INDEX_SPECS = {
+    "early_access": [
+        index([("email", ASCENDING)], unique=True),
+    ],
+    "organizations": [
+        index([("org_id", ASCENDING)], unique=True),
+        index([("company_name", ASCENDING)], unique=True),
+    ],
+    "api_keys": [
+        index([("key_id", ASCENDING)], unique=True),
+        index([("hashed_key", ASCENDING)], unique=True),
+        index([("expires_at", ASCENDING)]),
+    ],
+    "invitations": [
+        index([("email", ASCENDING)]),
+        index([("expires_at", ASCENDING)]),
+    ],
+    "projects": [
+        index([("project_id", ASCENDING)], unique=True),
+        # list_projects: an organization's projects, newest first
+        index([("org_id", ASCENDING), ("created_at", DESCENDING)]),
+        # get_default_project: only default projects are indexed
+        index([("org_id", ASCENDING), ("status", ASCENDING)], name="org_id_status_default",
+              partialFilterExpression={"is_default": True}),
+    ],
+    "app_navigations": [
+        index([("navigation_id", ASCENDING)], unique=True),
+        # Project navigations in creation order (listing, index builds, fuzzy catalog)
+        index([("project_id", ASCENDING), ("created_at", ASCENDING)]),
+        index([("org_id", ASCENDING), ("project_id", ASCENDING), ("created_at", ASCENDING)]),
+    ],
+    "flows": [
+        index([("flow_id", ASCENDING)], unique=True),
+        # list_flows filters
+        index([("org_id", ASCENDING), ("project_id", ASCENDING), ("status", ASCENDING)]),
+        # search_flows_by_embedding cold loads: only flows with embeddings are indexed
+        index([("org_id", ASCENDING), ("status", ASCENDING)], name="org_id_status_with_embeddings",
+              partialFilterExpression={"name_embedding": {"$exists": True}}),
+    ],
+    "logs": [
+        # update_log_feedback
+        index([("request_id", ASCENDING)]),
+        # get_analytics_data: a project's logs in a time range
+        index([("project_id", ASCENDING), ("created_at", ASCENDING)]),
+    ],
+    "search_hooks": [
+        index([("search_hook_id", ASCENDING)], unique=True),
+        index([("project_id", ASCENDING)]),
+        index([("org_id", ASCENDING)]),
+        index([("created_at", ASCENDING)]),
+    ],
+    "studio_config": [
+        index([("project_id", ASCENDING)]),
+    ],
+    "workflows": [
+        index([("workflow_id", ASCENDING)], unique=True),
+        index([("project_id", ASCENDING)]),
+        index([("org_id", ASCENDING)]),
+        index([("created_at", ASCENDING)]),
+    ],
+}
+
+
+def _hot_queries() -> list:
+    """(collection, filter, sort, description) of every frequent query, with placeholder values"""
+    now = datetime.utcnow()
+    return [
+        ("logs", {"request_id": "r"}, None, "update_log_feedback"),
+        ("logs", {"project_id": "p", "created_at": {"$gte": now - timedelta(days=30), "$lte": now}}, None,
+         "get_analytics_data"),
+        ("logs", {"project_id": "p", "created_at": {"$gte": now - timedelta(days=30), "$lte": now},
+                  "feedback_response": {"$in": ["positive", "negative"]}}, None, "get_analytics_data feedback"),
+        ("app_navigations", {"project_id": "p"}, [("created_at", 1)], "get_navigations_by_org_and_project"),
+        ("app_navigations", {"project_id": "p", "org_id": "o"}, [("created_at", 1)],
+         "get_navigations_by_org_and_project (org)"),
+        ("app_navigations", {"navigation_id": "n", "org_id": "o"}, None, "get_navigation / delete_navigation"),
+        ("app_navigations", {"navigation_id": "n", "org_id": "o", "project_id": "p"}, None, "update_navigation"),
+        ("flows", {"flow_id": "f"}, None, "save_flow_data"),
+        ("flows", {"flow_id": "f", "org_id": "o"}, None, "get_flow_data / update_flow_data / discard_flow"),
+        ("flows", {"status": {"$ne": "discarded"}, "org_id": "o", "project_id": "p"}, None, "list_flows"),
+        ("flows", {"name_embedding": {"$exists": True}, "status": {"$ne": "discarded"}, "org_id": "o"}, None,
+         "search_flows_by_embedding"),
+        ("projects", {"project_id": "p"}, None, "get_project_by_id"),
+        ("projects", {"project_id": "p", "org_id": "o"}, None, "get_project_by_id (org)"),
+        ("projects", {"org_id": "o", "is_default": True, "status": "active"}, None, "get_default_project"),
+        ("projects", {"org_id": "o"}, [("created_at", -1)], "list_projects"),
+        ("api_keys", {"hashed_key": "h", "is_active": True}, None, "validate_api_key"),
+        ("studio_config", {"project_id": "p"}, None, "get_studio_config"),
+        ("workflows", {"org_id": "o", "project_id": "p"}, None, "list_workflows"),
+    ]
+
+
+def index_models(collection: str) -> list:
+    """IndexModels of a collection's specification"""
+    return [IndexModel(spec["keys"], **{key: value for key, value in spec.items() if key != "keys"})
+            for spec in INDEX_SPECS.get(collection, [])]
+
+
+def _comparable(document: dict) -> tuple:
+    """Key pattern and the options that make two indexes equivalent"""
+    return (
+        tuple((field, int(direction)) for field, direction in document["key"].items()),
+        bool(document.get("unique", False)),
+        json.dumps(document.get("partialFilterExpression"), sort_keys=True, default=str),
+    )
+
+
+def plan_indexes(db) -> list:
+    """
+    Compare the specification with the indexes that exist.
+
+    Returns one {"collection", "name", "action", "model"} per specified index,
+    with action "ok", "create", or "conflict" (an index of that name exists
+    with different keys or options and must be dropped first), plus "extra"
+    entries for indexes that are not in the specification.
+    """
+    plan = []
+    for collection, models in ((name, index_models(name)) for name in INDEX_SPECS):
+        existing = {document["name"]: document for document in db[collection].list_indexes()}
+        specified = set()
+        for model in models:
+            wanted = model.document
+            name = wanted["name"]
+            specified.add(name)
+            current = existing.get(name)
+            if current is None:
+                action = "create"
+            elif _comparable(current) == _comparable(wanted):
+                action = "ok"
+            else:
+                action = "conflict"
+            plan.append({"collection": collection, "name": name, "action": action, "model": model})
+        for name in existing:
+            if name != "_id_" and name not in specified:
+                plan.append({"collection": collection, "name": name, "action": "extra", "model": None})
+    return plan
+
+
+def apply_indexes(db, dry_run: bool = False, replace_conflicts: bool = False) -> list:
+    """Create missing indexes (idempotent); returns the plan with the outcome of each entry"""
+    plan = plan_indexes(db)
+    for entry in plan:
+        if dry_run or entry["action"] not in ("create", "conflict"):
+            continue
+        if entry["action"] == "conflict" and not replace_conflicts:
+            continue
+        try:
+            if entry["action"] == "conflict":
+                db[entry["collection"]].drop_index(entry["name"])
+            db[entry["collection"]].create_indexes([entry["model"]])
+            entry["result"] = "applied"
+        except Exception as e:
+            entry["result"] = f"failed: {e}"
+    return plan
+
+
+def _stages(plan) -> list:
+    """Every stage name in an explain plan tree"""
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(_stages(value))
+    elif isinstance(plan, list):
+        for value in plan:
+            stages.extend(_stages(value))
+    return stages
+
+
+def verify_query_plans(db) -> list:
+    """Explain every hot query shape; returns {"collection", "query", "stages", "collscan"} per query"""
+    results = []
+    for collection, query_filter, sort, description in _hot_queries():
+        cursor = db[collection].find(query_filter)
+        if sort:
+            cursor = cursor.sort(sort)
+        winning_plan = cursor.explain().get("queryPlanner", {}).get("winningPlan", {})
+        stages = _stages(winning_plan)
+        results.append({
+            "collection": collection,
+            "query": description,
+            "stages": stages,
+            "collscan": "COLLSCAN" in stages
+        })
+    return results
+
+
+def missing_indexes(db) -> list:
+    """Specified indexes that do not exist yet, as "collection.name" """
+    return [f"{entry['collection']}.{entry['name']}" for entry in plan_indexes(db) if entry["action"] == "create"]
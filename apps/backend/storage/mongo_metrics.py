@@ -0,0 +1,205 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from typing import Optional
+from pymongo import monitoring
+
+# Record every MongoDB command's latency per collection and command name
+MONGO_COMMAND_MONITORING = os.getenv("MONGO_COMMAND_MONITORING", "true").lower() == "true"
+
+# Commands at least this slow are kept as samples (with their filter shape),
+# and printed as they happen when MONGO_SLOW_QUERY_LOG is enabled
+MONGO_SLOW_QUERY_MS = float(os.getenv("MONGO_SLOW_QUERY_MS", "100"))
+MONGO_SLOW_QUERY_LOG = os.getenv("MONGO_SLOW_QUERY_LOG", "false").lower() == "true"
+MONGO_SLOW_SAMPLES = int(os.getenv("MONGO_SLOW_SAMPLES", "100"))
+
+# Upper bounds (ms) of the latency histogram buckets
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Connection handshakes and health checks, not application queries
+IGNORED_COMMANDS = {"hello", "ismaster", "isMaster", "ping", "buildInfo", "endSessions",
+                    "saslStart", "saslContinue", "authenticate", "getnonce"}
+
+# Files whose frames name the client method behind a slow command
+CLIENT_FILES = ("mongo_client.py", "async_mongo_client.py")
+
+
+def redact(value):
+    """Shape of a filter: keys and operators are kept, every value becomes "?" """
+    if isinstance(value, dict):
+        return {key: redact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        # Operator lists ($and, $or) keep their structure, value lists collapse
+        if value and all(isinstance(item, dict) for item in value):
+            return [redact(item) for item in value]
+        return ["?"] if value else []
+    return "?"
+
+
+def command_shape(command_name: str, command: dict) -> Optional[dict]:
+    """Redacted filter (and sort) of a command, where it has one"""
+    if command_name in ("find", "count", "distinct", "findAndModify"):
+        shape = {"filter": redact(command.get("filter", command.get("query", {})))}
+        if command.get("sort"):
+            shape["sort"] = dict(command["sort"])
+        return shape
+    if command_name in ("update", "delete"):
+        statements = command.get("updates" if command_name == "update" else "deletes") or [{}]
+        return {"filter": redact(statements[0].get("q", {})), "statements": len(statements)}
+    if command_name == "aggregate":
+        return {"pipeline": [{stage: redact(spec) if stage == "$match" else "..." for stage, spec in step.items()}
+                             for step in command.get("pipeline", [])]}
+    return None
+
+
+def _documents_returned(reply: dict) -> int:
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch", cursor.get("nextBatch", [])))
+    if "value" in reply:
+        # findAndModify
+        return 1 if reply["value"] is not None else 0
+    if "values" in reply:
+        # distinct
+        return len(reply["values"])
+    return 0
+
+
+def _calling_method() -> Optional[str]:
+    """Name of the MongoDBClient / AsyncMongoDBClient method running the current command"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        if frame.f_code.co_filename.endswith(CLIENT_FILES):
+            return frame.f_code.co_name
+        frame = frame.f_back
+    return None
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """
+    pymongo command listener keeping per collection and command latency
+    histograms, documents returned, and samples of slow commands with their
+    redacted filter shape.
+    """
+
+    def __init__(self, slow_query_ms: float, log_slow_queries: bool, max_slow_samples: int):
+        self.slow_query_ms = slow_query_ms
+        self.log_slow_queries = log_slow_queries
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._operations = {}
+        self._slow_samples = deque(maxlen=max_slow_samples)
+        self.started_at = time.time()
+
+    def _operation(self, key: str) -> dict:
+        operation = self._operations.get(key)
+        if operation is None:
+            operation = {
+                "count": 0,
+                "errors": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "documents_returned": 0,
+                "latency_histogram_ms": {str(bucket): 0 for bucket in LATENCY_BUCKETS_MS}
+            }
+            operation["latency_histogram_ms"]["inf"] = 0
+            self._operations[key] = operation
+        return operation
+
+    def started(self, event):
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        command = event.command
+        collection = command.get(event.command_name) if event.command_name != "getMore" else command.get("collection")
+        pending = {
+            "collection": collection if isinstance(collection, str) else event.database_name,
+            "shape": None
+        }
+        try:
+            pending["shape"] = command_shape(event.command_name, command)
+        except Exception:
+            pass
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = pending
+
+    def _finish(self, event, reply: Optional[dict]):
+        with self._lock:
+            pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+
+        duration_ms = event.duration_micros / 1000
+        documents = _documents_returned(reply) if reply is not None else 0
+        bucket = next((str(b) for b in LATENCY_BUCKETS_MS if duration_ms <= b), "inf")
+        with self._lock:
+            operation = self._operation(f"{pending['collection']}.{event.command_name}")
+            operation["count"] += 1
+            operation["errors"] += reply is None
+            operation["total_ms"] += duration_ms
+            operation["max_ms"] = max(operation["max_ms"], duration_ms)
+            operation["documents_returned"] += documents
+            operation["latency_histogram_ms"][bucket] += 1
+
+        if duration_ms >= self.slow_query_ms:
+            sample = {
+                "at": time.time(),
+                "collection": pending["collection"],
+                "command": event.command_name,
+                "method": _calling_method(),
+                "duration_ms": duration_ms,
+                "documents_returned": documents,
+                "failed": reply is None,
+                "shape": pending["shape"]
+            }
+            with self._lock:
+                self._slow_samples.append(sample)
+            if self.log_slow_queries:
+                print(f"🐢 Slow MongoDB {event.command_name} on {pending['collection']} "
+                      f"({sample['method']}): {duration_ms:.1f}ms, {documents} docs, "
+                      f"shape={json.dumps(pending['shape'], default=str)}")
+
+    def succeeded(self, event):
+        self._finish(event, event.reply)
+
+    def failed(self, event):
+        self._finish(event, None)
+
+    def stats(self) -> dict:
+        """Per collection.command counters, slowest first, and recent slow samples"""
+        with self._lock:
+            operations = {
+                key: {
+                    **{field: value for field, value in operation.items() if field != "latency_histogram_ms"},
+                    "avg_ms": operation["total_ms"] / operation["count"] if operation["count"] else 0.0,
+                    "latency_histogram_ms": dict(operation["latency_histogram_ms"])
+                }
+                for key, operation in self._operations.items()
+            }
+            slow_samples = list(self._slow_samples)
+
+        return {
+            "since": self.started_at,
+            "slow_query_ms": self.slow_query_ms,
+            "operations": dict(sorted(operations.items(), key=lambda item: item[1]["total_ms"], reverse=True)),
+            "slow_samples": slow_samples[::-1]
+        }
+
+
+command_metrics = MongoCommandMetrics(
+    slow_query_ms=MONGO_SLOW_QUERY_MS,
+    log_slow_queries=MONGO_SLOW_QUERY_LOG,
+    max_slow_samples=MONGO_SLOW_SAMPLES
+)
+
+
+def get_command_metrics() -> MongoCommandMetrics:
+    """Get the process-wide MongoDB command metrics"""
+    return command_metrics
+
+
+def mongo_event_listeners() -> list:
+    """Listeners to pass to every MongoDB client"""
+    return [command_metrics] if MONGO_COMMAND_MONITORING else []
@@ -0,0 +1,141 @@
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Optional
+import numpy as np
+from rapidfuzz import fuzz
+from storage.mongo_client import get_mongo_client
+from storage.query_cache import get_query_result_cache
+
+# Scorer used by fuzzy search (any rapidfuzz.fuzz function name)
+FUZZY_SCORER = os.getenv("FUZZY_SCORER", "WRatio")
+
+# Projects whose phrase catalogs stay in memory, and how long a catalog may be
+# served before it is re-read. Writes made through other workers are noticed
+# through the project's shared write version; the TTL only matters when Redis
+# is unavailable.
+FUZZY_CATALOG_CACHE_SIZE = int(os.getenv("FUZZY_CATALOG_CACHE_SIZE", "256"))
+FUZZY_CATALOG_TTL_SECONDS = int(os.getenv("FUZZY_CATALOG_TTL_SECONDS", "300"))
+
+
+def get_scorer(name: str = FUZZY_SCORER):
+    """Resolve a rapidfuzz scorer by name"""
+    scorer = getattr(fuzz, name, None)
+    if scorer is None:
+        raise ValueError(f"Unknown FUZZY_SCORER: {name}")
+    return scorer
+
+
+class PhraseCatalog:
+    """
+    All phrases of a project flattened into one list.
+
+    Phrases are stored navigation by navigation, so navigation `i` owns
+    phrases[starts[i]:starts[i + 1]] and `owners` maps each phrase back to
+    its navigation.
+    """
+
+    def __init__(self, navigations: list, version: Optional[str] = None):
+        self.navigations = []
+        self.phrases = []
+        starts = [0]
+        for doc in navigations:
+            self.navigations.append({
+                "url": doc["url"],
+                "title": doc["title"],
+                "navigation_id": doc.get("navigation_id", ""),
+            })
+            self.phrases.extend(doc.get("phrases") or [])
+            starts.append(len(self.phrases))
+
+        self.starts = np.array(starts, dtype=np.int64)
+        self.owners = np.repeat(np.arange(len(self.navigations), dtype=np.int32), np.diff(self.starts))
+        self.loaded_at = time.monotonic()
+        # Project write version (see QueryResultCache.project_version) read before loading
+        self.version = version
+
+    def __len__(self):
+        return len(self.phrases)
+
+    def phrase_range(self, navigation: int) -> tuple:
+        return int(self.starts[navigation]), int(self.starts[navigation + 1])
+
+
+class PhraseCatalogCache:
+    """
+    Per-process LRU of project phrase catalogs.
+
+    invalidate() drops a catalog on writes made through this worker; a
+    catalog is also reloaded once the project's shared write version, bumped
+    by every worker's navigation writes, no longer matches the one it was
+    loaded at.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped per project on every invalidation so a catalog loaded concurrently with a write is not cached
+        self._writes = defaultdict(int)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, project_id: str) -> Optional[PhraseCatalog]:
+        """Return a project's catalog, reading its navigations from Mongo if needed"""
+        version = get_query_result_cache().project_version(project_id)
+        with self._lock:
+            catalog = self._entries.get(project_id)
+            if (catalog is not None and time.monotonic() - catalog.loaded_at < self.ttl_seconds
+                    and (version is None or catalog.version == version)):
+                self._entries.move_to_end(project_id)
+                self.hits += 1
+                return catalog
+            self.misses += 1
+            writes = self._writes.get(project_id, 0)
+
+        collection = get_mongo_client().client["trail_blazer"]["app_navigations"]
+        navigations = list(collection.find(
+            {"project_id": project_id},
+            {"_id": 0, "url": 1, "title": 1, "navigation_id": 1, "phrases": 1}
+        ))
+        catalog = PhraseCatalog(navigations, version)
+
+        with self._lock:
+            if self._writes.get(project_id, 0) == writes:
+                self._entries[project_id] = catalog
+                self._entries.move_to_end(project_id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return catalog
+
+    def invalidate(self, project_id: str):
+        """Drop a project's catalog so the next search re-reads it"""
+        with self._lock:
+            self._writes[project_id] += 1
+            self._entries.pop(project_id, None)
+
+    def stats(self) -> dict:
+        """Return cache counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "phrases": sum(len(catalog) for catalog in self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0
+            }
+
+
+phrase_catalog_cache = PhraseCatalogCache(
+    max_entries=FUZZY_CATALOG_CACHE_SIZE,
+    ttl_seconds=FUZZY_CATALOG_TTL_SECONDS
+)
+
+
+def get_phrase_catalog_cache() -> PhraseCatalogCache:
+    """Get the process-wide phrase catalog cache"""
+    return phrase_catalog_cache
@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Optional
+from storage.redis_client import redis_client
+from storage.embeddings import normalize_query
+from storage.index_artifacts import SHARED_STORAGE, artifact_signature
+
+# Redis cache of /query results, shared by all workers
+QUERY_RESULT_CACHE_ENABLED = os.getenv("QUERY_RESULT_CACHE_ENABLED", "true").lower() == "true"
+QUERY_RESULT_CACHE_TTL_SECONDS = int(os.getenv("QUERY_RESULT_CACHE_TTL_SECONDS", "300"))
+
+# Size caps: entries per project version, serialized bytes per entry and query length
+QUERY_RESULT_CACHE_MAX_ENTRIES_PER_PROJECT = int(os.getenv("QUERY_RESULT_CACHE_MAX_ENTRIES_PER_PROJECT", "10000"))
+QUERY_RESULT_CACHE_MAX_ENTRY_BYTES = int(os.getenv("QUERY_RESULT_CACHE_MAX_ENTRY_BYTES", "16384"))
+QUERY_RESULT_CACHE_MAX_QUERY_LENGTH = 512
+
+VERSION_KEY = "qres:version:{project_id}"
+ENTRY_KEY = "qres:{project_id}:{version}:{index_version}:{mode}:{k}:{digest}"
+COUNT_KEY = "qres:count:{project_id}:{version}"
+
+
+def _index_version(project_id: str) -> str:
+    """Version of the published index artifact serving a project"""
+    if SHARED_STORAGE:
+        # Imported here because shared_index pulls in the whole search stack
+        from storage.shared_index import shard_key
+        project_id = shard_key(project_id)
+    signature = artifact_signature(project_id)
+    return signature.version if signature else "none"
+
+
+class QueryResultCache:
+    """
+    Cache of /query results keyed by project, query, k and search mode.
+
+    Every key embeds the project's version counter, which MongoDBClient
+    bumps on each navigation write, and the version of the published index.
+    Invalidating a project is a single INCR: entries of older versions are
+    never read again and expire with their TTL.
+    """
+
+    def __init__(self, client, enabled: bool, ttl_seconds: int, max_entries_per_project: int, max_entry_bytes: int):
+        self.client = client
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self.max_entries_per_project = max_entries_per_project
+        self.max_entry_bytes = max_entry_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.skipped = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def project_version(self, project_id: str) -> Optional[str]:
+        """
+        The project's navigation write counter, shared by all workers, or None
+        if Redis is unavailable. Other per-process caches of project data
+        compare it to the version they loaded.
+        """
+        try:
+            return self.client.get(VERSION_KEY.format(project_id=project_id)) or "0"
+        except Exception as e:
+            self._count("errors")
+            print(f"⚠️ Could not read the write version of project {project_id}: {e}")
+            return None
+
+    def _entry_key(self, project_id: str, query: str, k: int, mode: str) -> tuple:
+        version = self.client.get(VERSION_KEY.format(project_id=project_id)) or "0"
+        digest = hashlib.sha1(normalize_query(query).encode()).hexdigest()
+        key = ENTRY_KEY.format(project_id=project_id, version=version, index_version=_index_version(project_id),
+                               mode=mode, k=k, digest=digest)
+        return key, version
+
+    def get(self, project_id: str, query: str, k: int, mode: str) -> tuple:
+        """
+        Look up cached results; returns (results or None, key).
+
+        Pass the key to put() after a miss, so the results are stored under
+        the versions that were current before the search ran.
+        """
+        if not self.enabled or len(query) > QUERY_RESULT_CACHE_MAX_QUERY_LENGTH:
+            return None, None
+        try:
+            key, version = self._entry_key(project_id, query, k, mode)
+            raw = self.client.get(key)
+        except Exception as e:
+            self._count("errors")
+            print(f"⚠️ Query result cache lookup failed: {e}")
+            return None, None
+
+        if raw is None:
+            self._count("misses")
+            return None, (key, project_id, version)
+        self._count("hits")
+        return json.loads(raw), None
+
+    def put(self, entry: Optional[tuple], results: list):
+        """Store results under the key returned by a missed get()"""
+        if entry is None:
+            return
+        key, project_id, version = entry
+        payload = json.dumps(results)
+        if len(payload) > self.max_entry_bytes:
+            self._count("skipped")
+            return
+
+        try:
+            count_key = COUNT_KEY.format(project_id=project_id, version=version)
+            pipeline = self.client.pipeline()
+            pipeline.incr(count_key)
+            pipeline.expire(count_key, self.ttl_seconds)
+            count, _ = pipeline.execute()
+            if count > self.max_entries_per_project:
+                self._count("skipped")
+                return
+            self.client.set(key, payload, ex=self.ttl_seconds)
+            self._count("writes")
+        except Exception as e:
+            self._count("errors")
+            print(f"⚠️ Query result cache write failed: {e}")
+
+    def invalidate(self, project_id: str):
+        """Bump the project's version so none of its cached results are served again"""
+        try:
+            self.client.incr(VERSION_KEY.format(project_id=project_id))
+            self._count("invalidations")
+        except Exception as e:
+            self._count("errors")
+            print(f"⚠️ Query result cache invalidation failed for project {project_id}: {e}")
+
+    def stats(self) -> dict:
+        """Return hit counters for this worker"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "ttl_seconds": self.ttl_seconds,
+                "max_entries_per_project": self.max_entries_per_project,
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "skipped": self.skipped,
+                "invalidations": self.invalidations,
+                "errors": self.errors,
+                "hit_ratio": self.hits / lookups if lookups else 0.0
+            }
+
+
+query_result_cache = QueryResultCache(
+    redis_client,
+    enabled=QUERY_RESULT_CACHE_ENABLED,
+    ttl_seconds=QUERY_RESULT_CACHE_TTL_SECONDS,
+    max_entries_per_project=QUERY_RESULT_CACHE_MAX_ENTRIES_PER_PROJECT,
+    max_entry_bytes=QUERY_RESULT_CACHE_MAX_ENTRY_BYTES
+)
+
+
+def get_query_result_cache() -> QueryResultCache:
+    """Get the process-wide /query result cache"""
+    return query_result_cache
@@ -3,4 +3,7 @@ import os
 from dotenv import load_dotenv
 
 load_dotenv()
-redis_client = redis.from_url(os.getenv("REDIS_URL"), decode_responses=True) 
\ No newline at end of file
+redis_client = redis.from_url(os.getenv("REDIS_URL"), decode_responses=True)
+
+# Raw bytes client for binary payloads such as cached embedding vectors
+redis_binary_client = redis.from_url(os.getenv("REDIS_URL"))
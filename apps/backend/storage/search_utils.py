@@ -1,174 +1,394 @@
-import faiss
-import numpy as np
-import json
 import os
-from sentence_transformers import SentenceTransformer
+import threading
+import time
 from collections import defaultdict
+from typing import Optional
+import numpy as np
 from rapidfuzz import process
 from storage.mongo_client import get_mongo_client
+from storage.embeddings import encode_queries, encode_query
+from storage.index_artifacts import SHARED_STORAGE
+from storage.index_registry import get_index_registry
+from storage.lexical_index import reciprocal_rank_fusion
+from storage.phrase_catalog import get_phrase_catalog_cache, get_scorer
+from storage.shared_index import get_shared_project_index
 
-# Module-level initialization - create FAISS indices by project
-def _build_project_indices():
-    """Build FAISS indices for each project on module load"""
-    print("Building FAISS indices by project...")
-    mongo_client = get_mongo_client()
-    collection = mongo_client.client["trail_blazer"]["app_navigations"]
-    
-    # Create indices directory
-    os.makedirs("faiss_indices", exist_ok=True)
-    
-    # Group data by project_id
-    project_data = defaultdict(list)
-    for doc in collection.find():
-        project_id = doc.get("project_id")
-        if project_id:
-            url = doc["url"]
-            title = doc.get("title", "")
-            navigation_id = doc.get("navigation_id", "")
-            for phrase in doc.get("phrases", []):
-                project_data[project_id].append({
-                    "url": url,
-                    "phrase": phrase,
-                    "title": title,
-                    "navigation_id": navigation_id
-                })
-    
-    if not project_data:
-        print("No project data found for FAISS indices")
-        return
-    
-    # Load model once
-    model = SentenceTransformer("all-MiniLM-L6-v2")
-    
-    # Process each project
-    for project_id, items in project_data.items():
-        phrases = [item["phrase"] for item in items]
-        
-        # Create embeddings
-        embeddings = model.encode(phrases, convert_to_numpy=True, normalize_embeddings=True)
-        
-        # Build FAISS index
-        dimension = embeddings.shape[1]
-        index = faiss.IndexFlatIP(dimension)
-        index.add(embeddings)
-        
-        # Save index and metadata
-        index_path = f"faiss_indices/{project_id}.index"
-        metadata_path = f"faiss_indices/{project_id}_metadata.json"
-        
-        faiss.write_index(index, index_path)
-        with open(metadata_path, 'w') as f:
-            json.dump(items, f)
-        
-        print(f"✓ Created index for project {project_id}: {len(items)} phrases")
-    
-    print(f"✓ Completed building indices for {len(project_data)} projects")
-
-# Build indices on module load
-try:
-    global model
-    model = SentenceTransformer("all-MiniLM-L6-v2")
-    _build_project_indices()
-except Exception as e:
-    print(f"Warning: Failed to build FAISS indices: {e}")
-
-
-def fuzzy_search_by_project(query: str, project_id: str, limit: int = 5, score_threshold: int = 60):
-    """Fuzzy search by project_id with navigation_id support"""
-    mongo_client = get_mongo_client()
+# Indexes are built by the background worker in storage/index_builder.py;
+# this module only loads the finished artifacts.
+
+# Retrieval modes for /query: "dense" (FAISS), "lexical" (BM25) or "hybrid" (both, fused)
+SEARCH_MODES = ("dense", "lexical", "hybrid")
+DEFAULT_SEARCH_MODE = os.getenv("DEFAULT_SEARCH_MODE", "dense")
+
+# Candidates taken from each retriever before fusion, and the RRF rank constant
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "50"))
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+
+# Dense search fetches limit * DENSE_OVERSAMPLE phrase hits, then searches again with
+# DENSE_OVERSAMPLE_GROWTH times more until `limit` distinct navigations are found, at
+# most DENSE_OVERSAMPLE_MAX_PASSES more times
+DENSE_OVERSAMPLE = int(os.getenv("DENSE_OVERSAMPLE", "2"))
+DENSE_OVERSAMPLE_GROWTH = 4
+DENSE_OVERSAMPLE_MAX_PASSES = int(os.getenv("DENSE_OVERSAMPLE_MAX_PASSES", "3"))
 
-    # Access the app_navigations collection through the existing client
-    collection = mongo_client.client["trail_blazer"]["app_navigations"]
+# Most queries accepted by one /query/batch request
+QUERY_BATCH_MAX_SIZE = int(os.getenv("QUERY_BATCH_MAX_SIZE", "1000"))
 
-    # Get all documents for the project
-    project_data = list(collection.find({"project_id": project_id}))
+# Project-level search mode settings are cached briefly to avoid a Mongo read per query
+PROJECT_SEARCH_MODE_TTL_SECONDS = 60
+_project_search_modes = {}
+_project_search_modes_lock = threading.Lock()
 
-    if not project_data:
+
+def fuzzy_search_by_project(query: str, project_id: str, limit: int = 5, score_threshold: int = 60,
+                            scorer: Optional[str] = None):
+    """Fuzzy search by project_id with navigation_id support"""
+    catalog = get_phrase_catalog_cache().get(project_id)
+    if not len(catalog):
         return []
 
+    # Score every phrase of the project in one call
+    scores = process.cdist(
+        [query], catalog.phrases,
+        scorer=get_scorer(scorer) if scorer else get_scorer(),
+        score_cutoff=score_threshold,
+        dtype=np.float32,
+        workers=-1
+    )[0]
+
+    # Best score per navigation; navigations without a match stay at -1
+    matched = scores >= score_threshold
+    best = np.full(len(catalog.navigations), -1.0, dtype=np.float32)
+    np.maximum.at(best, catalog.owners[matched], scores[matched])
+
+    # Sort by max_score in descending order and return top K
+    ranked = np.argsort(-best, kind="stable")[:limit]
+
     results = []
+    for navigation in ranked:
+        if best[navigation] < 0:
+            break
+
+        start, end = catalog.phrase_range(navigation)
+        positions = start + np.flatnonzero(matched[start:end])
+        positions = positions[np.argsort(-scores[positions], kind="stable")]
+        matches = [(catalog.phrases[position], float(scores[position])) for position in positions]
+
+        results.append({
+            **catalog.navigations[navigation],
+            "best_phrase": matches[0][0],
+            "max_score": float(best[navigation]),
+            "all_matches": matches
+        })
+
+    return results
+
+
+def _elapsed_ms(started: float) -> float:
+    return (time.perf_counter() - started) * 1000
+
+
+def _embed_query(query: str, timings: Optional[dict] = None) -> np.ndarray:
+    started = time.perf_counter()
+    query_embedding = encode_query(query)
+    if timings is not None:
+        timings["embed_ms"] = _elapsed_ms(started)
+    return query_embedding
+
+
+def _dense_candidates(loaded, query: str, count: int, timings: Optional[dict] = None) -> list:
+    """Return up to `count` (phrase id, score) pairs from the FAISS index, best first"""
+    return _dense_candidate_rows(loaded, _embed_query(query, timings), count, timings)[0]
+
 
-    for doc in project_data:
-        url = doc["url"]
-        phrases = doc["phrases"]
-        navigation_id = doc.get("navigation_id", "")
+def _dense_candidate_rows(loaded, query_embeddings: np.ndarray, count: int, timings: Optional[dict] = None) -> list:
+    """Search the FAISS index once with a matrix of query embeddings; one candidate list per row"""
+    started = time.perf_counter()
+    # ntotal, not the metadata size: HNSW indexes keep removed vectors until their rebuild
+    scores, indices = loaded.index.search(query_embeddings, min(count, loaded.index.ntotal))
+    if timings is not None:
+        # Summed over the passes of an adaptive search
+        timings["dense_ms"] = timings.get("dense_ms", 0.0) + _elapsed_ms(started)
 
-        # Find matches for all phrases in this URL
-        matches = process.extract(query, phrases, limit=len(
-            phrases), score_cutoff=score_threshold)
+    # Skip padding (-1) and phrases removed since the index was written
+    return [
+        [(int(idx), float(score)) for score, idx in zip(row_scores, row_indices) if int(idx) in loaded.metadata]
+        for row_scores, row_indices in zip(scores, indices)
+    ]
 
-        if matches:
-            # Get the maximum score for this URL
-            max_score = max(score for _, score, _ in matches)
 
-            # Get the best matching phrase
-            best_match = max(matches, key=lambda x: x[1])
-            best_phrase = best_match[0]
+def _grouped_dense_results(loaded, query_embedding: np.ndarray, limit: int, score_threshold: float = 0.0,
+                           candidates: Optional[list] = None, count: Optional[int] = None,
+                           timings: Optional[dict] = None) -> list:
+    """
+    Top `limit` navigations for a (1, dimension) query embedding.
 
+    Starts from `candidates` (the first `count` hits, if already searched)
+    and searches again with more hits while navigations with many similar
+    phrases crowd out the others. Fewer than `limit` results come back when
+    the project has no further navigations above the threshold, or after
+    DENSE_OVERSAMPLE_MAX_PASSES extra searches.
+
+    Searches stop once the index itself is exhausted; tombstoned vectors of
+    removed phrases still occupy hits until the index is rebuilt.
+    """
+    available = loaded.index.ntotal
+    if candidates is None:
+        count = limit * DENSE_OVERSAMPLE
+        candidates = _dense_candidate_rows(loaded, query_embedding, count, timings)[0]
+
+    passes = 0
+    while True:
+        results = _navigation_results(loaded.metadata, candidates, limit, score_threshold)
+        if (len(results) >= limit or count >= available or passes >= DENSE_OVERSAMPLE_MAX_PASSES
+                or (candidates and candidates[-1][1] < score_threshold)):
+            return results
+
+        passes += 1
+        count = min(count * DENSE_OVERSAMPLE_GROWTH, available)
+        candidates = _dense_candidate_rows(loaded, query_embedding, count, timings)[0]
+
+
+def _lexical_candidates(loaded, query: str, count: int, timings: Optional[dict] = None) -> list:
+    """Return up to `count` (phrase id, score) pairs from the BM25 index, best first"""
+    started = time.perf_counter()
+    lexical = loaded.lexical
+    if timings is not None:
+        timings["lexical_build_ms"] = _elapsed_ms(started)
+
+    started = time.perf_counter()
+    candidates = lexical.search(query, count)
+    if timings is not None:
+        timings["lexical_ms"] = _elapsed_ms(started)
+    return [(phrase_id, score) for phrase_id, score in candidates if phrase_id in loaded.metadata]
+
+
+def _navigation_key(item: dict) -> str:
+    """Results are grouped per navigation; items indexed without a navigation ID fall back to their URL"""
+    return item.get("navigation_id") or item["url"]
+
+
+def _navigation_results(metadata: dict, candidates: list, limit: int, score_threshold: float = 0.0) -> list:
+    """Turn ranked (phrase id, score) pairs into one result per navigation"""
+    results = []
+    seen_navigations = set()
+
+    for phrase_id, score in candidates:
+        if score < score_threshold:
+            continue
+
+        item = metadata[phrase_id]
+        key = _navigation_key(item)
+
+        # Navigations may share a URL (e.g. different anchors or modals), so they are kept apart
+        if key not in seen_navigations:
+            seen_navigations.add(key)
             results.append({
-                "url": url,
-                "title": doc["title"],
-                "navigation_id": navigation_id,
-                "best_phrase": best_phrase,
-                "max_score": max_score,
-                "all_matches": [(phrase, score) for phrase, score, _ in matches]
+                "url": item["url"],
+                "title": item["title"],
+                "navigation_id": item["navigation_id"],
+                "best_phrase": item["phrase"],
+                "max_score": float(score),
             })
 
-    # Sort by max_score in descending order and return top K
-    results.sort(key=lambda x: x["max_score"], reverse=True)
-    return results[:limit]
+            if len(results) >= limit:
+                break
 
+    return results
 
-def semantic_search_by_project(query: str, project_id: str, limit: int = 5, score_threshold: float = 0.0):
-    """Semantic search using FAISS index for a specific project"""
-    index_path = f"faiss_indices/{project_id}.index"
-    metadata_path = f"faiss_indices/{project_id}_metadata.json"
-    
-    # Check if index exists
-    if not os.path.exists(index_path) or not os.path.exists(metadata_path):
+
+def _load_project(project_id: str):
+    if SHARED_STORAGE:
+        loaded = get_shared_project_index(project_id)
+    else:
+        loaded = get_index_registry().get(project_id)
+    if loaded is None:
         print(f"No FAISS index found for project {project_id}")
-        return []
-    
+    return loaded
+
+
+def semantic_search_by_project(query: str, project_id: str, limit: int = 5, score_threshold: float = 0.0,
+                               timings: Optional[dict] = None):
+    """Semantic search using FAISS index for a specific project"""
     try:
-        # Load index and metadata
-        index = faiss.read_index(index_path)
-        with open(metadata_path, 'r') as f:
-            metadata = json.load(f)
-        
-        # Load model and encode query
-        query_embedding = model.encode([query], convert_to_numpy=True, normalize_embeddings=True)
-        
-        # Search
-        scores, indices = index.search(query_embedding, min(limit * 2, len(metadata)))
-        
-        # Process results
-        results = []
-        seen_urls = set()
-        
-        for score, idx in zip(scores[0], indices[0]):
-            if score < score_threshold:
-                continue
-                
-            item = metadata[idx]
-            url = item["url"]
-            
-            # Group by URL to avoid duplicates
-            if url not in seen_urls:
-                seen_urls.add(url)
-                results.append({
-                    "url": url,
-                    "title": item["title"],
-                    "navigation_id": item["navigation_id"],
-                    "best_phrase": item["phrase"],
-                    "max_score": float(score),
-                })
-                
-                if len(results) >= limit:
-                    break
-        
-        return results
-        
+        # Get the resident index and metadata, loading from disk only on a cache miss
+        loaded = _load_project(project_id)
+        if loaded is None:
+            return []
+
+        return _grouped_dense_results(loaded, _embed_query(query, timings), limit, score_threshold, timings=timings)
+
     except Exception as e:
         print(f"Error in semantic search: {e}")
         return []
-    
\ No newline at end of file
+
+
+def lexical_search_by_project(query: str, project_id: str, limit: int = 5, timings: Optional[dict] = None):
+    """BM25 search over a project's phrases and page titles"""
+    try:
+        loaded = _load_project(project_id)
+        if loaded is None:
+            return []
+
+        candidates = _lexical_candidates(loaded, query, limit * 2, timings)
+        return _navigation_results(loaded.metadata, candidates, limit)
+
+    except Exception as e:
+        print(f"Error in lexical search: {e}")
+        return []
+
+
+def _fused_results(loaded, dense_candidates: list, lexical_candidates: list, limit: int, depth: int,
+                   timings: Optional[dict] = None) -> list:
+    """Fuse dense and BM25 candidates into navigation results with reciprocal rank fusion"""
+    dense = _navigation_results(loaded.metadata, dense_candidates, depth)
+    lexical = _navigation_results(loaded.metadata, lexical_candidates, depth)
+
+    started = time.perf_counter()
+    by_navigation = {_navigation_key(result): result for result in lexical}
+    by_navigation.update({_navigation_key(result): result for result in dense})
+    fused = reciprocal_rank_fusion(
+        [[_navigation_key(result) for result in dense], [_navigation_key(result) for result in lexical]],
+        k=HYBRID_RRF_K
+    )
+    results = [dict(by_navigation[key], max_score=score) for key, score in fused[:limit]]
+    if timings is not None:
+        timings["fusion_ms"] = _elapsed_ms(started)
+    return results
+
+
+def hybrid_search_by_project(query: str, project_id: str, limit: int = 5, timings: Optional[dict] = None):
+    """
+    Dense + BM25 search fused with reciprocal rank fusion.
+
+    Both retrievers rank navigations (best phrase per navigation); the fused score
+    is the RRF score, and the best phrase comes from the dense match when
+    there is one.
+    """
+    try:
+        loaded = _load_project(project_id)
+        if loaded is None:
+            return []
+
+        depth = max(HYBRID_CANDIDATES, limit * 2)
+        return _fused_results(
+            loaded,
+            _dense_candidates(loaded, query, depth, timings),
+            _lexical_candidates(loaded, query, depth, timings),
+            limit, depth, timings
+        )
+
+    except Exception as e:
+        print(f"Error in hybrid search: {e}")
+        return []
+
+
+def get_project_search_mode(project_id: str) -> str:
+    """Return the project's configured search mode (settings.search_mode) or the default"""
+    now = time.monotonic()
+    with _project_search_modes_lock:
+        cached = _project_search_modes.get(project_id)
+    if cached is not None and cached[1] > now:
+        return cached[0]
+
+    mode = DEFAULT_SEARCH_MODE
+    try:
+        project = get_mongo_client().get_project_by_id(project_id)
+        configured = ((project or {}).get("settings") or {}).get("search_mode")
+        if configured in SEARCH_MODES:
+            mode = configured
+    except Exception as e:
+        print(f"⚠️ Could not read search mode for project {project_id}: {e}")
+
+    with _project_search_modes_lock:
+        _project_search_modes[project_id] = (mode, now + PROJECT_SEARCH_MODE_TTL_SECONDS)
+    return mode
+
+
+def invalidate_project_search_mode(project_id: str):
+    """Forget the cached search mode after a project's settings change"""
+    with _project_search_modes_lock:
+        _project_search_modes.pop(project_id, None)
+
+
+def search_by_project(query: str, project_id: str, limit: int = 5, mode: Optional[str] = None,
+                      timings: Optional[dict] = None):
+    """Run /query retrieval in the requested mode, falling back to the project's setting"""
+    mode = mode or get_project_search_mode(project_id)
+    if mode == "hybrid":
+        return hybrid_search_by_project(query, project_id, limit, timings=timings)
+    if mode == "lexical":
+        return lexical_search_by_project(query, project_id, limit, timings=timings)
+    return semantic_search_by_project(query, project_id, limit, score_threshold=0, timings=timings)
+
+
+def search_batch(requests: list, timings: Optional[dict] = None) -> list:
+    """
+    Run many /query searches, possibly across projects, in one pass.
+
+    `requests` holds (query, project_id, limit, mode) tuples and one result
+    list is returned per request, in order. Dense and hybrid queries are
+    embedded in one forward pass, and each project's index is loaded once
+    and searched once with the matrix of its queries.
+    """
+    results = [[] for _ in requests]
+    modes = [mode or get_project_search_mode(project_id) for _, project_id, _, mode in requests]
+
+    by_project = defaultdict(list)
+    for position, (_, project_id, _, _) in enumerate(requests):
+        by_project[project_id].append(position)
+
+    started = time.perf_counter()
+    dense_positions = [position for position, mode in enumerate(modes) if mode != "lexical"]
+    embedding_rows = {position: row for row, position in enumerate(dense_positions)}
+    embeddings = encode_queries([requests[position][0] for position in dense_positions]) if dense_positions else None
+    if timings is not None:
+        timings["embed_ms"] = _elapsed_ms(started)
+
+    started = time.perf_counter()
+    for project_id, positions in by_project.items():
+        try:
+            loaded = _load_project(project_id)
+            if loaded is None:
+                continue
+
+            # Hybrid queries take HYBRID_CANDIDATES dense candidates, dense queries an oversampled limit
+            depths = {
+                position: max(HYBRID_CANDIDATES, requests[position][2] * 2) if modes[position] == "hybrid"
+                else requests[position][2] * DENSE_OVERSAMPLE if modes[position] == "dense"
+                else requests[position][2] * 2
+                for position in positions
+            }
+            dense = [position for position in positions if position in embedding_rows]
+            dense_rows = {}
+            if dense:
+                dense_depth = max(depths[position] for position in dense)
+                rows = _dense_candidate_rows(
+                    loaded,
+                    embeddings[[embedding_rows[position] for position in dense]],
+                    dense_depth
+                )
+                dense_rows = dict(zip(dense, rows))
+
+            for position in positions:
+                query, _, limit, _ = requests[position]
+                if modes[position] == "lexical":
+                    candidates = _lexical_candidates(loaded, query, depths[position])
+                    results[position] = _navigation_results(loaded.metadata, candidates, limit)
+                elif modes[position] == "hybrid":
+                    lexical = _lexical_candidates(loaded, query, depths[position])
+                    candidates = dense_rows[position][:depths[position]]
+                    results[position] = _fused_results(loaded, candidates, lexical, limit, depths[position])
+                else:
+                    # Queries that still lack `limit` navigations are searched again on their own
+                    query_embedding = embeddings[embedding_rows[position]:embedding_rows[position] + 1]
+                    results[position] = _grouped_dense_results(
+                        loaded, query_embedding, limit, candidates=dense_rows[position], count=dense_depth
+                    )
+
+        except Exception as e:
+            print(f"Error in batch search for project {project_id}: {e}")
+
+    if timings is not None:
+        timings["search_ms"] = _elapsed_ms(started)
+    return results
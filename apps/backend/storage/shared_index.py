@@ -0,0 +1,308 @@
+"""
+Shared multi-tenant storage mode for project indexes.
+
+With FAISS_STORAGE_MODE=shared, the phrases of all projects live in a few
+shard indexes instead of one index file per project. Every vector ID is
+(project number << 32) | local phrase ID, so a project's vectors form one
+contiguous ID range. Searches are restricted to that range with an
+IDSelectorRange, and each shard's compact metadata is sliced the same way.
+
+Shards are stored through the regular artifact helpers under the names
+"_shared_000", "_shared_001", ..., so loading, caching and locking work the
+same as for per-project indexes.
+"""
+import json
+import os
+import threading
+import zlib
+from collections import defaultdict
+from typing import Callable, Optional
+import numpy as np
+from storage.embedding_store import embed_phrases
+from storage.index_artifacts import (
+    INDEX_DIR,
+    SHARED_STORAGE,
+    artifact_signature,
+    load_project_index,
+    save_project_index,
+)
+from storage.index_maintenance import build_id_map_index, navigation_items, project_lock
+from storage.index_registry import get_index_registry
+from storage.lexical_index import build_lexical_index
+
+FAISS_SHARED_SHARDS = int(os.getenv("FAISS_SHARED_SHARDS", "8"))
+
+LOCAL_ID_BITS = 32
+
+SHARED_PARAMS = {"index_type": "flat", "storage_mode": "shared"}
+
+# Project -> number assignments, shared by every process using the index directory
+PROJECT_NUMBERS_LOCK = "_shared_projects"
+_numbers_cache = {"signature": None, "numbers": {}}
+_numbers_lock = threading.Lock()
+
+
+def shard_key(project_id: str) -> str:
+    """Artifact name of the shard holding a project's vectors"""
+    return f"_shared_{zlib.crc32(project_id.encode()) % FAISS_SHARED_SHARDS:03d}"
+
+
+def id_range(project_number: int) -> tuple:
+    """[low, high) vector ID range owned by a project"""
+    return project_number << LOCAL_ID_BITS, (project_number + 1) << LOCAL_ID_BITS
+
+
+def _numbers_path() -> str:
+    return os.path.join(INDEX_DIR, "shared_projects.json")
+
+
+def _load_numbers() -> dict:
+    try:
+        stat = os.stat(_numbers_path())
+    except FileNotFoundError:
+        return {}
+
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _numbers_lock:
+        if _numbers_cache["signature"] != signature:
+            with open(_numbers_path(), "r") as f:
+                _numbers_cache["numbers"] = json.load(f)
+            _numbers_cache["signature"] = signature
+        return _numbers_cache["numbers"]
+
+
+def project_numbers(project_ids: list, create: bool = False) -> list:
+    """Return each project's number in the shared index (None if unassigned), assigning new ones if `create` is set"""
+    numbers = _load_numbers()
+    if not create or all(project_id in numbers for project_id in project_ids):
+        return [numbers.get(project_id) for project_id in project_ids]
+
+    with project_lock(PROJECT_NUMBERS_LOCK):
+        numbers = dict(_load_numbers())
+        next_number = max(numbers.values(), default=0) + 1
+        for project_id in project_ids:
+            if project_id not in numbers:
+                numbers[project_id] = next_number
+                next_number += 1
+
+        temporary_path = f"{_numbers_path()}.tmp"
+        with open(temporary_path, "w") as f:
+            json.dump(numbers, f)
+        os.replace(temporary_path, _numbers_path())
+        return [numbers[project_id] for project_id in project_ids]
+
+
+def project_number(project_id: str, create: bool = False) -> Optional[int]:
+    """Return the project's number in the shared index, assigning one if `create` is set"""
+    return project_numbers([project_id], create)[0]
+
+
+def project_index_exists(project_id: str) -> bool:
+    """Whether a project has a searchable index in the configured storage mode"""
+    if SHARED_STORAGE:
+        return project_number(project_id) is not None and artifact_signature(shard_key(project_id)) is not None
+    return artifact_signature(project_id) is not None
+
+
+class ProjectFilteredIndex:
+    """A shard index that only returns vectors from one project's ID range"""
+
+    def __init__(self, index, low: int, high: int, ntotal: int):
+        # Imported on first use so importing the API does not load faiss
+        import faiss
+
+        self.index = index
+        self.ntotal = ntotal
+        self.selector = faiss.IDSelectorRange(low, high)
+        self.search_params = faiss.SearchParameters(sel=self.selector)
+
+    def search(self, query: np.ndarray, k: int):
+        return self.index.search(query, k, params=self.search_params)
+
+
+class MetadataRange:
+    """Rows of a shard's CompactMetadata whose phrase IDs fall in [low, high)"""
+
+    def __init__(self, metadata, low: int, high: int):
+        self.metadata = metadata
+        self.low = low
+        self.high = high
+        self.start = int(np.searchsorted(metadata.ids, low))
+        self.end = int(np.searchsorted(metadata.ids, high))
+
+    def __len__(self):
+        return self.end - self.start
+
+    def get(self, phrase_id, default=None):
+        if not self.low <= phrase_id < self.high:
+            return default
+        return self.metadata.get(phrase_id, default)
+
+    def __getitem__(self, phrase_id) -> dict:
+        item = self.get(phrase_id)
+        if item is None:
+            raise KeyError(phrase_id)
+        return item
+
+    def __contains__(self, phrase_id) -> bool:
+        return self.low <= phrase_id < self.high and phrase_id in self.metadata
+
+    def values(self):
+        return (self.metadata._item(row) for row in range(self.start, self.end))
+
+    def items(self):
+        return ((int(self.metadata.ids[row]), self.metadata._item(row)) for row in range(self.start, self.end))
+
+
+class SharedProjectIndex:
+    """One project's slice of a loaded shard, with the same attributes search uses on LoadedIndex"""
+
+    def __init__(self, shard, project_id: str, number: int):
+        low, high = id_range(number)
+        self.project_id = project_id
+        self.params = shard.params
+        self.metadata = MetadataRange(shard.metadata, low, high)
+        self.index = ProjectFilteredIndex(shard.index, low, high, len(self.metadata))
+        self._lexical = None
+        self._lexical_lock = threading.Lock()
+
+    @property
+    def lexical(self):
+        if self._lexical is None:
+            with self._lexical_lock:
+                if self._lexical is None:
+                    self._lexical = build_lexical_index(self.metadata)
+        return self._lexical
+
+
+def get_shared_project_index(project_id: str) -> Optional[SharedProjectIndex]:
+    """Return a project's view of its (cached) shard, or None if it has no vectors"""
+    number = project_number(project_id)
+    if number is None:
+        return None
+
+    shard = get_index_registry().get(shard_key(project_id))
+    if shard is None:
+        return None
+
+    # Views are cached on the shard entry, so they are dropped when the shard reloads
+    view = shard.views.get(project_id)
+    if view is None:
+        view = SharedProjectIndex(shard, project_id, number)
+        shard.views[project_id] = view
+    return view if len(view.metadata) else None
+
+
+def _load_shard_for_update(key: str):
+    if artifact_signature(key) is None:
+        return None, []
+    index, metadata, _ = load_project_index(key)
+    return index, list(metadata.values())
+
+
+def _drop_ids(index, items: list, keep) -> list:
+    """Remove the vectors of items for which `keep(item)` is False"""
+    stale_ids = [item["id"] for item in items if not keep(item)]
+    if stale_ids and index is not None:
+        index.remove_ids(np.array(stale_ids, dtype=np.int64))
+    return [item for item in items if keep(item)]
+
+
+def _add(index, embeddings: np.ndarray, ids: np.ndarray):
+    if index is None:
+        return build_id_map_index(embeddings, ids)
+    index.add_with_ids(embeddings, ids)
+    return index
+
+
+def replace_projects(projects: dict, refresh: Optional[Callable] = None) -> dict:
+    """
+    Replace the vectors of whole projects in their shards; returns
+    project_id -> the items published.
+
+    `projects` maps project_id -> (items, embeddings), where items are
+    navigation_items() dicts in the same order as the embedding rows. Each
+    touched shard is rewritten once. `refresh(project_id, items, embeddings)`,
+    if given, is called with the shard locked and returns the (items,
+    embeddings) to publish instead, so edits made since the caller's
+    snapshot are kept.
+    """
+    published = {}
+    by_shard = defaultdict(list)
+    for project_id in projects:
+        by_shard[shard_key(project_id)].append(project_id)
+
+    for key, project_ids in by_shard.items():
+        with project_lock(key):
+            index, items = _load_shard_for_update(key)
+            numbers = project_numbers(project_ids, create=True)
+            replaced = set(numbers)
+            items = _drop_ids(index, items, lambda item: item["id"] >> LOCAL_ID_BITS not in replaced)
+
+            for project_id, number in zip(project_ids, numbers):
+                project_items, embeddings = projects[project_id]
+                if refresh is not None:
+                    project_items, embeddings = refresh(project_id, project_items, embeddings)
+                published[project_id] = project_items
+                if not project_items:
+                    continue
+                ids = id_range(number)[0] + np.arange(len(project_items), dtype=np.int64)
+                for item, phrase_id in zip(project_items, ids):
+                    item["id"] = int(phrase_id)
+                index = _add(index, embeddings, ids)
+                items.extend(project_items)
+
+            if index is not None:
+                save_project_index(key, index, items, SHARED_PARAMS)
+    return published
+
+
+def upsert_navigation_vectors(project_id: str, navigation: dict) -> int:
+    """Replace one navigation's vectors in its project's shard"""
+    navigation_id = navigation.get("navigation_id", "")
+    new_items = navigation_items(navigation)
+    if new_items:
+        embeddings, _ = embed_phrases([item["phrase"] for item in new_items])
+
+    key = shard_key(project_id)
+    with project_lock(key):
+        low, high = id_range(project_number(project_id, create=True))
+        index, items = _load_shard_for_update(key)
+        items = _drop_ids(index, items, lambda item: not (
+            low <= item["id"] < high and item.get("navigation_id") == navigation_id))
+
+        if new_items:
+            next_id = max((item["id"] for item in items if low <= item["id"] < high), default=low - 1) + 1
+            ids = np.arange(next_id, next_id + len(new_items), dtype=np.int64)
+            for item, phrase_id in zip(new_items, ids):
+                item["id"] = int(phrase_id)
+            index = _add(index, embeddings, ids)
+            items.extend(new_items)
+
+        if index is not None:
+            save_project_index(key, index, items, SHARED_PARAMS)
+
+    print(f"✓ Indexed {len(new_items)} phrases for navigation {navigation_id} in project {project_id} (shard {key})")
+    return len(new_items)
+
+
+def remove_navigation_vectors(project_id: str, navigation_id: str) -> int:
+    """Remove one navigation's vectors from its project's shard"""
+    number = project_number(project_id)
+    if number is None:
+        return 0
+
+    key = shard_key(project_id)
+    low, high = id_range(number)
+    with project_lock(key):
+        index, items = _load_shard_for_update(key)
+        if index is None:
+            return 0
+        remaining = _drop_ids(index, items, lambda item: not (
+            low <= item["id"] < high and item.get("navigation_id") == navigation_id))
+        removed = len(items) - len(remaining)
+        if removed:
+            save_project_index(key, index, remaining, SHARED_PARAMS)
+
+    print(f"✓ Removed {removed} phrases for navigation {navigation_id} from project {project_id} (shard {key})")
+    return removed
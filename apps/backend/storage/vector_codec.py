@@ -0,0 +1,65 @@
+import os
+from typing import Optional
+import numpy as np
+from bson.binary import Binary
+
+# How flow embeddings are written to MongoDB: packed little-endian float32 or
+# float16 bytes, or "array" for the legacy BSON array of doubles. Readers
+# accept every encoding, so existing documents keep working until they are
+# converted with: python -m scripts.migrate_flow_embeddings
+EMBEDDING_ENCODINGS = ("array", "float32", "float16")
+FLOW_EMBEDDING_ENCODING = os.getenv("FLOW_EMBEDDING_ENCODING", "float32")
+
+# Documents written before the encoding was recorded hold arrays
+LEGACY_ENCODING = "array"
+EMBEDDING_FIELDS = ("name_embedding", "description_embedding")
+
+_DTYPES = {
+    "float32": np.dtype("<f4"),
+    "float16": np.dtype("<f2"),
+}
+
+
+def encode_embedding(vector, encoding: str = FLOW_EMBEDDING_ENCODING):
+    """Encode a vector (list or array) for storage; None stays None"""
+    if vector is None:
+        return None
+    if encoding == LEGACY_ENCODING:
+        return [float(value) for value in vector]
+    if encoding not in _DTYPES:
+        raise ValueError(f"Unknown embedding encoding: {encoding}")
+    return Binary(np.asarray(vector, dtype=_DTYPES[encoding]).tobytes())
+
+
+def decode_embedding(value, encoding: Optional[str] = None) -> Optional[np.ndarray]:
+    """Decode a stored vector in any encoding to a float32 array; None or empty gives None"""
+    if value is None:
+        return None
+    if isinstance(value, (bytes, bytearray)):
+        dtype = _DTYPES.get(encoding or "float32")
+        if dtype is None:
+            raise ValueError(f"Unknown embedding encoding: {encoding}")
+        vector = np.frombuffer(value, dtype=dtype).astype(np.float32)
+    else:
+        vector = np.asarray(value, dtype=np.float32)
+    return vector if vector.size else None
+
+
+def encode_embedding_fields(embeddings: dict, encoding: str = FLOW_EMBEDDING_ENCODING) -> dict:
+    """Encoded name/description embedding fields of a flow document, with the encoding used"""
+    fields = {field: encode_embedding(embeddings.get(field), encoding) for field in EMBEDDING_FIELDS}
+    fields["embedding_encoding"] = encoding
+    return fields
+
+
+def decode_embedding_fields(document: dict) -> dict:
+    """Replace a flow document's stored embeddings with float lists, as the API returns them"""
+    encoding = document.pop("embedding_encoding", None)
+    for field in EMBEDDING_FIELDS:
+        if field in document:
+            vector = decode_embedding(document[field], encoding)
+            if vector is not None:
+                document[field] = vector.tolist()
+            elif document[field] is not None:
+                document[field] = []
+    return document
@@ -0,0 +1,67 @@
+"""
+Test setup: MongoDB and Redis are replaced with mongomock and fakeredis, FAISS
+artifacts go to a temporary directory, and the embedding model is replaced
+with a deterministic bag-of-words hash so no model is downloaded.
+
+Environment variables are read when the storage modules are imported, so
+they are set here before any test module imports them.
+"""
+import os
+import sys
+import tempfile
+import uuid
+import fakeredis
+import mongomock
+import pymongo
+import pytest
+import redis
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_index_dir = tempfile.mkdtemp(prefix="faiss_indices_")
+os.environ["FAISS_INDEX_DIR"] = _index_dir
+os.environ["EMBEDDING_STORE_PATH"] = os.path.join(_index_dir, "embeddings.sqlite")
+os.environ["FAISS_STORAGE_MODE"] = "per_project"
+os.environ["REDIS_URL"] = "redis://localhost:6379"
+os.environ["MONGO_DB_CONNECTION_STRING"] = "mongodb://localhost:27017/trail_blazer"
+# Queries are encoded directly, without the micro-batching thread
+os.environ["EMBED_BATCH_MAX_SIZE"] = "1"
+
+_mongo = mongomock.MongoClient()
+pymongo.MongoClient = lambda *args, **kwargs: _mongo
+
+_redis_server = fakeredis.FakeServer()
+redis.from_url = lambda url, **kwargs: fakeredis.FakeRedis(server=_redis_server, **kwargs)
+
+from tests.helpers import fake_encode_phrases  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def fake_embeddings(monkeypatch):
+    from storage import embedding_store, embeddings
+    monkeypatch.setattr(embeddings, "encode_phrases", fake_encode_phrases)
+    monkeypatch.setattr(embedding_store, "encode_phrases", fake_encode_phrases)
+
+
+@pytest.fixture
+def project_id() -> str:
+    """A fresh project, so tests sharing the index directory never collide"""
+    return f"test-{uuid.uuid4().hex[:12]}"
+
+
+@pytest.fixture
+def redis_store():
+    """The fake Redis server, emptied after the test"""
+    from storage.redis_client import redis_client
+    yield redis_client
+    redis_client.flushall()
+
+
+@pytest.fixture
+def navigations():
+    """The app_navigations collection, emptied after the test"""
+    from storage.mongo_client import get_mongo_client
+    collection = get_mongo_client().client["trail_blazer"]["app_navigations"]
+    yield collection
+    collection.delete_many({})
+
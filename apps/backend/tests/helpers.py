@@ -0,0 +1,42 @@
+"""Helpers shared by the test modules"""
+import zlib
+import numpy as np
+
+EMBEDDING_DIMENSION = 32
+
+
+def fake_encode_phrases(phrases: list, **kwargs) -> np.ndarray:
+    """Normalized bag-of-words hash embeddings: phrases sharing words score higher"""
+    embeddings = np.zeros((len(phrases), EMBEDDING_DIMENSION), dtype=np.float32)
+    for row, phrase in enumerate(phrases):
+        for word in phrase.lower().split():
+            embeddings[row, zlib.crc32(word.encode()) % EMBEDDING_DIMENSION] += 1.0
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.where(norms == 0, 1.0, norms)
+
+
+def make_navigation(project_id: str, name: str, phrases: list, url: str = None) -> dict:
+    return {
+        "navigation_id": f"{project_id}-{name}",
+        "project_id": project_id,
+        "org_id": "test-org",
+        "url": url or f"https://example.com/{name}",
+        "title": name.title(),
+        "phrases": phrases,
+    }
+
+
+def phrase_items(phrases: list, navigation_id: str = "nav", url: str = "https://example.com/nav") -> list:
+    """Metadata items numbered by position, one per phrase"""
+    return [{"id": position, "phrase": phrase, "url": url, "title": "Nav", "navigation_id": navigation_id}
+            for position, phrase in enumerate(phrases)]
+
+
+def save_flat_index(project_id: str, phrases: list, **item_fields) -> str:
+    """Publish a flat index of `phrases` for a project; returns the version"""
+    from storage.index_artifacts import save_project_index
+    from storage.index_maintenance import build_id_map_index
+
+    items = phrase_items(phrases, **item_fields)
+    index = build_id_map_index(fake_encode_phrases(phrases), np.arange(len(phrases)))
+    return save_project_index(project_id, index, items)
@@ -0,0 +1,122 @@
+"""AsyncMongoDBClient mirrors MongoDBClient on the hot request paths"""
+import asyncio
+import hashlib
+from datetime import datetime, timedelta
+import pytest
+from storage.async_mongo_client import AsyncMongoDBClient
+from storage.mongo_client import get_mongo_client
+
+
+class AsyncCursor:
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def sort(self, *args, **kwargs):
+        self.cursor = self.cursor.sort(*args, **kwargs)
+        return self
+
+    async def to_list(self, length=None):
+        return list(self.cursor)
+
+
+class AsyncCollection:
+    """The awaitable collection API used by AsyncMongoDBClient, over a mongomock collection"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def find(self, *args, **kwargs):
+        return AsyncCursor(self.collection.find(*args, **kwargs))
+
+    def __getattr__(self, name):
+        method = getattr(self.collection, name)
+
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+        return call
+
+
+@pytest.fixture
+def clients():
+    """The sync client and an async client over the same (mongomock) database"""
+    sync = get_mongo_client()
+    client = AsyncMongoDBClient.__new__(AsyncMongoDBClient)
+    client.client = object()
+    client.db = sync.client["trail_blazer"]
+    for name in ("api_keys", "projects", "app_navigations", "logs", "studio_config", "workflows"):
+        setattr(client, f"{name}_collection", AsyncCollection(client.db[name]))
+    yield sync, client
+    for name in ("api_keys", "projects", "app_navigations", "logs", "studio_config", "workflows"):
+        client.db[name].delete_many({})
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_reads_match_the_sync_client(clients, project_id):
+    sync, client = clients
+    now = datetime.utcnow()
+    client.db.projects.insert_one({"project_id": project_id, "org_id": "org", "name": "Demo"})
+    client.db.app_navigations.insert_many([
+        {"navigation_id": "b", "project_id": project_id, "org_id": "org", "url": "/b", "created_at": now},
+        {"navigation_id": "a", "project_id": project_id, "org_id": "org", "url": "/a",
+         "created_at": now - timedelta(days=1)},
+    ])
+    client.db.studio_config.insert_one({"project_id": project_id, "org_id": "org", "config": {"theme": "dark"}})
+    client.db.workflows.insert_many([
+        {"workflow_id": "old", "org_id": "org", "project_id": project_id, "created_at": now - timedelta(days=1)},
+        {"workflow_id": "new", "org_id": "org", "project_id": project_id, "created_at": now},
+    ])
+
+    assert run(client.get_project_by_id(project_id)) == sync.get_project_by_id(project_id)
+    assert run(client.get_project_by_id(project_id, org_id="other")) is None
+    navigations = run(client.get_navigations_by_org_and_project("org", project_id))
+    assert [navigation["navigation_id"] for navigation in navigations] == ["a", "b"]
+    assert navigations == sync.get_navigations_by_org_and_project("org", project_id)
+    assert run(client.get_studio_config(project_id)) == {"theme": "dark"}
+    workflows = run(client.list_workflows("org", project_id))
+    assert [workflow["workflow_id"] for workflow in workflows] == ["new", "old"]
+    assert workflows == sync.list_workflows("org", project_id)
+
+
+def test_api_key_validation(clients):
+    _, client = clients
+    client.db.api_keys.insert_many([
+        {"key_id": "live", "name": "Live", "org_id": "org", "is_active": True,
+         "hashed_key": hashlib.sha256(b"live-key").hexdigest()},
+        {"key_id": "expired", "name": "Expired", "org_id": "org", "is_active": True,
+         "hashed_key": hashlib.sha256(b"expired-key").hexdigest(),
+         "expires_at": datetime.utcnow() - timedelta(minutes=1)},
+    ])
+
+    assert run(client.validate_api_key("live-key"))["key_id"] == "live"
+    assert client.db.api_keys.find_one({"key_id": "live"})["last_used"] is not None
+    assert run(client.validate_api_key("expired-key")) is None
+    assert client.db.api_keys.find_one({"key_id": "expired"})["is_active"] is False
+    assert run(client.validate_api_key("unknown")) is None
+
+
+def test_log_entries(clients, project_id):
+    _, client = clients
+    entry = {"request_id": "r1", "project_id": project_id, "request_query": "billing", "response": {},
+             "log_type": "query", "time_taken": 0.1}
+
+    assert run(client.create_log_entry(**entry))["success"]
+    result = run(client.create_log_entries([dict(entry, request_id="r2"), dict(entry, request_id="r3")]))
+    assert result["inserted_count"] == 2
+    assert run(client.create_log_entries([]))["inserted_count"] == 0
+
+    logs = list(client.db.logs.find({"project_id": project_id}))
+    assert sorted(log["request_id"] for log in logs) == ["r1", "r2", "r3"]
+    assert all(log["type"] == "query" and log["feedback_response"] is None for log in logs)
+
+
+def test_unconfigured_client_degrades(project_id):
+    client = AsyncMongoDBClient.__new__(AsyncMongoDBClient)
+    client.client = client.db = None
+
+    assert run(client.get_project_by_id(project_id)) is None
+    assert run(client.validate_api_key("key")) is None
+    assert not run(client.create_log_entries([{}]))["success"]
+    assert run(client.list_workflows("org", project_id)) == []
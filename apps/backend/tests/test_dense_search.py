@@ -0,0 +1,70 @@
+"""Dense search grouping: one result per navigation, adaptive oversampling"""
+from types import SimpleNamespace
+import faiss
+import numpy as np
+from storage import search_utils
+from storage.index_maintenance import upsert_navigation_vectors
+from storage.search_utils import _grouped_dense_results, hybrid_search_by_project, semantic_search_by_project
+from tests.helpers import EMBEDDING_DIMENSION, fake_encode_phrases, make_navigation
+
+
+class CountingIndex:
+    """Wraps an index and records the k of every search"""
+
+    def __init__(self, index):
+        self.index = index
+        self.ntotal = index.ntotal
+        self.searches = []
+
+    def search(self, query, k):
+        self.searches.append(k)
+        return self.index.search(query, k)
+
+
+def loaded_index(phrases: list, live_rows: range, index=None) -> SimpleNamespace:
+    """Index all phrases, but keep metadata only for `live_rows`, one navigation each"""
+    if index is None:
+        index = faiss.IndexIDMap2(faiss.IndexFlatIP(EMBEDDING_DIMENSION))
+    index.add_with_ids(fake_encode_phrases(phrases), np.arange(len(phrases)))
+    metadata = {
+        row: {"url": f"https://example.com/{row}", "title": phrases[row], "navigation_id": str(row),
+              "phrase": phrases[row]}
+        for row in live_rows
+    }
+    return SimpleNamespace(index=CountingIndex(index), metadata=metadata)
+
+
+def test_dense_search_looks_past_tombstoned_vectors():
+    # An HNSW index cannot remove vectors: removed phrases stay in ntotal without metadata
+    tombstones = [f"reset password step {step}" for step in range(12)]
+    live = ["reset password", "reset password help", "reset my password"]
+    hnsw = faiss.IndexIDMap2(faiss.IndexHNSWFlat(EMBEDDING_DIMENSION, 16, faiss.METRIC_INNER_PRODUCT))
+    loaded = loaded_index(tombstones + live, range(len(tombstones), len(tombstones) + len(live)), hnsw)
+
+    results = _grouped_dense_results(loaded, fake_encode_phrases(["reset password"]), limit=3)
+    assert len(results) == 3
+
+
+def test_oversampling_stops_after_max_passes(monkeypatch):
+    monkeypatch.setattr(search_utils, "DENSE_OVERSAMPLE_MAX_PASSES", 2)
+    phrases = [f"reset password step {step}" for step in range(500)] + ["reset password help"]
+    # Only the last phrase is still live, so every pass comes back short
+    loaded = loaded_index(phrases, range(500, 501))
+
+    _grouped_dense_results(loaded, fake_encode_phrases(["reset password"]), limit=2)
+
+    assert loaded.index.searches == [4, 16, 64]
+
+
+def test_navigations_sharing_a_url_are_separate_results(project_id):
+    for name, phrases in (("invite", ["invite a teammate"]), ("remove", ["remove a teammate"])):
+        upsert_navigation_vectors(project_id, make_navigation(project_id, name, phrases,
+                                                              url="https://example.com/team"))
+
+    dense = semantic_search_by_project("teammate", project_id, limit=5)
+    hybrid = hybrid_search_by_project("teammate", project_id, limit=5)
+
+    for results in (dense, hybrid):
+        assert sorted(result["navigation_id"] for result in results) == [f"{project_id}-invite",
+                                                                          f"{project_id}-remove"]
+        assert {result["url"] for result in results} == {"https://example.com/team"}
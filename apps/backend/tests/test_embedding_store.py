@@ -0,0 +1,61 @@
+"""Content-addressed phrase embedding store"""
+import numpy as np
+import pytest
+from storage import embedding_store
+from storage.embedding_store import EmbeddingStore
+from tests.helpers import fake_encode_phrases
+
+
+@pytest.fixture
+def encoded(monkeypatch):
+    """Phrases passed to the model, one list per call"""
+    calls = []
+
+    def encode(phrases, **kwargs):
+        calls.append(list(phrases))
+        return fake_encode_phrases(phrases)
+
+    monkeypatch.setattr(embedding_store, "encode_phrases", encode)
+    return calls
+
+
+def test_stored_vectors_are_reused(tmp_path, encoded):
+    store = EmbeddingStore(str(tmp_path / "embeddings.sqlite"), "model-a")
+
+    embeddings, reused = store.embed(["open settings", "billing history", "open settings"])
+    assert reused == 0
+    # Duplicates are encoded once
+    assert encoded == [["open settings", "billing history"]]
+    np.testing.assert_array_equal(embeddings, fake_encode_phrases(["open settings", "billing history",
+                                                                   "open settings"]))
+
+    # Matching is on the normalized phrase
+    embeddings, reused = store.embed(["Open  Settings", "invite a teammate"])
+    assert reused == 1
+    assert encoded[-1] == ["invite a teammate"]
+    np.testing.assert_array_equal(embeddings[0], fake_encode_phrases(["open settings"])[0])
+    assert store.stats()["vectors"] == 3
+
+
+def test_vectors_are_keyed_by_model(tmp_path, encoded):
+    path = str(tmp_path / "embeddings.sqlite")
+    EmbeddingStore(path, "model-a").embed(["open settings"])
+
+    _, reused = EmbeddingStore(path, "model-b").embed(["open settings"])
+    assert reused == 0
+    assert len(encoded) == 2
+
+
+def test_garbage_collection_keeps_live_phrases(tmp_path, encoded):
+    store = EmbeddingStore(str(tmp_path / "embeddings.sqlite"), "model-a")
+    store.embed(["open settings", "billing history", "invite a teammate"])
+
+    assert store.collect_garbage(["billing history"]) == 2
+    assert store.stats()["vectors"] == 1
+    _, reused = store.embed(["billing history"])
+    assert reused == 1
+
+
+def test_empty_input(tmp_path, encoded):
+    embeddings, reused = EmbeddingStore(str(tmp_path / "embeddings.sqlite"), "model-a").embed([])
+    assert embeddings.shape[0] == 0 and reused == 0
@@ -0,0 +1,100 @@
+"""Per-worker flow embedding matrices and their invalidation across workers"""
+import pytest
+from storage.flow_index import FlowEmbeddingMatrix, FlowIndexCache
+
+
+def flow(flow_id: str, name_embedding: list, org_id: str = "org", project_id: str = "project", **fields) -> dict:
+    return {"flow_id": flow_id, "org_id": org_id, "project_id": project_id, "name": flow_id,
+            "description": "", "name_embedding": name_embedding, "description_embedding": [0.0, 0.0, 0.0],
+            "created_at": None, "points_count": 1, **fields}
+
+
+class FlowStore:
+    """Flow documents as MongoDB would return them, counting full reads"""
+
+    def __init__(self, *flows):
+        self.flows = {item["flow_id"]: item for item in flows}
+        self.reads = 0
+
+    def load(self):
+        self.reads += 1
+        return list(self.flows.values())
+
+
+@pytest.fixture
+def workers(redis_store) -> tuple:
+    """Two workers' caches sharing one Redis"""
+    return (FlowIndexCache(max_entries=8, ttl_seconds=3600, client=redis_store),
+            FlowIndexCache(max_entries=8, ttl_seconds=3600, client=redis_store))
+
+
+def searched_ids(cache: FlowIndexCache, store: FlowStore, query: list, **kwargs) -> list:
+    return [result["flow_id"] for result in cache.get("org", store.load).search(query, 5, 0.5, **kwargs)]
+
+
+def test_matrix_search_ranks_by_best_field_and_filters_projects():
+    matrix = FlowEmbeddingMatrix([
+        flow("invoices", [1.0, 0.0, 0.0]),
+        flow("reports", [0.0, 1.0, 0.0], description_embedding=[0.9, 0.1, 0.0]),
+        flow("other-project", [1.0, 0.0, 0.0], project_id="other"),
+        flow("no-match", [0.0, 0.0, 1.0]),
+    ])
+
+    results = matrix.search([2.0, 0.0, 0.0], 5, 0.5, project_id="project")
+    assert [result["flow_id"] for result in results] == ["invoices", "reports"]
+    assert results[0]["similarity_score"] == pytest.approx(1.0)
+    assert results[1]["description_similarity"] > results[1]["name_similarity"]
+    assert matrix.search([1.0, 0.0], 5, 0.5) == []
+
+
+def test_writes_apply_to_the_writers_matrix_without_a_reload(workers):
+    cache, _ = workers
+    store = FlowStore(flow("invoices", [1.0, 0.0, 0.0]))
+    assert searched_ids(cache, store, [0.0, 1.0, 0.0]) == []
+
+    store.flows["reports"] = flow("reports", [0.0, 1.0, 0.0])
+    cache.update_flow("reports", store.flows["reports"])
+    assert searched_ids(cache, store, [0.0, 1.0, 0.0]) == ["reports"]
+
+    store.flows["reports"]["status"] = "discarded"
+    cache.update_flow("reports", store.flows["reports"])
+    assert searched_ids(cache, store, [0.0, 1.0, 0.0]) == []
+    assert store.reads == 1
+
+
+def test_writes_through_another_worker_reload_the_matrix(workers):
+    cache, other_worker = workers
+    store = FlowStore(flow("invoices", [1.0, 0.0, 0.0]))
+    assert searched_ids(cache, store, [0.0, 1.0, 0.0]) == []
+    searched_ids(other_worker, store, [0.0, 1.0, 0.0])
+
+    store.flows["reports"] = flow("reports", [0.0, 1.0, 0.0])
+    other_worker.update_flow("reports", store.flows["reports"])
+
+    assert searched_ids(cache, store, [0.0, 1.0, 0.0]) == ["reports"]
+    assert searched_ids(other_worker, store, [0.0, 1.0, 0.0]) == ["reports"]
+    # Only the worker that did not see the write re-read the flows
+    assert store.reads == 3
+
+
+def test_concurrent_writes_drop_the_local_matrix(workers):
+    cache, other_worker = workers
+    store = FlowStore(flow("invoices", [1.0, 0.0, 0.0]))
+    searched_ids(cache, store, [1.0, 0.0, 0.0])
+
+    store.flows["reports"] = flow("reports", [0.0, 1.0, 0.0])
+    other_worker.update_flow("reports", store.flows["reports"])
+    store.flows["tasks"] = flow("tasks", [0.0, 0.0, 1.0])
+    cache.update_flow("tasks", store.flows["tasks"])
+
+    # The local update alone would miss "reports"; the matrix is re-read instead
+    assert searched_ids(cache, store, [0.0, 1.0, 0.0]) == ["reports"]
+    assert store.reads == 2
+
+
+def test_ttl_applies_without_redis():
+    cache = FlowIndexCache(max_entries=8, ttl_seconds=0, client=None)
+    store = FlowStore(flow("invoices", [1.0, 0.0, 0.0]))
+    searched_ids(cache, store, [1.0, 0.0, 0.0])
+    searched_ids(cache, store, [1.0, 0.0, 0.0])
+    assert store.reads == 2
@@ -0,0 +1,63 @@
+"""BM25 retrieval and its reciprocal rank fusion with dense search"""
+import pytest
+from storage.lexical_index import BM25Index, build_lexical_index, reciprocal_rank_fusion, tokenize
+from storage.search_utils import hybrid_search_by_project, lexical_search_by_project, search_by_project
+from storage.index_maintenance import upsert_navigation_vectors
+from tests.helpers import make_navigation
+
+
+def index_navigations(project_id: str, **phrases_by_name):
+    for name, phrases in phrases_by_name.items():
+        upsert_navigation_vectors(project_id, make_navigation(project_id, name, phrases))
+
+
+def test_tokenize_lowercases_words():
+    assert tokenize("Settings > Two-factor AUTH") == ["settings", "two", "factor", "auth"]
+
+
+def test_bm25_prefers_rare_terms_and_short_documents():
+    index = BM25Index([
+        (10, "open the settings page"),
+        (11, "settings"),
+        (12, "configure sso for the settings page"),
+        (13, "invite a teammate"),
+    ])
+
+    assert [phrase_id for phrase_id, _ in index.search("settings", 5)] == [11, 10, 12]
+    # "sso" appears once, so it outweighs the common "settings"
+    assert index.search("sso settings", 1)[0][0] == 12
+    assert index.search("billing", 5) == []
+    assert len(index.search("settings", 2)) == 2
+
+
+def test_lexical_index_covers_page_titles():
+    index = build_lexical_index({7: {"phrase": "change plan", "title": "Billing"}})
+    assert index.search("billing", 5)[0][0] == 7
+
+
+def test_rrf_rewards_agreement_between_lists():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d"]], k=60)
+    assert [key for key, _ in fused] == ["b", "a", "d", "c"]
+    assert fused[0][1] == pytest.approx(1 / 61 + 1 / 62)
+
+
+def test_hybrid_search_fuses_both_retrievers(project_id):
+    index_navigations(project_id, sso=["configure sso"], login=["single sign on settings"],
+                      team=["invite a teammate"])
+
+    lexical = lexical_search_by_project("sso", project_id)
+    assert [result["best_phrase"] for result in lexical] == ["configure sso"]
+
+    hybrid = hybrid_search_by_project("sso settings", project_id, limit=2)
+    assert len(hybrid) == 2
+    assert {result["best_phrase"] for result in hybrid} == {"configure sso", "single sign on settings"}
+    # Scores are RRF scores, best first
+    assert hybrid[0]["max_score"] >= hybrid[1]["max_score"]
+    assert hybrid[0]["max_score"] <= 2 / 61
+
+
+def test_search_mode_selects_the_retriever(project_id):
+    index_navigations(project_id, sso=["configure sso"], team=["invite a teammate"])
+    assert search_by_project("sso", project_id, mode="lexical")[0]["best_phrase"] == "configure sso"
+    assert search_by_project("zzz", project_id, mode="lexical") == []
+    assert len(search_by_project("zzz", project_id, mode="dense")) == 2
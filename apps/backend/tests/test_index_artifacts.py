@@ -0,0 +1,116 @@
+"""Versioned index artifacts: publishing, garbage collection and legacy conversion"""
+import json
+import os
+import time
+import faiss
+import numpy as np
+import pytest
+from scripts import convert_metadata
+from storage import index_artifacts
+from storage.index_artifacts import (
+    artifact_signature,
+    collect_old_versions,
+    legacy_index_path,
+    legacy_metadata_paths,
+    load_project_index,
+    save_project_index,
+    version_dir,
+)
+from tests.helpers import fake_encode_phrases, phrase_items, save_flat_index
+
+
+def test_superseded_version_survives_its_grace_period(project_id):
+    first = save_flat_index(project_id, ["alpha", "beta"])
+    # Built long ago: the grace period must still start when it is superseded
+    long_ago = time.time() - 10 * index_artifacts.FAISS_VERSION_GRACE_SECONDS
+    os.utime(version_dir(project_id, first), (long_ago, long_ago))
+
+    second = save_flat_index(project_id, ["alpha", "beta"])
+    assert os.path.isdir(version_dir(project_id, first))
+    index, _, _ = load_project_index(project_id, version=first)
+    assert index.ntotal == 2
+
+    assert collect_old_versions(project_id) == 0
+    assert collect_old_versions(project_id, grace_seconds=-1) == 1
+    assert not os.path.isdir(version_dir(project_id, first))
+    assert os.path.isdir(version_dir(project_id, second))
+
+
+def test_unmarked_old_version_gets_a_full_grace_period(project_id):
+    first = save_flat_index(project_id, ["alpha", "beta"])
+    second = save_flat_index(project_id, ["alpha", "beta"])
+    # As if the MANIFEST switched but the supersession record was never written
+    os.remove(os.path.join(version_dir(project_id, first), index_artifacts.SUPERSEDED_FILE))
+    long_ago = time.time() - 10 * index_artifacts.FAISS_VERSION_GRACE_SECONDS
+    os.utime(version_dir(project_id, first), (long_ago, long_ago))
+
+    assert collect_old_versions(project_id) == 0
+    assert os.path.isdir(version_dir(project_id, first))
+    assert os.path.isdir(version_dir(project_id, second))
+
+
+@pytest.fixture
+def legacy_project(project_id) -> list:
+    """Unversioned index and JSON metadata files, as written before versioned artifacts"""
+    phrases = ["open settings", "billing history"]
+    index = faiss.IndexFlatIP(fake_encode_phrases(phrases).shape[1])
+    index.add(fake_encode_phrases(phrases))
+    faiss.write_index(index, legacy_index_path(project_id))
+    items = [{"phrase": phrase, "url": f"https://example.com/{position}", "title": "Old",
+              "navigation_id": f"old-{position}"} for position, phrase in enumerate(phrases)]
+    with open(legacy_metadata_paths(project_id)[1], "w") as f:
+        json.dump(items, f)
+    return items
+
+
+def legacy_files_exist(project_id: str) -> bool:
+    return os.path.exists(legacy_index_path(project_id)) and os.path.exists(legacy_metadata_paths(project_id)[1])
+
+
+def test_convert_publishes_a_verified_version(project_id, legacy_project):
+    assert artifact_signature(project_id).version.startswith("legacy-")
+
+    assert convert_metadata.convert_project(project_id)
+
+    assert not legacy_files_exist(project_id)
+    _, metadata, _ = load_project_index(project_id)
+    assert [item["phrase"] for item in metadata.values()] == ["open settings", "billing history"]
+    # Already converted projects are left alone
+    assert convert_metadata.convert_project(project_id)
+
+
+def test_failed_read_back_keeps_the_legacy_files(project_id, legacy_project, monkeypatch):
+    load = convert_metadata.load_project_index
+
+    def load_corrupted(project_id, version=None, **kwargs):
+        index, metadata, params = load(project_id, version=version, **kwargs)
+        if version is not None:
+            metadata = {}
+        return index, metadata, params
+
+    monkeypatch.setattr(convert_metadata, "load_project_index", load_corrupted)
+    assert not convert_metadata.convert_project(project_id)
+
+    assert legacy_files_exist(project_id)
+    assert artifact_signature(project_id).version.startswith("legacy-")
+    _, metadata, _ = load_project_index(project_id)
+    assert len(metadata) == 2
+
+
+@pytest.mark.parametrize("factory", ["Flat", "HNSW16,Flat"])
+def test_memory_mapped_index_searches_like_a_loaded_one(project_id, factory):
+    phrases = [f"{verb} {noun}" for verb in ("open", "export", "delete", "share")
+               for noun in ("invoices", "reports", "settings", "teammates", "projects")]
+    embeddings = fake_encode_phrases(phrases)
+    base = faiss.index_factory(embeddings.shape[1], factory, faiss.METRIC_INNER_PRODUCT)
+    index = faiss.IndexIDMap2(base)
+    index.add_with_ids(embeddings, np.arange(len(phrases)))
+    save_project_index(project_id, index, phrase_items(phrases), {"index_type": "flat"})
+
+    loaded, metadata, _ = load_project_index(project_id)
+    mapped, mapped_metadata, _ = load_project_index(project_id, mmap=True)
+
+    queries = fake_encode_phrases(["export invoices", "share projects", "delete"])
+    np.testing.assert_array_equal(mapped.search(queries, 5)[1], loaded.search(queries, 5)[1])
+    np.testing.assert_allclose(mapped.search(queries, 5)[0], loaded.search(queries, 5)[0])
+    assert dict(mapped_metadata.items()) == dict(metadata.items())
@@ -0,0 +1,111 @@
+"""Background index builds: status, checkpoints, and races with incremental writes"""
+import pytest
+from storage import index_builder, index_maintenance, search_utils, shared_index
+from storage.index_artifacts import artifact_signature, load_project_index
+from storage.index_maintenance import remove_navigation_vectors, upsert_navigation_vectors
+from storage.search_utils import semantic_search_by_project
+from tests.helpers import make_navigation
+
+
+@pytest.fixture(params=["per_project", "shared"])
+def storage_mode(request, monkeypatch):
+    """Run a test against both FAISS_STORAGE_MODE layouts"""
+    shared = request.param == "shared"
+    for module in (index_builder, index_maintenance, search_utils, shared_index):
+        monkeypatch.setattr(module, "SHARED_STORAGE", shared)
+    return request.param
+
+
+def indexed_navigation_ids(project_id: str) -> set:
+    if index_builder.SHARED_STORAGE:
+        loaded = search_utils.get_shared_project_index(project_id)
+        metadata = loaded.metadata if loaded else {}
+    else:
+        _, metadata, _ = load_project_index(project_id)
+    return {item["navigation_id"] for item in metadata.values()}
+
+
+def searched_urls(project_id: str, query: str) -> list:
+    return [result["url"] for result in semantic_search_by_project(query, project_id, limit=5, score_threshold=0.5)]
+
+
+def test_build_publishes_index_and_status(project_id, navigations, redis_store):
+    navigations.insert_one(make_navigation(project_id, "home", ["go home", "main page"]))
+
+    assert index_builder.build_project_index(project_id) == 2
+    status = index_builder.get_build_status(project_id)
+    assert status["state"] == index_builder.BuildState.READY
+    assert status["progress"] == 1.0
+    assert status["index_type"] == "flat"
+    assert searched_urls(project_id, "main page") == ["https://example.com/home"]
+
+
+def test_enqueue_is_deduplicated(project_id, redis_store):
+    assert index_builder.enqueue_project_build(project_id)
+    assert not index_builder.enqueue_project_build(project_id)
+    assert index_builder.get_build_status(project_id)["state"] == index_builder.BuildState.QUEUED
+
+
+def test_build_resumes_from_checkpoint(project_id, navigations, redis_store, monkeypatch):
+    monkeypatch.setattr(index_builder, "INDEX_BUILD_BATCH_SIZE", 1)
+    navigations.insert_one(make_navigation(project_id, "home", ["go home", "main page", "start screen"]))
+
+    embed_phrases = index_builder.embed_phrases
+    calls = []
+
+    def embed_then_crash(phrases):
+        calls.append(phrases)
+        if len(calls) == 2:
+            raise RuntimeError("worker killed")
+        return embed_phrases(phrases)
+
+    monkeypatch.setattr(index_builder, "embed_phrases", embed_then_crash)
+    with pytest.raises(RuntimeError):
+        index_builder.build_project_index(project_id)
+
+    calls.clear()
+    monkeypatch.setattr(index_builder, "embed_phrases", lambda phrases: calls.append(phrases) or embed_phrases(phrases))
+    assert index_builder.build_project_index(project_id) == 3
+    # The first batch came from the checkpoint
+    assert len(calls) == 2
+    assert searched_urls(project_id, "start screen") == ["https://example.com/home"]
+
+
+def test_build_keeps_upserts_made_while_embedding(project_id, navigations, redis_store, storage_mode, monkeypatch):
+    kept = make_navigation(project_id, "kept", ["open settings"])
+    deleted = make_navigation(project_id, "deleted", ["delete my account"])
+    navigations.insert_many([dict(kept), dict(deleted)])
+
+    added = make_navigation(project_id, "added", ["export reports"])
+    embed_phrases = index_builder.embed_phrases
+
+    def embed_while_navigations_change(phrases):
+        # A navigation write lands mid-build and is applied incrementally, as the routes do
+        if not navigations.find_one({"navigation_id": added["navigation_id"]}):
+            navigations.insert_one(dict(added))
+            upsert_navigation_vectors(project_id, added)
+            navigations.delete_one({"navigation_id": deleted["navigation_id"]})
+            remove_navigation_vectors(project_id, deleted["navigation_id"])
+        return embed_phrases(phrases)
+
+    monkeypatch.setattr(index_builder, "embed_phrases", embed_while_navigations_change)
+    assert index_builder.build_project_index(project_id) == 2
+
+    assert indexed_navigation_ids(project_id) == {kept["navigation_id"], added["navigation_id"]}
+    assert searched_urls(project_id, "export reports") == [added["url"]]
+    assert searched_urls(project_id, "delete my account") == []
+
+
+def test_build_of_emptied_project_retires_its_index(project_id, navigations, redis_store, storage_mode):
+    navigation = make_navigation(project_id, "home", ["go home"])
+    navigations.insert_one(dict(navigation))
+    index_builder.build_project_index(project_id)
+    assert searched_urls(project_id, "go home") == [navigation["url"]]
+
+    # Deleted without the incremental update, e.g. directly in Mongo
+    navigations.delete_many({"project_id": project_id})
+    assert index_builder.build_project_index(project_id) == 0
+
+    assert searched_urls(project_id, "go home") == []
+    if storage_mode == "per_project":
+        assert artifact_signature(project_id) is None
@@ -0,0 +1,75 @@
+"""Index type selection by project size, and the recall of the indexes it builds"""
+import numpy as np
+import pytest
+from storage import index_factory
+from storage.index_factory import build_index, choose_index_params, create_index, supports_removal
+
+
+@pytest.mark.parametrize("phrase_count, index_type", [
+    (10, "flat"),
+    (index_factory.FAISS_HNSW_MIN_PHRASES, "hnsw"),
+    (index_factory.FAISS_IVF_MIN_PHRASES, "ivf"),
+    (index_factory.FAISS_IVFPQ_MIN_PHRASES, "ivfpq"),
+])
+def test_index_type_follows_phrase_count(phrase_count, index_type):
+    params = choose_index_params(phrase_count, 384)
+    assert params["index_type"] == index_type
+    if index_type.startswith("ivf"):
+        assert 64 <= params["build_params"]["nlist"] <= 65536
+        assert params["search_params"]["nprobe"] <= params["build_params"]["nlist"]
+
+
+def test_higher_recall_targets_search_wider():
+    low = choose_index_params(index_factory.FAISS_HNSW_MIN_PHRASES, 384, recall_target=0.9)
+    high = choose_index_params(index_factory.FAISS_HNSW_MIN_PHRASES, 384, recall_target=0.99)
+    assert low["search_params"]["efSearch"] < high["search_params"]["efSearch"]
+
+
+def test_hnsw_index_reaches_recall_target_and_cannot_remove(monkeypatch):
+    monkeypatch.setattr(index_factory, "FAISS_HNSW_MIN_PHRASES", 100)
+    embeddings = np.random.default_rng(0).standard_normal((2000, 32)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    params = choose_index_params(len(embeddings), embeddings.shape[1])
+
+    index = create_index(embeddings, np.arange(len(embeddings)), params)
+
+    assert params["index_type"] == "hnsw"
+    assert params["measured_recall"] >= params["recall_target"]
+    assert not supports_removal(index)
+
+
+def normalized_vectors(count: int, dimension: int = 32) -> np.ndarray:
+    embeddings = np.random.default_rng(0).standard_normal((count, dimension)).astype(np.float32)
+    return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+
+def test_compressed_index_is_kept_when_it_reaches_the_recall_target():
+    embeddings = normalized_vectors(2000)
+    index, params = build_index(embeddings, np.arange(len(embeddings)), compression="sq8")
+
+    assert params["compression"] == "sq8"
+    assert params["factory"] == "SQ8"
+    assert params["measured_recall"] >= index_factory.FAISS_COMPRESSED_RECALL_TARGET
+    assert "rejected_compression" not in params
+    assert index.ntotal == len(embeddings)
+
+
+def test_compressed_index_below_the_recall_target_falls_back(monkeypatch):
+    monkeypatch.setattr(index_factory, "FAISS_COMPRESSED_RECALL_TARGET", 1.01)
+    embeddings = normalized_vectors(2000)
+    index, params = build_index(embeddings, np.arange(len(embeddings)), compression="sq8")
+
+    assert "compression" not in params
+    assert params["factory"] == "Flat"
+    assert params["rejected_compression"]["compression"] == "sq8"
+    assert params["rejected_compression"]["measured_recall"] < 1.01
+    # The uncompressed fallback is exact
+    _, found = index.search(embeddings[:5], 1)
+    assert found[:, 0].tolist() == [0, 1, 2, 3, 4]
+
+
+def test_product_quantization_needs_enough_phrases():
+    assert choose_index_params(100, 32, compression="pq")["compression"] == "sq8"
+    assert choose_index_params(index_factory.PQ_MIN_PHRASES, 32, compression="opq")["factory"] == "OPQ4,HNSW32,PQ4x8"
+    with pytest.raises(ValueError):
+        choose_index_params(100, 32, compression="zstd")
@@ -0,0 +1,92 @@
+"""Incremental maintenance of per-project indexes on navigation writes"""
+import json
+import faiss
+import pytest
+from storage import index_factory
+from storage.index_artifacts import legacy_index_path, legacy_metadata_paths, load_project_index
+from storage.index_builder import BuildState, get_build_status
+from storage.index_maintenance import remove_navigation_vectors, upsert_navigation_vectors
+from storage.search_utils import semantic_search_by_project
+from tests.helpers import fake_encode_phrases, make_navigation
+
+
+def indexed_navigation_ids(project_id: str) -> set:
+    _, metadata, _ = load_project_index(project_id)
+    return {item["navigation_id"] for item in metadata.values()}
+
+
+def searched_urls(project_id: str, query: str) -> list:
+    return [result["url"] for result in semantic_search_by_project(query, project_id, limit=5, score_threshold=0.5)]
+
+
+def test_upsert_and_remove_are_searchable(project_id):
+    billing = make_navigation(project_id, "billing", ["view my invoices", "billing history"])
+    team = make_navigation(project_id, "team", ["invite a teammate"])
+
+    assert upsert_navigation_vectors(project_id, billing) == 2
+    assert upsert_navigation_vectors(project_id, team) == 1
+    assert searched_urls(project_id, "billing history") == [billing["url"]]
+
+    # Replacing a navigation's phrases drops the old ones
+    billing["phrases"] = ["download receipts"]
+    upsert_navigation_vectors(project_id, billing)
+    assert searched_urls(project_id, "billing history") == []
+    assert searched_urls(project_id, "download receipts") == [billing["url"]]
+
+    assert remove_navigation_vectors(project_id, billing["navigation_id"]) == 1
+    assert searched_urls(project_id, "download receipts") == []
+    assert indexed_navigation_ids(project_id) == {team["navigation_id"]}
+
+
+def test_remove_from_missing_index_is_a_no_op(project_id):
+    assert remove_navigation_vectors(project_id, "unknown") == 0
+
+
+def test_upsert_upgrades_positional_legacy_index(project_id):
+    # Unversioned index from before phrase IDs: vectors addressed by list position
+    phrases = ["open settings", "billing history"]
+    index = faiss.IndexFlatIP(fake_encode_phrases(phrases).shape[1])
+    index.add(fake_encode_phrases(phrases))
+    faiss.write_index(index, legacy_index_path(project_id))
+    with open(legacy_metadata_paths(project_id)[1], "w") as f:
+        json.dump([{"phrase": phrase, "url": f"https://example.com/{position}", "title": "Old",
+                    "navigation_id": f"old-{position}"} for position, phrase in enumerate(phrases)], f)
+
+    upsert_navigation_vectors(project_id, make_navigation(project_id, "team", ["invite a teammate"]))
+
+    assert indexed_navigation_ids(project_id) == {"old-0", "old-1", f"{project_id}-team"}
+    assert searched_urls(project_id, "billing history") == ["https://example.com/1"]
+    assert searched_urls(project_id, "invite a teammate") == ["https://example.com/team"]
+
+
+@pytest.fixture
+def hnsw_projects(monkeypatch):
+    """Every new project index is HNSW, whose vectors can only be tombstoned"""
+    monkeypatch.setattr(index_factory, "FAISS_HNSW_MIN_PHRASES", 1)
+
+
+def test_hnsw_delete_then_insert_does_not_reuse_tombstoned_ids(project_id, hnsw_projects, redis_store):
+    account = make_navigation(project_id, "account", ["delete my account"])
+    upsert_navigation_vectors(project_id, make_navigation(project_id, "settings", ["open settings"]))
+    upsert_navigation_vectors(project_id, account)
+    remove_navigation_vectors(project_id, account["navigation_id"])
+    upsert_navigation_vectors(project_id, make_navigation(project_id, "invoices", ["view my invoices"]))
+
+    index, metadata, params = load_project_index(project_id)
+    assert params["index_type"] == "hnsw"
+    assert params["tombstones"] == 1
+    assert index.ntotal == 3
+    assert len(set(faiss.vector_to_array(index.id_map))) == 3
+    assert searched_urls(project_id, "delete my account") == []
+    assert searched_urls(project_id, "view my invoices") == ["https://example.com/invoices"]
+
+
+def test_tombstones_queue_a_rebuild(project_id, hnsw_projects, redis_store):
+    team = make_navigation(project_id, "team", ["invite a teammate"])
+    upsert_navigation_vectors(project_id, make_navigation(project_id, "home", ["go home", "main page", "dashboard"]))
+    upsert_navigation_vectors(project_id, team)
+    assert get_build_status(project_id)["state"] == BuildState.READY
+
+    # 1 dead vector out of 4 is over TOMBSTONE_REBUILD_RATIO
+    remove_navigation_vectors(project_id, team["navigation_id"])
+    assert get_build_status(project_id)["state"] == BuildState.QUEUED
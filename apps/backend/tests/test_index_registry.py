@@ -0,0 +1,85 @@
+"""Per-process LRU registry of loaded project indexes"""
+import shutil
+from storage import index_registry
+from storage.index_artifacts import artifact_signature, project_dir
+from storage.index_registry import IndexRegistry
+from tests.helpers import fake_encode_phrases, save_flat_index
+
+
+def test_hits_after_first_load(project_id):
+    save_flat_index(project_id, ["open settings", "billing history"])
+    registry = IndexRegistry(max_bytes=1 << 30)
+
+    first = registry.get(project_id)
+    assert first.index.ntotal == 2
+    assert registry.get(project_id) is first
+    assert registry.stats()["misses"] == 1
+    assert registry.stats()["hits"] == 1
+
+
+def test_new_version_is_hot_reloaded(project_id):
+    save_flat_index(project_id, ["open settings"])
+    registry = IndexRegistry(max_bytes=1 << 30)
+    first = registry.get(project_id)
+
+    save_flat_index(project_id, ["open settings", "billing history", "invite a teammate"])
+    second = registry.get(project_id)
+    assert second is not first
+    assert second.index.ntotal == 3
+    assert second.signature == artifact_signature(project_id)
+    assert registry.stats()["reloads"] == 1
+
+
+def test_least_recently_used_is_evicted_over_budget(project_id):
+    projects = [f"{project_id}-{number}" for number in range(3)]
+    for project in projects:
+        save_flat_index(project, ["open settings", "billing history"])
+    size = artifact_signature(projects[0])
+    # Room for two of the three indexes
+    registry = IndexRegistry(max_bytes=2 * (size.index_bytes + size.metadata_bytes))
+
+    registry.get(projects[0])
+    registry.get(projects[1])
+    registry.get(projects[0])
+    registry.get(projects[2])
+
+    stats = registry.stats()
+    assert stats["entries"] == 2
+    assert stats["evictions"] == 1
+    assert stats["resident_bytes"] <= registry.max_bytes
+    # projects[1] was the least recently used
+    registry.get(projects[1])
+    assert registry.stats()["misses"] == 4
+
+
+def test_removed_artifacts_are_dropped(project_id):
+    save_flat_index(project_id, ["open settings"])
+    registry = IndexRegistry(max_bytes=1 << 30)
+    registry.get(project_id)
+
+    shutil.rmtree(project_dir(project_id))
+    assert registry.get(project_id) is None
+    assert registry.stats()["entries"] == 0
+
+
+def test_load_locks_do_not_grow_with_projects(project_id):
+    # A tiny budget keeps evicting, as a long-running worker does across many projects
+    registry = IndexRegistry(max_bytes=1)
+    for number in range(2 * index_registry.LOAD_LOCK_STRIPES):
+        project = f"{project_id}-{number}"
+        save_flat_index(project, ["open settings"])
+        assert registry.get(project).index.ntotal == 1
+
+    assert registry.stats()["entries"] == 1
+    assert len(registry._load_locks) == index_registry.LOAD_LOCK_STRIPES
+
+
+def test_memory_mapped_entries_serve_searches_and_reload(project_id, monkeypatch):
+    monkeypatch.setattr(index_registry, "FAISS_INDEX_MMAP", True)
+    save_flat_index(project_id, ["open settings", "billing history"])
+    registry = IndexRegistry(max_bytes=1 << 30)
+
+    assert registry.get(project_id).index.search(fake_encode_phrases(["billing history"]), 1)[1][0][0] == 1
+    save_flat_index(project_id, ["billing history"])
+    assert registry.get(project_id).index.search(fake_encode_phrases(["billing history"]), 1)[1][0][0] == 0
+    assert registry.stats()["mmap"] is True
@@ -0,0 +1,63 @@
+"""Compact, memory-mapped phrase metadata"""
+import json
+import pytest
+from storage.metadata_store import CompactMetadata, convert_json_metadata, write_compact_metadata
+
+
+def test_round_trip_sorted_by_phrase_id(tmp_path):
+    items = [
+        {"id": 9, "phrase": "téléchargement des reçus", "url": "https://example.com/billing", "title": "Billing",
+         "navigation_id": "billing"},
+        {"id": 2, "phrase": "view invoices", "url": "https://example.com/billing", "title": "Billing",
+         "navigation_id": "billing"},
+        {"id": 5, "phrase": "invite a teammate", "url": "https://example.com/team", "title": "",
+         "navigation_id": "team"},
+    ]
+    path = str(tmp_path / "metadata.bin")
+    write_compact_metadata(path, items)
+
+    metadata = CompactMetadata(path)
+    assert len(metadata) == 3
+    assert list(metadata.keys()) == [2, 5, 9]
+    assert metadata[9] == items[0]
+    assert dict(metadata.items()) == {item["id"]: item for item in items}
+    # Navigations sharing url, title and navigation_id are stored once
+    assert metadata.navigation_count == 2
+
+
+def test_missing_ids(tmp_path):
+    path = str(tmp_path / "metadata.bin")
+    write_compact_metadata(path, [{"id": 3, "phrase": "open settings", "url": "u", "title": "t",
+                                   "navigation_id": "n"}])
+    metadata = CompactMetadata(path)
+
+    assert 3 in metadata and 4 not in metadata and -1 not in metadata
+    assert metadata.get(4) is None
+    with pytest.raises(KeyError):
+        metadata[100]
+
+
+def test_empty_metadata(tmp_path):
+    path = str(tmp_path / "metadata.bin")
+    write_compact_metadata(path, [])
+    metadata = CompactMetadata(path)
+    assert len(metadata) == 0
+    assert list(metadata.values()) == []
+    assert 0 not in metadata
+
+
+def test_items_without_ids_are_numbered_by_position(tmp_path):
+    json_path = tmp_path / "metadata.json"
+    json_path.write_text(json.dumps([{"phrase": "go home", "url": "u", "title": "t", "navigation_id": "n"},
+                                     {"phrase": "main page", "url": "u", "title": "t", "navigation_id": "n"}]))
+    compact_path = str(tmp_path / "metadata.bin")
+
+    assert convert_json_metadata(str(json_path), compact_path) == 2
+    assert CompactMetadata(compact_path)[1]["phrase"] == "main page"
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "metadata.json"
+    path.write_text("[]" + " " * 64)
+    with pytest.raises(ValueError):
+        CompactMetadata(str(path))
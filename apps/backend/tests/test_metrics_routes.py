@@ -0,0 +1,91 @@
+"""Admin-only metrics endpoints and the MongoDB command listener behind /metrics/mongo"""
+import json
+import uuid
+from types import SimpleNamespace
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from routes import metrics_routes
+from storage.mongo_client import get_mongo_client
+from storage.mongo_metrics import MongoCommandMetrics
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(metrics_routes.router)
+    return TestClient(app)
+
+
+@pytest.fixture
+def login(redis_store):
+    """Create a user with the given role and return bearer headers for them"""
+    users = get_mongo_client().users_collection
+    emails = []
+
+    def create(role: str) -> dict:
+        email = f"{uuid.uuid4().hex[:8]}@example.com"
+        token = uuid.uuid4().hex
+        users.insert_one({"email": email, "role": role, "organization_id": "org-1"})
+        redis_store.set(f"token:{token}", json.dumps({"email": email}))
+        emails.append(email)
+        return {"Authorization": f"Bearer {token}"}
+
+    yield create
+    users.delete_many({"email": {"$in": emails}})
+
+
+@pytest.mark.parametrize("path", ["/metrics/search", "/metrics/mongo"])
+def test_metrics_require_admin(client, login, path):
+    assert client.get(path).status_code in (401, 403)
+    assert client.get(path, headers={"Authorization": "Bearer unknown"}).status_code == 401
+    assert client.get(path, headers=login("user")).status_code == 403
+    assert client.get(path, headers=login("admin")).status_code == 200
+
+
+def test_search_metrics_lists_every_cache(client, login):
+    body = client.get("/metrics/search", headers=login("admin")).json()
+    assert set(body) == {"index_cache", "query_embedding_batcher", "query_embedding_cache",
+                         "fuzzy_phrase_catalog", "query_result_cache", "flow_index"}
+
+
+def command_event(command_name: str, command: dict, request_id: int, duration_ms: float = 0, reply: dict = None):
+    """Just the attributes of a pymongo command event the listener reads"""
+    return SimpleNamespace(command_name=command_name, command=command, database_name="trail_blazer",
+                           connection_id=("localhost", 27017), request_id=request_id,
+                           duration_micros=int(duration_ms * 1000), reply=reply)
+
+
+def test_listener_records_latency_documents_and_slow_shapes():
+    metrics = MongoCommandMetrics(slow_query_ms=50, log_slow_queries=False, max_slow_samples=10)
+    find = {"find": "users", "filter": {"email": "ada@example.com"}, "sort": {"created_at": -1}}
+
+    metrics.started(command_event("find", find, 1))
+    metrics.succeeded(command_event("find", find, 1, duration_ms=3,
+                                    reply={"cursor": {"firstBatch": [{"_id": 1}, {"_id": 2}]}}))
+    metrics.started(command_event("find", find, 2))
+    metrics.failed(command_event("find", find, 2, duration_ms=80))
+    metrics.started(command_event("ping", {"ping": 1}, 3))
+    metrics.succeeded(command_event("ping", {"ping": 1}, 3, reply={"ok": 1}))
+
+    stats = metrics.stats()
+    assert list(stats["operations"]) == ["users.find"]
+    operation = stats["operations"]["users.find"]
+    assert operation["count"] == 2
+    assert operation["errors"] == 1
+    assert operation["documents_returned"] == 2
+    assert operation["max_ms"] == 80
+    assert operation["latency_histogram_ms"]["5"] == 1
+    assert operation["latency_histogram_ms"]["100"] == 1
+
+    [sample] = stats["slow_samples"]
+    assert sample["failed"]
+    # Filter values never reach the samples
+    assert sample["shape"] == {"filter": {"email": "?"}, "sort": {"created_at": -1}}
+
+
+def test_listener_ignores_replies_without_a_started_event():
+    metrics = MongoCommandMetrics(slow_query_ms=0, log_slow_queries=False, max_slow_samples=10)
+    metrics.succeeded(command_event("find", {"find": "users"}, 1, reply={"cursor": {"firstBatch": []}}))
+    assert metrics.stats()["operations"] == {}
+    assert metrics.stats()["slow_samples"] == []
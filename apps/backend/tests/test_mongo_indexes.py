@@ -0,0 +1,100 @@
+"""
+Declarative MongoDB indexes: planning and applying them, and the query plans of
+every hot query.
+
+The query plan tests need a real MongoDB server (MONGO_TEST_URL, by default
+mongodb://localhost:27017), since mongomock has no query planner; they are
+skipped when none answers. They run in a throwaway database that is dropped
+afterwards.
+"""
+import os
+import uuid
+import mongomock
+import pytest
+from pymongo import ASCENDING
+from pymongo.errors import PyMongoError
+from pymongo.mongo_client import MongoClient
+from storage.mongo_indexes import INDEX_SPECS, _hot_queries, apply_indexes, missing_indexes, plan_indexes, verify_query_plans
+
+MONGO_TEST_URL = os.getenv("MONGO_TEST_URL", "mongodb://localhost:27017")
+
+# Winning plan stages that read an index (EXPRESS_IXSCAN and IDHACK are MongoDB 8's and older _id fast paths)
+INDEX_STAGES = {"IXSCAN", "EXPRESS_IXSCAN", "IDHACK"}
+
+# mongomock drops partialFilterExpression, so these always read back as changed
+PARTIAL_INDEXES = {
+    (collection, spec["name"])
+    for collection, specs in INDEX_SPECS.items()
+    for spec in specs
+    if "partialFilterExpression" in spec
+}
+
+
+@pytest.fixture
+def mock_db():
+    return mongomock.MongoClient()[f"indexes_{uuid.uuid4().hex[:8]}"]
+
+
+def actions(plan: list) -> dict:
+    return {(entry["collection"], entry["name"]): entry["action"] for entry in plan}
+
+
+def test_apply_creates_every_specified_index(mock_db):
+    assert all(entry["action"] == "create" for entry in plan_indexes(mock_db))
+
+    plan = apply_indexes(mock_db)
+    assert all(entry["result"] == "applied" for entry in plan)
+    assert missing_indexes(mock_db) == []
+    assert {key for key, action in actions(plan_indexes(mock_db)).items() if action != "ok"} == PARTIAL_INDEXES
+
+
+def test_apply_is_idempotent(mock_db):
+    apply_indexes(mock_db)
+    plan = apply_indexes(mock_db)
+    assert not any("result" in entry for entry in plan)
+
+
+def test_dry_run_changes_nothing(mock_db):
+    apply_indexes(mock_db, dry_run=True)
+    assert len(missing_indexes(mock_db)) == sum(len(specs) for specs in INDEX_SPECS.values())
+
+
+def test_conflicts_and_extras_are_reported_not_dropped(mock_db):
+    # An index named like a specified one but on other keys, and one outside the specification
+    mock_db.logs.create_index([("created_at", ASCENDING)], name="request_id_1")
+    mock_db.logs.create_index([("level", ASCENDING)])
+
+    plan = actions(apply_indexes(mock_db))
+    assert plan[("logs", "request_id_1")] == "conflict"
+    assert plan[("logs", "level_1")] == "extra"
+    assert "level_1" in mock_db.logs.index_information()
+
+    apply_indexes(mock_db, replace_conflicts=True)
+    assert list(mock_db.logs.index_information()["request_id_1"]["key"]) == [("request_id", ASCENDING)]
+
+
+@pytest.fixture(scope="module")
+def query_plans():
+    """verify_query_plans of a real MongoDB database with the specified indexes, by query description"""
+    client = MongoClient(MONGO_TEST_URL, serverSelectionTimeoutMS=1000)
+    try:
+        client.admin.command("ping")
+    except PyMongoError:
+        client.close()
+        pytest.skip(f"No MongoDB server at {MONGO_TEST_URL}")
+
+    db = client[f"trail_blazer_test_{uuid.uuid4().hex[:8]}"]
+    try:
+        plan = apply_indexes(db)
+        assert not [entry for entry in plan if entry.get("result", "applied") != "applied"]
+        yield {result["query"]: result for result in verify_query_plans(db)}
+    finally:
+        client.drop_database(db.name)
+        client.close()
+
+
+@pytest.mark.parametrize("description", [query[3] for query in _hot_queries()])
+def test_hot_query_uses_an_index(query_plans, description):
+    result = query_plans[description]
+    assert not result["collscan"], f"{result['collection']} {description}: {result['stages']}"
+    assert INDEX_STAGES & set(result["stages"]), f"{result['collection']} {description}: {result['stages']}"
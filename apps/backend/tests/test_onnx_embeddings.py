@@ -0,0 +1,66 @@
+"""ONNX Runtime embedding backends against the PyTorch model they are exported from"""
+import numpy as np
+import pytest
+from storage.embeddings import load_embedding_model
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("sentence_transformers")
+pytest.importorskip("transformers")
+
+WORDS = ("open dashboard invoices where can i change my billing address show overdue objectives for team "
+         "create a new project settings security two factor authentication download last month payroll "
+         "report as csv export sample >").split()
+
+
+@pytest.fixture(scope="module")
+def exported_model(tmp_path_factory):
+    """A tiny randomly initialized BERT sentence model, exported to fp32 and int8 ONNX"""
+    from sentence_transformers import SentenceTransformer, models
+    from transformers import BertConfig, BertModel, BertTokenizerFast
+    from scripts.export_onnx_model import export
+
+    source = tmp_path_factory.mktemp("tiny_bert")
+    vocab = (["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + sorted(set(WORDS))
+             + [chr(code) for code in range(97, 123)] + ["##" + chr(code) for code in range(97, 123)] + ["'", "-"])
+    (source / "vocab.txt").write_text("\n".join(vocab))
+    BertTokenizerFast(vocab_file=str(source / "vocab.txt")).save_pretrained(str(source))
+    BertModel(BertConfig(vocab_size=len(vocab), hidden_size=32, num_hidden_layers=2, num_attention_heads=2,
+                         intermediate_size=64)).save_pretrained(str(source))
+
+    sentence_model_dir = tmp_path_factory.mktemp("tiny_sentence_model")
+    SentenceTransformer(modules=[
+        models.Transformer(str(source), max_seq_length=256), models.Pooling(32, "mean"), models.Normalize()
+    ]).save(str(sentence_model_dir))
+
+    output_dir = tmp_path_factory.mktemp("onnx")
+    model = export(str(output_dir), model_name=str(sentence_model_dir))
+    return model, str(output_dir)
+
+
+def test_exports_match_the_pytorch_model(exported_model):
+    from scripts.export_onnx_model import verify
+    model, output_dir = exported_model
+    assert verify(model, output_dir)
+
+
+def test_onnx_encode_keeps_input_order_and_shape(exported_model):
+    from storage.onnx_embeddings import OnnxEmbeddingModel
+    model, output_dir = exported_model
+    phrases = ["create a new project", "open dashboard", "download last month's payroll report as CSV"]
+
+    onnx_model = OnnxEmbeddingModel(output_dir, variant="onnx")
+    embeddings = onnx_model.encode(phrases, batch_size=2, normalize_embeddings=True)
+    reference = model.encode(phrases, convert_to_numpy=True, normalize_embeddings=True)
+
+    assert embeddings.dtype == np.float32
+    assert embeddings.shape == (3, onnx_model.get_sentence_embedding_dimension())
+    np.testing.assert_allclose(embeddings, reference, atol=1e-4)
+    assert onnx_model.encode([]).shape == (0, onnx_model.get_sentence_embedding_dimension())
+
+
+def test_missing_export_and_unknown_backend_fail_clearly(tmp_path):
+    from storage.onnx_embeddings import OnnxEmbeddingModel
+    with pytest.raises(FileNotFoundError, match="export_onnx_model"):
+        OnnxEmbeddingModel(str(tmp_path), variant="onnx-int8")
+    with pytest.raises(ValueError, match="EMBEDDING_BACKEND"):
+        load_embedding_model("tensorrt")
@@ -0,0 +1,81 @@
+"""Per-worker phrase catalogs used by fuzzy search, and their invalidation"""
+from types import SimpleNamespace
+import pytest
+from storage import phrase_catalog
+from storage.query_cache import get_query_result_cache
+from tests.helpers import make_navigation
+
+
+@pytest.fixture
+def racing_catalog_load(navigations, monkeypatch):
+    """Register a callback run right after the catalog's next Mongo read"""
+    hooks = []
+
+    class RacingCollection:
+        def find(self, *args, **kwargs):
+            documents = list(navigations.find(*args, **kwargs))
+            while hooks:
+                hooks.pop()()
+            return documents
+
+    client = SimpleNamespace(client={"trail_blazer": {"app_navigations": RacingCollection()}})
+    monkeypatch.setattr(phrase_catalog, "get_mongo_client", lambda: client)
+    return hooks.append
+
+
+def test_catalog_groups_phrases_by_navigation(project_id, navigations, redis_store):
+    navigations.insert_many([make_navigation(project_id, "billing", ["view invoices", "billing history"]),
+                             make_navigation(project_id, "team", ["invite a teammate"])])
+
+    catalog = phrase_catalog.PhraseCatalogCache(max_entries=8, ttl_seconds=3600).get(project_id)
+
+    assert len(catalog) == 3
+    assert catalog.owners.tolist() == [0, 0, 1]
+    assert catalog.phrase_range(1) == (2, 3)
+    assert catalog.navigations[1]["url"] == "https://example.com/team"
+
+
+def test_catalog_invalidated_during_load_is_not_cached(project_id, navigations, racing_catalog_load, redis_store):
+    cache = phrase_catalog.PhraseCatalogCache(max_entries=8, ttl_seconds=3600)
+    navigation = make_navigation(project_id, "billing", ["view invoices"])
+    navigations.insert_one(dict(navigation))
+
+    def edit_navigation():
+        navigations.update_one({"navigation_id": navigation["navigation_id"]},
+                               {"$set": {"phrases": ["download receipts"]}})
+        cache.invalidate(project_id)
+
+    racing_catalog_load(edit_navigation)
+    assert cache.get(project_id).phrases == ["view invoices"]
+
+    # The stale catalog was not kept: the next search re-reads the edit
+    assert cache.get(project_id).phrases == ["download receipts"]
+    assert cache.get(project_id).phrases == ["download receipts"]
+    assert cache.stats()["misses"] == 2
+
+
+def test_writes_through_another_worker_reload_the_catalog(project_id, navigations, redis_store):
+    cache = phrase_catalog.PhraseCatalogCache(max_entries=8, ttl_seconds=3600)
+    navigation = make_navigation(project_id, "billing", ["view invoices"])
+    navigations.insert_one(dict(navigation))
+    assert cache.get(project_id).phrases == ["view invoices"]
+    assert cache.get(project_id).phrases == ["view invoices"]
+
+    # Another worker edits the navigation: only the shared write version changes here
+    navigations.update_one({"navigation_id": navigation["navigation_id"]},
+                           {"$set": {"phrases": ["download receipts"]}})
+    get_query_result_cache().invalidate(project_id)
+
+    assert cache.get(project_id).phrases == ["download receipts"]
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_catalog_falls_back_to_its_ttl_without_redis(project_id, navigations, redis_store, monkeypatch):
+    cache = phrase_catalog.PhraseCatalogCache(max_entries=8, ttl_seconds=3600)
+    navigations.insert_one(make_navigation(project_id, "billing", ["view invoices"]))
+    cache.get(project_id)
+
+    monkeypatch.setattr(get_query_result_cache(), "project_version", lambda project_id: None)
+    cache.get(project_id)
+    assert cache.stats()["hits"] == 1
@@ -0,0 +1,50 @@
+"""Micro-batching of query embeddings across concurrent requests"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pytest
+from storage.embeddings import QueryEmbeddingBatcher
+from tests.helpers import fake_encode_phrases
+
+
+def test_concurrent_queries_share_a_forward_pass():
+    calls = []
+    release = threading.Event()
+
+    def encode(texts):
+        calls.append(list(texts))
+        # Hold the first batch so the others queue up behind it
+        release.wait(5)
+        return fake_encode_phrases(texts)
+
+    batcher = QueryEmbeddingBatcher(encode, window_ms=50, max_batch_size=8)
+    queries = [f"query number {number}" for number in range(9)]
+    with ThreadPoolExecutor(max_workers=len(queries)) as pool:
+        futures = [pool.submit(batcher.encode, query) for query in queries]
+        release.set()
+        results = [future.result(5) for future in futures]
+
+    # Every caller gets its own row back
+    for query, embedding in zip(queries, results):
+        assert embedding.shape == (1, fake_encode_phrases([query]).shape[1])
+        np.testing.assert_allclose(embedding, fake_encode_phrases([query]))
+
+    assert sum(len(batch) for batch in calls) == len(queries)
+    assert len(calls) < len(queries)
+    assert max(len(batch) for batch in calls) <= 8
+    stats = batcher.stats()
+    assert stats["queries"] == len(queries)
+    assert stats["batches"] == len(calls)
+
+
+def test_encode_errors_reach_every_caller_in_the_batch():
+    def encode(texts):
+        raise RuntimeError("model failed")
+
+    batcher = QueryEmbeddingBatcher(encode, window_ms=1, max_batch_size=4)
+    with pytest.raises(RuntimeError, match="model failed"):
+        batcher.encode("open settings")
+
+    # The worker thread survives a failed batch
+    batcher._encode = fake_encode_phrases
+    assert batcher.encode("open settings").shape[0] == 1
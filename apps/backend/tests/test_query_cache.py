@@ -0,0 +1,95 @@
+"""Shared /query result cache and its per-project invalidation"""
+import pytest
+from storage.mongo_client import get_mongo_client
+from storage.query_cache import QueryResultCache, get_query_result_cache
+from tests.helpers import save_flat_index
+
+RESULTS = [{"url": "https://example.com/billing", "type": "Navigate", "title": "Billing",
+            "description": "view invoices"}]
+
+
+@pytest.fixture
+def cache(redis_store) -> QueryResultCache:
+    return QueryResultCache(redis_store, enabled=True, ttl_seconds=60, max_entries_per_project=100,
+                            max_entry_bytes=16384)
+
+
+def cached(cache: QueryResultCache, project_id: str, query: str = "view invoices", k: int = 4,
+           mode: str = "dense"):
+    results, entry = cache.get(project_id, query, k, mode)
+    if results is None:
+        cache.put(entry, RESULTS)
+    return results
+
+
+def test_hit_after_put_keyed_by_normalized_query_k_and_mode(cache, project_id):
+    assert cached(cache, project_id) is None
+    assert cached(cache, project_id, query="  View   INVOICES ") == RESULTS
+    assert cached(cache, project_id, k=5) is None
+    assert cached(cache, project_id, mode="hybrid") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["writes"] == 3
+
+
+def test_navigation_writes_invalidate_the_project(cache, project_id, navigations):
+    # MongoDBClient bumps the version through the process-wide cache, which shares this Redis
+    assert get_query_result_cache().client is cache.client
+    cached(cache, project_id)
+    cached(cache, f"{project_id}-other")
+
+    navigation_id = get_mongo_client().create_navigation("test-org", project_id, "https://example.com/new",
+                                                         "New", ["new page"])
+    assert cached(cache, project_id) is None
+    assert cached(cache, f"{project_id}-other") == RESULTS
+
+    cached(cache, project_id)
+    get_mongo_client().update_navigation(navigation_id, "test-org", project_id, "https://example.com/new",
+                                         "New", ["renamed page"])
+    assert cached(cache, project_id) is None
+
+    cached(cache, project_id)
+    get_mongo_client().delete_navigation(navigation_id, "test-org")
+    assert cached(cache, project_id) is None
+
+
+def test_published_index_version_invalidates_the_project(cache, project_id):
+    save_flat_index(project_id, ["view invoices"])
+    cached(cache, project_id)
+    assert cached(cache, project_id) == RESULTS
+
+    save_flat_index(project_id, ["view invoices", "billing history"])
+    assert cached(cache, project_id) is None
+
+
+def test_size_caps_skip_writes(redis_store, project_id):
+    cache = QueryResultCache(redis_store, enabled=True, ttl_seconds=60, max_entries_per_project=1,
+                             max_entry_bytes=16384)
+    cached(cache, project_id, query="first")
+    cached(cache, project_id, query="second")
+    assert cache.stats()["skipped"] == 1
+    assert cached(cache, project_id, query="second") is None
+
+    cache.max_entry_bytes = 10
+    cached(cache, f"{project_id}-other")
+    assert cache.stats()["skipped"] == 3
+
+
+def test_redis_errors_are_counted_not_raised(project_id):
+    class BrokenRedis:
+        def __getattr__(self, name):
+            def fail(*args, **kwargs):
+                raise ConnectionError("redis is down")
+            return fail
+
+    cache = QueryResultCache(BrokenRedis(), enabled=True, ttl_seconds=60, max_entries_per_project=100,
+                             max_entry_bytes=16384)
+    assert cache.get(project_id, "view invoices", 4, "dense") == (None, None)
+    cache.invalidate(project_id)
+    assert cache.project_version(project_id) is None
+    assert cache.stats()["errors"] == 3
+
+
+def test_disabled_cache_never_stores(redis_store, project_id):
+    cache = QueryResultCache(redis_store, enabled=False, ttl_seconds=60, max_entries_per_project=100,
+                             max_entry_bytes=16384)
+    assert cache.get(project_id, "view invoices", 4, "dense") == (None, None)
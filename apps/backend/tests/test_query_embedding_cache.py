@@ -0,0 +1,80 @@
+"""Two-level (process LRU + Redis) cache of query embeddings"""
+from concurrent.futures import ThreadPoolExecutor
+import fakeredis
+import numpy as np
+from storage import embeddings
+from storage.embeddings import QueryEmbeddingCache, encode_query, normalize_query
+from tests.helpers import fake_encode_phrases
+
+
+class FailingRedis:
+    def get(self, key):
+        raise ConnectionError("redis down")
+
+    def set(self, key, value, ex=None):
+        raise ConnectionError("redis down")
+
+
+def test_lookups_use_normalized_text():
+    cache = QueryEmbeddingCache("model", max_entries=10)
+    embedding = fake_encode_phrases(["open settings"])
+    cache.put("Open   Settings", embedding)
+
+    assert normalize_query("  Open\tSETTINGS ") == "open settings"
+    np.testing.assert_array_equal(cache.get("open settings"), embedding)
+    assert cache.get("close settings") is None
+    assert cache.stats()["local_hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_least_recently_used_entries_are_dropped():
+    cache = QueryEmbeddingCache("model", max_entries=2)
+    for query in ("a", "b"):
+        cache.put(query, fake_encode_phrases([query]))
+    cache.get("a")
+    cache.put("c", fake_encode_phrases(["c"]))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.stats()["entries"] == 2
+
+
+def test_redis_level_is_shared_between_processes():
+    redis_client = fakeredis.FakeRedis()
+    writer = QueryEmbeddingCache("model", max_entries=10, redis_client=redis_client, redis_ttl=60)
+    reader = QueryEmbeddingCache("model", max_entries=10, redis_client=redis_client, redis_ttl=60)
+    embedding = fake_encode_phrases(["open settings"])
+    writer.put("open settings", embedding)
+
+    np.testing.assert_allclose(reader.get("open settings"), embedding)
+    assert reader.stats()["redis_hits"] == 1
+    # Promoted to the local level
+    reader.get("open settings")
+    assert reader.stats()["local_hits"] == 1
+
+
+def test_redis_errors_are_counted_exactly_under_concurrency():
+    cache = QueryEmbeddingCache("model", max_entries=10, redis_client=FailingRedis())
+    embedding = fake_encode_phrases(["query"])
+
+    def lookup_and_store(number):
+        query = f"query {number}"
+        assert cache.get(query) is None
+        cache.put(query, embedding)
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        list(pool.map(lookup_and_store, range(400)))
+
+    assert cache.stats()["redis_errors"] == 800
+    assert cache.stats()["misses"] == 400
+
+
+def test_encode_query_encodes_each_text_once(monkeypatch):
+    calls = []
+    monkeypatch.setattr(embeddings, "encode_phrases", lambda texts: calls.append(texts) or fake_encode_phrases(texts))
+    monkeypatch.setattr(embeddings, "query_embedding_cache", QueryEmbeddingCache("model", max_entries=10))
+
+    first = encode_query("Open settings")
+    second = encode_query("open  settings")
+    np.testing.assert_array_equal(first, second)
+    assert calls == [["Open settings"]]
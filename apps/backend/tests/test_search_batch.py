@@ -0,0 +1,86 @@
+"""Batched /query searches across projects and modes"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from storage.index_maintenance import upsert_navigation_vectors
+from storage.search_utils import search_batch, search_by_project
+from tests.helpers import make_navigation
+
+
+@pytest.fixture
+def two_projects(project_id) -> tuple:
+    other_project_id = f"{project_id}-other"
+    for navigation in (make_navigation(project_id, "billing", ["view my invoices", "billing history"]),
+                       make_navigation(project_id, "team", ["invite a teammate"]),
+                       make_navigation(project_id, "settings", ["open settings"]),
+                       make_navigation(other_project_id, "reports", ["export reports"])):
+        upsert_navigation_vectors(navigation["project_id"], navigation)
+    return project_id, other_project_id
+
+
+def test_batch_matches_single_searches(two_projects):
+    project_id, other_project_id = two_projects
+    requests = [
+        ("billing history", project_id, 2, "dense"),
+        ("invite", project_id, 3, "lexical"),
+        ("open settings", project_id, 2, "hybrid"),
+        ("export reports", other_project_id, 1, "dense"),
+        ("billing history", "missing-project", 2, "dense"),
+    ]
+    timings = {}
+
+    results = search_batch(requests, timings=timings)
+
+    assert results == [search_by_project(query, project, limit, mode) for query, project, limit, mode in requests]
+    assert results[0][0]["url"] == "https://example.com/billing"
+    assert results[3][0]["url"] == "https://example.com/reports"
+    assert results[4] == []
+    assert "embed_ms" in timings
+
+
+def test_batch_finds_distinct_navigations_past_the_first_pass(project_id):
+    # One navigation with many near-identical phrases crowds the first candidate pass
+    upsert_navigation_vectors(project_id, make_navigation(
+        project_id, "password", [f"reset password step {step}" for step in range(12)]))
+    upsert_navigation_vectors(project_id, make_navigation(project_id, "help", ["password help"]))
+
+    [results] = search_batch([("reset password", project_id, 2, "dense")])
+    assert [result["url"] for result in results] == ["https://example.com/password", "https://example.com/help"]
+
+
+@pytest.fixture
+def query_client(monkeypatch):
+    pytest.importorskip("openai")
+    from routes import query_routes
+
+    logged = []
+
+    async def log_requests(entries):
+        logged.extend(entries)
+
+    monkeypatch.setattr(query_routes, "log_requests_background", log_requests)
+    app = FastAPI()
+    app.include_router(query_routes.router)
+    return TestClient(app), logged
+
+
+def test_batch_endpoint(two_projects, query_client):
+    project_id, other_project_id = two_projects
+    client, logged = query_client
+
+    response = client.post(f"/query/batch?project_id={project_id}", json={"queries": [
+        {"query": "billing history", "k": 1, "mode": "dense"},
+        {"query": "export reports", "project_id": other_project_id, "k": 1, "mode": "dense"},
+    ]})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [result["project_id"] for result in body["results"]] == [project_id, other_project_id]
+    assert body["results"][0]["results"][0]["url"] == "https://example.com/billing"
+    assert len(logged) == 2
+
+
+def test_batch_endpoint_validation(query_client):
+    client, _ = query_client
+    assert client.post("/query/batch", json={"queries": []}).status_code == 400
+    assert client.post("/query/batch", json={"queries": [{"query": "billing"}]}).status_code == 400
@@ -0,0 +1,91 @@
+"""Shared multi-tenant shards: ID ranges, project isolation and incremental writes"""
+import pytest
+from storage import index_builder, index_maintenance, search_utils, shared_index
+from storage.index_maintenance import remove_navigation_vectors, upsert_navigation_vectors
+from storage.search_utils import search_by_project
+from storage.shared_index import (
+    LOCAL_ID_BITS,
+    get_shared_project_index,
+    id_range,
+    navigation_items,
+    project_number,
+    project_numbers,
+    replace_projects,
+)
+from tests.helpers import fake_encode_phrases, make_navigation
+
+
+@pytest.fixture(autouse=True)
+def shared_storage(monkeypatch):
+    """Shared storage with a single shard, so every project of a test shares it"""
+    for module in (index_builder, index_maintenance, search_utils, shared_index):
+        monkeypatch.setattr(module, "SHARED_STORAGE", True)
+    monkeypatch.setattr(shared_index, "FAISS_SHARED_SHARDS", 1)
+
+
+@pytest.fixture
+def other_project_id(project_id) -> str:
+    return f"{project_id}-other"
+
+
+def searched_urls(project_id: str, query: str, mode: str = "dense") -> list:
+    return [result["url"] for result in search_by_project(query, project_id, limit=5, mode=mode)]
+
+
+def test_projects_own_disjoint_id_ranges(project_id, other_project_id):
+    first, second = project_numbers([project_id, other_project_id], create=True)
+    assert first != second
+    assert project_number(project_id) == first
+    assert project_number("never-indexed") is None
+
+    (low, high), (other_low, other_high) = id_range(first), id_range(second)
+    assert high - low == 1 << LOCAL_ID_BITS
+    assert high <= other_low or other_high <= low
+
+
+def test_projects_in_one_shard_only_see_their_own_phrases(project_id, other_project_id):
+    upsert_navigation_vectors(project_id, make_navigation(project_id, "billing", ["view my invoices"]))
+    upsert_navigation_vectors(other_project_id, make_navigation(other_project_id, "invoices",
+                                                                ["view my invoices", "download invoices"]))
+
+    assert searched_urls(project_id, "view my invoices") == ["https://example.com/billing"]
+    assert searched_urls(project_id, "invoices", mode="lexical") == ["https://example.com/billing"]
+    assert searched_urls(other_project_id, "view my invoices") == ["https://example.com/invoices"]
+
+    low, high = id_range(project_number(project_id))
+    view = get_shared_project_index(project_id)
+    assert len(view.metadata) == 1
+    assert all(low <= phrase_id < high for phrase_id, _ in view.metadata.items())
+
+
+def test_upsert_and_remove_stay_inside_the_project(project_id, other_project_id):
+    billing = make_navigation(project_id, "billing", ["view my invoices"])
+    upsert_navigation_vectors(project_id, billing)
+    upsert_navigation_vectors(other_project_id, make_navigation(other_project_id, "billing", ["view my invoices"],
+                                                                url="https://example.com/other"))
+
+    billing["phrases"] = ["download receipts", "billing history"]
+    assert upsert_navigation_vectors(project_id, billing) == 2
+    assert searched_urls(project_id, "view my invoices") == ["https://example.com/billing"]
+    assert {item["phrase"] for item in get_shared_project_index(project_id).metadata.values()} == {
+        "download receipts", "billing history"}
+
+    # Navigation IDs are only matched inside the project's own range
+    assert remove_navigation_vectors(other_project_id, billing["navigation_id"]) == 0
+    assert remove_navigation_vectors(project_id, billing["navigation_id"]) == 2
+    assert get_shared_project_index(project_id) is None
+    assert searched_urls(other_project_id, "view my invoices") == ["https://example.com/other"]
+
+
+def test_replace_projects_rewrites_only_the_given_projects(project_id, other_project_id):
+    upsert_navigation_vectors(project_id, make_navigation(project_id, "billing", ["view my invoices"]))
+    upsert_navigation_vectors(other_project_id, make_navigation(other_project_id, "team", ["invite a teammate"]))
+
+    items = navigation_items(make_navigation(project_id, "settings", ["open settings", "change password"]))
+    published = replace_projects({project_id: (items, fake_encode_phrases([item["phrase"] for item in items]))})
+
+    low, _ = id_range(project_number(project_id))
+    assert [item["id"] for item in published[project_id]] == [low, low + 1]
+    assert searched_urls(project_id, "open settings") == ["https://example.com/settings"]
+    assert len(get_shared_project_index(project_id).metadata) == 2
+    assert searched_urls(other_project_id, "invite a teammate") == ["https://example.com/team"]
@@ -0,0 +1,87 @@
+"""Flow embedding encodings in MongoDB and their migration"""
+import numpy as np
+import pytest
+from bson.binary import Binary
+from scripts.migrate_flow_embeddings import migrate
+from storage.mongo_client import get_mongo_client
+from storage.vector_codec import (
+    decode_embedding,
+    decode_embedding_fields,
+    encode_embedding,
+    encode_embedding_fields,
+)
+
+VECTOR = [0.25, -1.5, 3.0, 1e-3]
+
+
+@pytest.mark.parametrize("encoding, size, tolerance", [("float32", 16, 0), ("float16", 8, 1e-3)])
+def test_packed_encodings_round_trip(encoding, size, tolerance):
+    stored = encode_embedding(VECTOR, encoding)
+    assert isinstance(stored, Binary)
+    assert len(stored) == size
+
+    decoded = decode_embedding(stored, encoding)
+    assert decoded.dtype == np.float32
+    np.testing.assert_allclose(decoded, np.float32(VECTOR), rtol=tolerance)
+
+
+def test_legacy_arrays_and_missing_values():
+    assert encode_embedding(VECTOR, "array") == VECTOR
+    np.testing.assert_array_equal(decode_embedding(VECTOR), np.float32(VECTOR))
+    # Bytes written before the encoding was recorded are float32
+    np.testing.assert_array_equal(decode_embedding(encode_embedding(VECTOR, "float32")), np.float32(VECTOR))
+    assert encode_embedding(None) is None
+    assert decode_embedding(None) is None
+    assert decode_embedding([]) is None
+    with pytest.raises(ValueError):
+        encode_embedding(VECTOR, "int8")
+    with pytest.raises(ValueError):
+        decode_embedding(b"\0" * 4, "int8")
+
+
+def test_document_fields_decode_to_lists():
+    document = {"flow_id": "f", **encode_embedding_fields({"name_embedding": VECTOR,
+                                                           "description_embedding": []}, "float32")}
+    assert document["embedding_encoding"] == "float32"
+
+    decoded = decode_embedding_fields(document)
+    assert decoded["name_embedding"] == pytest.approx(VECTOR)
+    assert decoded["description_embedding"] == []
+    assert "embedding_encoding" not in decoded
+
+
+@pytest.fixture
+def flows(monkeypatch):
+    collection = get_mongo_client().flows_collection
+
+    def bulk_write(requests, ordered=True):
+        # mongomock cannot read the UpdateOne operations of current pymongo versions
+        for request in requests:
+            collection.update_one(request._filter, request._doc)
+
+    monkeypatch.setattr(collection, "bulk_write", bulk_write)
+    yield collection
+    collection.delete_many({})
+
+
+def test_migration_converts_every_encoding_and_is_resumable(flows):
+    flows.insert_many([
+        {"flow_id": "legacy", "name_embedding": VECTOR, "description_embedding": VECTOR},
+        {"flow_id": "half", **encode_embedding_fields({"name_embedding": VECTOR,
+                                                       "description_embedding": VECTOR}, "float16")},
+        {"flow_id": "done", **encode_embedding_fields({"name_embedding": VECTOR,
+                                                       "description_embedding": VECTOR}, "float32")},
+        {"flow_id": "no-embedding"},
+    ])
+
+    assert migrate("float32", batch_size=1, dry_run=True)["documents"] == 2
+    assert flows.count_documents({"embedding_encoding": "float32"}) == 1
+
+    counts = migrate("float32", batch_size=1, dry_run=False)
+    assert counts["documents"] == 2
+    assert counts["bytes_after"] < counts["bytes_before"]
+    for document in flows.find({"name_embedding": {"$exists": True}}):
+        assert document["embedding_encoding"] == "float32"
+        np.testing.assert_allclose(decode_embedding(document["name_embedding"], "float32"), VECTOR, rtol=1e-3)
+
+    assert migrate("float32", batch_size=1, dry_run=False)["documents"] == 0
@@ -2,6 +2,7 @@ from fastapi import HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from storage.redis_client import redis_client
 from storage.mongo_client import get_mongo_client
+from models.models import UserRole
 import json
 from typing import Optional, Dict
 
@@ -39,6 +40,12 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
     
     return user
 
+def require_admin(user_info: Dict = Depends(get_current_user)) -> Dict:
+    """Dependency that requires an authenticated admin user and returns their user data"""
+    if user_info.get("role") != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return user_info
+
 def require_auth(credentials: HTTPAuthorizationCredentials = Depends(security)) -> str:
     """Dependency that requires authentication and returns user email"""
     user_data = get_current_user(credentials)